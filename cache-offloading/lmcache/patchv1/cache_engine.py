@@ -126,6 +126,16 @@ class LMCacheEngine:
                 config,
             )
 
+        # The min_prefix admission policy of the GDS backend reads a chunk's
+        # place in the prompt from its cached_positions, the key alone
+        # doesn't tell how long the prefix is. Nothing else needs them.
+        admission = (config.extra_config or {}).get("gds_admission_policy") or []
+        if isinstance(admission, str):
+            admission = admission.split(",")
+        self.store_positions = config.gds_path is not None and "min_prefix" in [
+            name.strip() for name in admission
+        ]
+
         self.use_layerwise = config.use_layerwise
         self.num_layers = metadata.kv_shape[0]
         self.fmt = MemoryFormat.KV_2LTD
@@ -227,6 +237,9 @@ class LMCacheEngine:
                 )
                 break
 
+            if self.store_positions:
+                memory_obj.metadata.cached_positions = torch.arange(start, end)
+
             starts.append(start)
             ends.append(end)
             keys.append(key)
@@ -335,6 +348,11 @@ class LMCacheEngine:
                 )
                 break
 
+            if self.store_positions:
+                positions = torch.arange(start, end)
+                for memory_obj in memory_objs_multi_layer:
+                    memory_obj.metadata.cached_positions = positions
+
             starts.append(start)
             ends.append(end)
             keys.append(keys_multi_layer)
@@ -1,21 +1,33 @@
 # SPDX-License-Identifier: Apache-2.0
 # Standard
 from collections import OrderedDict
-from concurrent.futures import Future
-from typing import List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+import abc
 import asyncio
+import bisect
 import ctypes
+import errno
+import fcntl
+import hashlib
+import heapq
 import json
 import mmap
 import os
 import random
+import socket
 import string
 import struct
 import threading
 import time
+import uuid
+import zlib
 
 # Third Party
-import aiofile
+from prometheus_client import Counter, Gauge, Histogram
 import numpy as np
 import torch
 
@@ -34,16 +46,168 @@ logger = init_logger(__name__)
 
 _METADATA_FILE_SUFFIX = ".metadata"
 _DATA_FILE_SUFFIX = ".kvcache.safetensors"
-_METADATA_VERSION = 1
+# Suffix of the temp files chunks and sidecars are written to before being
+# renamed into place, see rand_suffix.
+_TMP_FILE_SUFFIX = ".tmp"
+_TMP_SUFFIX_LEN = 8
+_DEFAULT_TMP_MAX_AGE = 3600.0
+_DEFAULT_REAP_INTERVAL = 3600.0
+# Allocation unit assumed when estimating the disk usage of chunk files.
+_DISK_BLOCK_SIZE = 4096
+_METADATA_VERSION = 2
+_METADATA_VERSIONS = (1, 2)
+# What new chunks get unless `gds_metadata_version` says otherwise. Readers
+# before v2 fail on v2 headers, so v1 stays the default while instances
+# without v2 support may share the gds_path.
+_DEFAULT_METADATA_VERSION = 1
 _METADATA_MAX_SIZE = 4096  # reserve 4K for metadata.
+# Smallest header of the v2 format, the direct I/O alignment of most
+# filesystems. The v1 header is always _METADATA_MAX_SIZE bytes.
+_METADATA_MIN_SIZE = 512
+_METADATA_MAGIC = b"LMKV"
+_METADATA_MAX_NDIM = 8
+# v2 header: magic, version, header size, dtype id, fmt, ndim, flags,
+# payload size, sequence number, payload checksum, shape (padded to
+# _METADATA_MAX_NDIM), key length and the crc32 of everything before it and
+# of the key, which follows. Zero padded to the header size.
+_METADATA_V2 = struct.Struct("<4sHHBBBBQQI8QHI")
+# The header's payload checksum is valid.
+_METADATA_FLAG_CHECKSUM = 1
+# Flag bits 1-3 hold the codec id of a compressed payload, see GdsCodec.
+_METADATA_CODEC_SHIFT = 1
+_METADATA_CODEC_MASK = 0x7
+_CODEC_NONE = 0
+_DEFAULT_COMPRESSION_THREADS = 8
+_DEFAULT_COMPRESSION_FRAME_KB = 1024
+_DEFAULT_COMPRESSION_MAX_RATIO = 0.9
+_STATS_INTERVAL = 10.0
+_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Checksum of an entry whose header has none, None means not read yet.
+_NO_CHECKSUM = -1
+_VERIFY_POLICIES = ("off", "sampled", "always")
+_DEFAULT_VERIFY_SAMPLE_RATE = 0.01
+_QUARANTINE_DIR = "quarantine"
+_DEFAULT_SCRUB_RATE_MB = 0.0
+_DEFAULT_SCRUB_INTERVAL = 3600.0
 # TODO: It is possible to read this 4KB block without triggering read-ahead by
 # various means.
+_SEGMENT_DIR = "segments"
+_WRITERS_DIR = "writers"
+_WRITER_LOCK_SUFFIX = ".lock"
+_MAX_WRITER_SLOTS = 1024
+_SEGMENT_FILE_SUFFIX = ".kvlog"
+_SEGMENT_ALIGN = 4096
+_DEFAULT_SEGMENT_SIZE_MB = 1024
+# Reads of a segment record retried after the record moved under them.
+_SEGMENT_READ_ATTEMPTS = 3
+_DEFAULT_COMPACTION_THRESHOLD = 0.5
+_MANIFEST_DIR = "manifest"
+_MANIFEST_CHECKPOINT_SUFFIX = ".ckpt"
+_MANIFEST_JOURNAL_SUFFIX = ".journal"
+# Written by a clean close, a load without it rebuilds the index.
+_MANIFEST_CLEAN_SUFFIX = ".clean"
+_MANIFEST_MAGIC = b"LMGM"
+_MANIFEST_VERSION = 4
+# magic, version, reserved
+_MANIFEST_HEADER = struct.Struct("<4sHH")
+# crc32, op, dtype id, fmt, ndim, codec id, sequence number, payload offset,
+# payload size, stored payload size, key length, location length, stripe
+# length. Followed by the shape, the key, the location (segment file name,
+# empty for the file-per-chunk layout) and the stripe (directory of a chunk
+# file, empty for a segment record).
+_MANIFEST_RECORD = struct.Struct("<IBBBBBQQQQHHH")
+_MANIFEST_OP_PUT = 1
+_MANIFEST_OP_DEL = 2
+_DEFAULT_MANIFEST_CHECKPOINT_RECORDS = 1 << 16
+_DEFAULT_MANIFEST_FLUSH_INTERVAL = 0.5
+_DEFAULT_MANIFEST_TAIL_INTERVAL = 1.0
+# Time other instances get to finish reading a chunk file once they tailed
+# its delete, see unlink_delay.
+_SHARED_UNLINK_GRACE = 5.0
+_DEFAULT_MAX_INFLIGHT_READS = 32
+_DEFAULT_MAX_PREFETCHED = 1024
+_DEFAULT_PREFETCH_TTL = 30.0
+# How often prefetches that were never consumed are dropped.
+_PREFETCH_EXPIRY_INTERVAL = 1.0
+_DEFAULT_READAHEAD_MAX_CHUNKS = 32
+_DEFAULT_READAHEAD_TTL = 5.0
+_DEFAULT_READAHEAD_SUCCESSORS = 1 << 18
+# Share of the GDS allocator (`cufile_buffer_size`) read-ahead may hold.
+_DEFAULT_READAHEAD_BUDGET_FRACTION = 0.25
+_DEFAULT_ADMISSION_MIN_TOKENS = 512
+_DEFAULT_ADMISSION_SKETCH_WIDTH = 1 << 20
+_ADMISSION_SKETCH_DEPTH = 4
+# Counters saturate like TinyLFU's 4-bit counters.
+_ADMISSION_SKETCH_MAX_COUNT = 15
+# All counters are halved after this many increments per counter of a row.
+_ADMISSION_SKETCH_SAMPLE_FACTOR = 10
+_DEFAULT_ADMISSION_WRITE_MB_PER_S = 1024.0
+_DEFAULT_READ_QUEUE_DEPTH = 32
+_DEFAULT_HANDLE_CACHE_SIZE = 256
+_DEFAULT_WRITE_QUEUE_DEPTH = 256
+_DEFAULT_WRITE_WORKERS = 4
+_DEFAULT_WRITE_COALESCE_CHUNKS = 8
+_WRITE_QUEUE_POLICIES = ("drop", "block")
+_DROPPED_PUTS_LOG_INTERVAL = 1000
+# Time close() gives the write workers to drain the queued puts before the
+# remaining ones are dropped.
+_CLOSE_DRAIN_TIMEOUT = 30.0
+_DEFAULT_BACKGROUND_WORKERS = 4
+# Points on the hash ring per unit of stripe weight.
+_STRIPE_VNODES_PER_WEIGHT = 64
+_DEFAULT_STRIPE_REPORT_INTERVAL = 60.0
+_DIRECT_IO_ALIGN = 4096
+_DEFAULT_BOUNCE_BLOCK_SIZE_KB = 1024
+_DEFAULT_BOUNCE_BUFFERS = 4
+_FALLBACK_ENGINES = ("bounce", "mmap")
+_FDATASYNC_POLICIES = ("never", "always", "group")
+_IO_ENGINES = ("sync", "threads")
+# Threads of the `threads` engine, shared by all the bounce rings.
+_DEFAULT_IO_QUEUE_DEPTH = 64
+_DEFAULT_NEGATIVE_LOOKUP_TTL = 2.0
+_DEFAULT_NEGATIVE_LOOKUP_ENTRIES = 1 << 20
+_SCAN_PROGRESS_LOG_INTERVAL = 10.0
+_CUDA_MEMCPY_HOST_TO_DEVICE = 1
+_CUDA_MEMCPY_DEVICE_TO_HOST = 2
 
 
 class UnsupportedMetadataVersion(Exception):
     pass
 
 
+@dataclass
+class GdsCacheMetadata(DiskCacheMetadata):
+    """
+    DiskCacheMetadata plus the offset of the payload inside `path`. For the
+    file-per-chunk layout the payload always follows the metadata block, for
+    the segment layout `path` is the segment file shared by many chunks.
+    """
+
+    offset: int = _METADATA_MAX_SIZE
+    in_segment: bool = False
+    # Payload checksum from the header, see payload_checksum.
+    checksum: Optional[int] = None
+    # Set if the payload is compressed, `size` is its uncompressed size.
+    codec: int = _CODEC_NONE
+    # Bytes of the payload on disk, 0 if that is `size`.
+    stored: int = 0
+
+
 torch_dtypes = {
     torch.half: "F16",
     torch.bfloat16: "BF16",
@@ -64,6 +228,10 @@ torch_dtypes = {
 
 torch_dtypes_inverse = dict([(v, k) for k, v in torch_dtypes.items()])
 
+# Compact dtype ids for binary formats. Only ever append to torch_dtypes.
+torch_dtype_ids = dict([(k, i) for i, k in enumerate(torch_dtypes)])
+torch_dtype_ids_inverse = list(torch_dtypes)
+
 
 def get_fstype(path):
     with open("/proc/mounts", "r") as f:
@@ -86,12 +254,290 @@ def get_fstype(path):
     return best_fstype
 
 
-def pack_metadata(tensor, fmt: MemoryFormat, **extra_metadata) -> bytes:
+def parse_cpulist(cpulist: str) -> Set[int]:
+    """
+    Parses a sysfs cpulist such as `0-3,8-11`.
+    """
+    cpus: Set[int] = set()
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def _read_numa_node(sysfs_path: str) -> Optional[int]:
+    try:
+        with open(sysfs_path, "r") as f:
+            node = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+    # -1 means the platform does not report a node.
+    return node if node >= 0 else None
+
+
+def get_device_numa_node(device: str) -> Optional[int]:
+    props = torch.cuda.get_device_properties(torch.device(device))
+    pci_id = (
+        f"{getattr(props, 'pci_domain_id', 0):04x}:"
+        f"{getattr(props, 'pci_bus_id', 0):02x}:"
+        f"{getattr(props, 'pci_device_id', 0):02x}.0"
+    )
+    return _read_numa_node(f"/sys/bus/pci/devices/{pci_id}/numa_node")
+
+
+def get_io_cpus(device: str, nic: Optional[str] = None) -> Optional[Set[int]]:
+    """
+    Returns the CPUs of the NUMA nodes local to `device` and to the network
+    interface `nic`, or None if the topology is unknown.
+    """
+    nodes = set()
+    try:
+        gpu_node = get_device_numa_node(device)
+    except (AssertionError, RuntimeError) as e:
+        logger.warning(f"Unable to get the PCI location of {device}: {e}")
+        gpu_node = None
+    if gpu_node is not None:
+        nodes.add(gpu_node)
+    if nic is not None:
+        nic_node = _read_numa_node(f"/sys/class/net/{nic}/device/numa_node")
+        if nic_node is None:
+            logger.warning(f"Unable to get the NUMA node of NIC {nic}")
+        else:
+            if gpu_node is not None and nic_node != gpu_node:
+                logger.warning(
+                    f"{device} is on NUMA node {gpu_node} but {nic} is on "
+                    f"node {nic_node}, using the CPUs of both"
+                )
+            nodes.add(nic_node)
+    cpus: Set[int] = set()
+    for node in nodes:
+        try:
+            with open(f"/sys/devices/system/node/node{node}/cpulist", "r") as f:
+                cpus |= parse_cpulist(f.read())
+        except OSError:
+            continue
+    # Only CPUs this process is allowed to run on.
+    cpus &= os.sched_getaffinity(0)
+    return cpus or None
+
+
+def parse_gds_paths(value) -> List[Tuple[str, float]]:
+    """
+    Parses the `gds_paths` extra_config entry: a list (or a comma separated
+    string) of `path` or `path:weight` items, or of {path, weight} dicts.
+    """
+    if isinstance(value, str):
+        value = [item.strip() for item in value.split(",") if item.strip()]
+    stripes = []
+    for item in value:
+        weight = 1.0
+        if isinstance(item, dict):
+            path = item["path"]
+            weight = float(item.get("weight", 1.0))
+        else:
+            path = str(item)
+            head, sep, tail = path.rpartition(":")
+            if sep:
+                try:
+                    weight = float(tail)
+                    path = head
+                except ValueError:
+                    pass
+        if weight <= 0:
+            raise RuntimeError(f"Invalid weight {weight} for `{path}` in gds_paths")
+        stripes.append((path, weight))
+    if not stripes:
+        raise RuntimeError("`gds_paths` in extra_config is empty")
+    return stripes
+
+
+class GdsStripes:
+    """
+    The directories the GDS tier is striped over, typically one mount per
+    NVMe-oF target or rail. Chunks are placed by consistent hashing of
+    their chunk hash on a ring where each directory owns a number of points
+    proportional to its bandwidth weight, so adding a directory only changes
+    the placement of the chunks that now hash to it. Chunks are not moved:
+    the manifest records the directory each chunk was written to and the
+    lookup uses it, chunks on a removed directory are dropped.
+
+    Also counts the bytes moved to and from each directory to report the
+    per-directory throughput.
+    """
+
+    def __init__(self, stripes: List[Tuple[str, float]]):
+        self.paths = [path for path, _ in stripes]
+        self.weights = [weight for _, weight in stripes]
+        ring = []
+        for i, (path, weight) in enumerate(stripes):
+            for vnode in range(max(1, round(weight * _STRIPE_VNODES_PER_WEIGHT))):
+                ring.append((self._hash(f"{path}#{vnode}"), i))
+        ring.sort()
+        self.ring_hashes = [h for h, _ in ring]
+        self.ring_stripes = [i for _, i in ring]
+
+        self.lock = threading.Lock()
+        self.bytes_read = [0] * len(self.paths)
+        self.bytes_written = [0] * len(self.paths)
+        self.last_report = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(value.encode(), digest_size=8).digest(), "little"
+        )
+
+    def stripe_of_hash(self, chunk_hash) -> int:
+        if len(self.paths) == 1:
+            return 0
+        pos = bisect.bisect(self.ring_hashes, self._hash(str(chunk_hash)))
+        return self.ring_stripes[pos % len(self.ring_stripes)]
+
+    def stripe_of_path(self, path: str) -> int:
+        for i, root in enumerate(self.paths):
+            if path.startswith(root + os.sep):
+                return i
+        return 0
+
+    def account(self, path: str, nbytes: int, write: bool) -> None:
+        if len(self.paths) == 1:
+            return
+        i = self.stripe_of_path(path)
+        with self.lock:
+            if write:
+                self.bytes_written[i] += nbytes
+            else:
+                self.bytes_read[i] += nbytes
+
+    def throughput(self) -> Dict[str, Tuple[float, float]]:
+        """
+        Returns the (read, write) throughput of each directory in MB/s
+        since the previous call.
+        """
+        with self.lock:
+            now = time.monotonic()
+            elapsed = max(now - self.last_report, 1e-9)
+            report = {
+                path: (
+                    self.bytes_read[i] / elapsed / 1024**2,
+                    self.bytes_written[i] / elapsed / 1024**2,
+                )
+                for i, path in enumerate(self.paths)
+            }
+            self.bytes_read = [0] * len(self.paths)
+            self.bytes_written = [0] * len(self.paths)
+            self.last_report = now
+        return report
+
+
+@dataclass
+class GdsChunkHeader:
+    """
+    The decoded metadata block in front of a chunk's payload.
+    """
+
+    shape: torch.Size
+    dtype: torch.dtype
+    nbytes: int
+    fmt: MemoryFormat
+    version: int = _METADATA_VERSION
+    # The payload starts right after the header.
+    header_size: int = _METADATA_MAX_SIZE
+    # Only set for records of the segment layout.
+    key: Optional[str] = None
+    seq: int = 0
+    checksum: int = 0
+    flags: int = 0
+
+    @property
+    def entry_checksum(self) -> int:
+        if self.flags & _METADATA_FLAG_CHECKSUM:
+            return self.checksum
+        return _NO_CHECKSUM
+
+    @property
+    def codec(self) -> int:
+        return (self.flags >> _METADATA_CODEC_SHIFT) & _METADATA_CODEC_MASK
+
+
+def payload_checksum(
+    tensor: torch.Tensor, stream: Optional["torch.cuda.Stream"] = None
+) -> int:
+    """
+    crc32 of the tensor's bytes. A tensor in device memory is copied to the
+    host on `stream`, which only waits for the copies queued on it rather
+    than for the compute stream.
+    """
+    data = tensor.reshape(-1).view(torch.uint8)
+    if data.device.type != "cpu":
+        with torch.cuda.stream(stream):
+            data = data.cpu()
+    return zlib.crc32(data.numpy())
+
+
+def pack_metadata(
+    tensor,
+    fmt: MemoryFormat,
+    version: int = _METADATA_VERSION,
+    header_size: int = _METADATA_MAX_SIZE,
+    key: Optional[str] = None,
+    seq: int = 0,
+    checksum: Optional[int] = None,
+    codec: int = _CODEC_NONE,
+) -> bytes:
+    """
+    The header of a chunk. `checksum` is the payload_checksum of the
+    uncompressed payload, `codec` the id of the GdsCodec that compressed it.
+    """
     if tensor.dtype not in torch_dtypes:
         raise RuntimeError(f"unhandled dtype {tensor.dtype}")
-
-    # Metadata
     data_size = tensor.numel() * tensor.element_size()
+    if version == 1:
+        assert codec == _CODEC_NONE, "v1 headers can't record a codec"
+        extra_metadata: Dict[str, Any] = {"lmcache_version": "1"}
+        if key is not None:
+            extra_metadata["key"] = key
+            extra_metadata["seq"] = seq
+        if checksum is not None:
+            extra_metadata["checksum"] = checksum
+        return _pack_metadata_v1(tensor, fmt, data_size, extra_metadata)
+
+    shape = list(tensor.size())
+    if len(shape) > _METADATA_MAX_NDIM:
+        raise RuntimeError(f"unhandled rank {len(shape)}")
+    key_bytes = key.encode("utf-8") if key is not None else b""
+    flags = codec << _METADATA_CODEC_SHIFT
+    if checksum is not None:
+        flags |= _METADATA_FLAG_CHECKSUM
+    header = _METADATA_V2.pack(
+        _METADATA_MAGIC,
+        version,
+        header_size,
+        torch_dtype_ids[tensor.dtype],
+        fmt.value,
+        len(shape),
+        flags,
+        data_size,
+        seq,
+        checksum or 0,
+        *(shape + [0] * (_METADATA_MAX_NDIM - len(shape))),
+        len(key_bytes),
+        0,
+    )
+    crc = zlib.crc32(key_bytes, zlib.crc32(header[:-4]))
+    header = header[:-4] + struct.pack("<I", crc) + key_bytes
+    assert len(header) <= header_size
+    return header + b"\0" * (header_size - len(header))
+
+
+def _pack_metadata_v1(
+    tensor, fmt: MemoryFormat, data_size: int, extra_metadata: Dict[str, Any]
+) -> bytes:
     tensor_meta = {
         "dtype": torch_dtypes[tensor.dtype],
         "shape": list(tensor.size()),
@@ -111,7 +557,53 @@ def pack_metadata(tensor, fmt: MemoryFormat, **extra_metadata) -> bytes:
     return struct.pack("<Q", len(str_meta)) + str_meta
 
 
-def unpack_metadata(buffer: bytes):
+def unpack_metadata(buffer: bytes) -> GdsChunkHeader:
+    """
+    Decodes a v1 or v2 header. Raises UnsupportedMetadataVersion for other
+    versions and ValueError for a corrupt header.
+    """
+    if buffer[:4] != _METADATA_MAGIC:
+        return _unpack_metadata_v1(buffer)
+    if len(buffer) < _METADATA_V2.size:
+        raise ValueError("truncated metadata header")
+    (
+        _,
+        version,
+        header_size,
+        dtype_id,
+        fmt,
+        ndim,
+        flags,
+        nbytes,
+        seq,
+        checksum,
+        *fields,
+    ) = _METADATA_V2.unpack_from(buffer)
+    if version not in _METADATA_VERSIONS:
+        raise UnsupportedMetadataVersion(f"metadata version {version}")
+    dims = fields[:_METADATA_MAX_NDIM]
+    key_len, crc = fields[_METADATA_MAX_NDIM:]
+    key_end = _METADATA_V2.size + key_len
+    if ndim > _METADATA_MAX_NDIM or key_end > min(len(buffer), header_size):
+        raise ValueError("invalid metadata header")
+    key_bytes = buffer[_METADATA_V2.size : key_end]
+    if zlib.crc32(key_bytes, zlib.crc32(buffer[: _METADATA_V2.size - 4])) != crc:
+        raise ValueError("metadata header checksum mismatch")
+    return GdsChunkHeader(
+        torch.Size(dims[:ndim]),
+        torch_dtype_ids_inverse[dtype_id],
+        nbytes,
+        MemoryFormat(fmt),
+        version=version,
+        header_size=header_size,
+        key=key_bytes.decode("utf-8") if key_len else None,
+        seq=seq,
+        checksum=checksum,
+        flags=flags,
+    )
+
+
+def _unpack_metadata_v1(buffer: bytes) -> GdsChunkHeader:
     meta_len = struct.unpack("<Q", buffer[:8])[0]
 
     str_meta = buffer[8 : 8 + meta_len]
@@ -119,6 +611,11 @@ def unpack_metadata(buffer: bytes):
 
     meta = json.loads(json_meta.decode("utf-8"))
     tensor_meta = meta["kvcache"]
+    extra_metadata = tensor_meta["__metadata__"]
+    if extra_metadata.get("lmcache_version") != "1":
+        raise UnsupportedMetadataVersion(
+            f"metadata version {extra_metadata.get('lmcache_version')}"
+        )
 
     shape = tensor_meta["shape"]
     dtype_str = tensor_meta["dtype"]
@@ -128,7 +625,18 @@ def unpack_metadata(buffer: bytes):
     nbytes = data_offsets[1] - data_offsets[0]
     dtype = torch_dtypes_inverse[dtype_str]
 
-    return torch.Size(shape), dtype, nbytes, fmt, tensor_meta["__metadata__"]
+    checksum = extra_metadata.get("checksum")
+    return GdsChunkHeader(
+        torch.Size(shape),
+        dtype,
+        nbytes,
+        fmt,
+        version=1,
+        key=extra_metadata.get("key"),
+        seq=extra_metadata.get("seq", 0),
+        checksum=checksum or 0,
+        flags=_METADATA_FLAG_CHECKSUM if checksum is not None else 0,
+    )
 
 
 def rand_suffix(rand, n: int):
@@ -137,11 +645,30 @@ def rand_suffix(rand, n: int):
     )
 
 
-async def save_metadata(path: str, tmp: str, metadata: bytes):
+def save_metadata(path: str, tmp: str, metadata: bytes):
     tmp_path = path + tmp
-    async with aiofile.async_open(tmp_path, "wb") as f:
-        await f.write(metadata)
-    os.rename(tmp_path, path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(metadata)
+        os.rename(tmp_path, path)
+    except OSError:
+        remove_tmp_file(tmp_path)
+        raise
+
+
+def remove_tmp_file(tmp_path: str) -> None:
+    try:
+        os.unlink(tmp_path)
+    except FileNotFoundError:
+        pass
+
+
+def is_tmp_file(name: str) -> bool:
+    """
+    Whether `name` is a chunk or sidecar temp file, `<name>.tmp<suffix>`.
+    """
+    pos = len(name) - len(_TMP_FILE_SUFFIX) - _TMP_SUFFIX_LEN
+    return pos > 0 and name.startswith(_TMP_FILE_SUFFIX, pos)
 
 
 def get_extra_config_bool(key, config: LMCacheEngineConfig) -> bool | None:
@@ -160,237 +687,3382 @@ def get_extra_config_bool(key, config: LMCacheEngineConfig) -> bool | None:
     return bool_value
 
 
-class GdsBackend(StorageBackendInterface):
+def get_extra_config_int(key, config: LMCacheEngineConfig) -> int | None:
+    if config.extra_config is None:
+        return None
+    value = config.extra_config.get(key, None)
+    if value is None:
+        return None
+
+    try:
+        int_value = int(value)
+    except (TypeError, ValueError):
+        raise RuntimeError(
+            f"Invalid value `{value}` for `{key}` in extra_config"
+        ) from None
+
+    logger.info(f"Getting {key} = {int_value} from extra_config")
+    return int_value
+
+
+def get_extra_config_float(key, config: LMCacheEngineConfig) -> float | None:
+    if config.extra_config is None:
+        return None
+    value = config.extra_config.get(key, None)
+    if value is None:
+        return None
+
+    try:
+        float_value = float(value)
+    except (TypeError, ValueError):
+        raise RuntimeError(
+            f"Invalid value `{value}` for `{key}` in extra_config"
+        ) from None
+
+    logger.info(f"Getting {key} = {float_value} from extra_config")
+    return float_value
+
+
+def get_extra_config_bool_or(key, config: LMCacheEngineConfig, default: bool) -> bool:
+    if config.extra_config is None:
+        return default
+    value = get_extra_config_bool(key, config)
+    return default if value is None else value
+
+
+def align_up(value: int, alignment: int) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+@dataclass
+class GdsManifestRecord:
+    op: int
+    # Lamport clock of the writers, orders the records of a key across
+    # hosts without trusting their clocks.
+    seq: int
+    key: str
+    location: str = ""
+    offset: int = _METADATA_MAX_SIZE
+    size: int = 0
+    shape: Optional[torch.Size] = None
+    dtype: Optional[torch.dtype] = None
+    fmt: Optional[MemoryFormat] = None
+    codec: int = _CODEC_NONE
+    stored: int = 0
+    stripe: str = ""
+
+
+def pack_manifest_record(record: GdsManifestRecord) -> bytes:
+    key = record.key.encode("utf-8")
+    location = record.location.encode("utf-8")
+    stripe = record.stripe.encode("utf-8")
+    shape = tuple(record.shape) if record.shape is not None else ()
+    body = _MANIFEST_RECORD.pack(
+        0,
+        record.op,
+        torch_dtype_ids[record.dtype] if record.dtype is not None else 0,
+        record.fmt.value if record.fmt is not None else 0,
+        len(shape),
+        record.codec,
+        record.seq,
+        record.offset,
+        record.size,
+        record.stored,
+        len(key),
+        len(location),
+        len(stripe),
+    )
+    body += struct.pack(f"<{len(shape)}Q", *shape) + key + location + stripe
+    crc = zlib.crc32(memoryview(body)[4:])
+    return struct.pack("<I", crc) + body[4:]
+
+
+def unpack_manifest_records(
+    buffer: bytes, offset: int
+) -> Iterator[Tuple[int, GdsManifestRecord]]:
     """
-    Originally based on the open sourced WekaGdsBackend, this is a backend that
-    leverages NVIDIA's cuFile API to issue GDS requests directly to the
-    GDS-supported remote filesystem.  In order to use it, users need to specify
-    `gds_path` and `cufile_buffer_size` in their LMCache config.
+    Yields (end offset, record) until the end of the buffer or the first
+    record that is truncated or fails its checksum.
+    """
+    view = memoryview(buffer)
+    while offset + _MANIFEST_RECORD.size <= len(buffer):
+        (
+            crc,
+            op,
+            dtype_id,
+            fmt,
+            ndim,
+            codec,
+            seq,
+            payload_offset,
+            size,
+            stored,
+            key_len,
+            location_len,
+            stripe_len,
+        ) = _MANIFEST_RECORD.unpack_from(buffer, offset)
+        end = (
+            offset
+            + _MANIFEST_RECORD.size
+            + 8 * ndim
+            + key_len
+            + location_len
+            + stripe_len
+        )
+        if end > len(buffer) or zlib.crc32(view[offset + 4 : end]) != crc:
+            return
+        pos = offset + _MANIFEST_RECORD.size
+        shape = struct.unpack_from(f"<{ndim}Q", buffer, pos)
+        pos += 8 * ndim
+        key = bytes(view[pos : pos + key_len]).decode("utf-8")
+        pos += key_len
+        location = bytes(view[pos : pos + location_len]).decode("utf-8")
+        pos += location_len
+        stripe = bytes(view[pos:end]).decode("utf-8")
+        if op == _MANIFEST_OP_PUT:
+            record = GdsManifestRecord(
+                op,
+                seq,
+                key,
+                location,
+                payload_offset,
+                size,
+                torch.Size(shape),
+                torch_dtype_ids_inverse[dtype_id],
+                MemoryFormat(fmt),
+                codec,
+                stored,
+                stripe,
+            )
+        else:
+            record = GdsManifestRecord(op, seq, key)
+        yield end, record
+        offset = end
 
-    Cache Directory Structure created by this Backend:
-    /{gds_path}/{first_level}/{second_level}/{data & metadata} This structure
-    is semi-arbitrary. We create two levels in the directory hierarchy to
-    parallelize loading the data during initialization in the Python code.
 
-    NOTE: If GPUDirect is not supported on that other filesystem, then CuFile will
-    fall back to POSIX I/O.
+@dataclass
+class _PeerJournal:
+    """
+    The journal of another writer being tailed.
     """
 
-    def __init__(
-        self,
-        config: LMCacheEngineConfig,
-        loop: asyncio.AbstractEventLoop,
-        memory_allocator: MemoryAllocatorInterface,
-        dst_device: str = "cuda",
-    ):
-        assert dst_device.startswith("cuda")
-        super().__init__(dst_device)
+    fd: int
+    inode: int
+    # End of the records read so far, 0 before the header is checked and
+    # -1 if the journal can't be read.
+    offset: int = 0
 
-        self.config = config
-        self.loop = loop
-        self.memory_allocator = memory_allocator
-        self.dst_device = dst_device
 
-        assert config.gds_path is not None, "Need to specify gds_path for GdsBackend"
-        self.gds_path = config.gds_path
-        self.fstype = get_fstype(config.gds_path)
+class GdsManifest:
+    """
+    Persistent compact index of the GDS tier, so that startup does not have
+    to walk the whole directory tree and open every metadata file.
 
-        # Log the fstype - this is useful in reports and varying optimizations
-        # based on the kind of fstype used.
-        logger.info(
-            f"GDS backend using fstype '{self.fstype}' on path '{self.gds_path}'"
+    Each writer owns a checkpoint file holding one put record per chunk it
+    knows about and an append-only journal of the puts and deletes since
+    that checkpoint, both under /{gds_path}/manifest. Loading reads every
+    writer's files with one sequential read each and replays the records in
+    sequence order. Records carry a crc32, so a torn journal tail is simply
+    dropped; a damaged checkpoint makes the whole manifest stale and the
+    backend falls back to a directory scan to repair it. So does a manifest
+    whose writer did not close it cleanly, puts in flight at a crash and
+    chunks written without the manifest are only found by the scan.
+
+    Sequence numbers are a Lamport clock: every record gets one more than
+    the highest this writer has issued or read from the others.
+
+    Writers sharing the manifest directory tail each other's journals to
+    learn about new chunks. A checkpoint starts a new journal file rather
+    than truncating the old one, so a tailer drains the old file through
+    its open descriptor before it moves on.
+    """
+
+    def __init__(self, root: str, writer_id: str, checkpoint_records: int):
+        self.dir = os.path.join(root, _MANIFEST_DIR)
+        os.makedirs(self.dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(
+            self.dir, writer_id + _MANIFEST_CHECKPOINT_SUFFIX
         )
+        self.journal_path = os.path.join(self.dir, writer_id + _MANIFEST_JOURNAL_SUFFIX)
+        self.clean_path = os.path.join(self.dir, writer_id + _MANIFEST_CLEAN_SUFFIX)
+        self.checkpoint_records = checkpoint_records
 
-        self.use_cufile = True
-        use_cufile_from_config = False
+        self.lock = threading.Lock()
+        self.pending: List[bytes] = []
+        # key -> packed put record of the entries this writer checkpoints
+        self.owned: Dict[str, bytes] = {}
+        self.journal_records = 0
+        self.journal_fd: Optional[int] = None
+        self.seq = 0
+        # Serializes checkpoints, which write the file without `lock`.
+        self.checkpoint_lock = threading.Lock()
 
-        if config.extra_config is not None:
-            use_cufile = get_extra_config_bool("use_cufile", config)
-            if use_cufile is not None:
-                self.use_cufile = use_cufile
-                use_cufile_from_config = True
+        self.tail_lock = threading.Lock()
+        # journal path -> the other writer's journal being tailed
+        self.peers: Dict[str, _PeerJournal] = {}
 
-        if self.fstype in ["tmpfs", "overlayfs"]:
-            # TODO: we can replace the auto-detection of unsupported cufile
-            # file systems by doing a small cufile API test on them. If as
-            # read/write test fails, we can fallback to not using cufile APIs.
-            if use_cufile_from_config:
-                logger.warning("No automatic disabling of cufile usage due to fstype")
-            else:
-                logger.info("Automatic disabling of cufile usage due to fstype")
-                self.use_cufile = False
+    def load(self) -> Optional[List[GdsManifestRecord]]:
+        """
+        Returns all records of all writers in sequence order, or None if
+        the manifest is missing or stale.
+        """
+        try:
+            os.unlink(self.clean_path)
+            clean = True
+        except FileNotFoundError:
+            clean = False
+        records = self._load()
+        if records is not None:
+            # Even when they're not used, new records go after these.
+            self._observe(records)
+            if not clean:
+                logger.warning(f"{self.journal_path} was not closed cleanly")
+                records = None
+        if records is None:
+            with self.lock:
+                self.owned.clear()
+                self.journal_records = 0
+        return records
 
-        if self.use_cufile:
-            logger.info("Using cufile")
-            # HACK(Jiayi): cufile import is buggy on some hardware
-            # (e.g., without GPUDirect), so it's temporarily put here.
-            # Third Party
-            import cufile
+    @staticmethod
+    def invalidate(root: str) -> None:
+        """
+        Makes the next load of every writer rebuild its index, for an
+        instance storing chunks without the manifest.
+        """
+        manifest_dir = os.path.join(root, _MANIFEST_DIR)
+        if not os.path.isdir(manifest_dir):
+            return
+        for name in os.listdir(manifest_dir):
+            if name.endswith(_MANIFEST_CLEAN_SUFFIX):
+                try:
+                    os.unlink(os.path.join(manifest_dir, name))
+                except FileNotFoundError:
+                    pass
 
-            self.cudart = None
-            self.cufile = cufile
-            self._cufile_driver = self.cufile.CuFileDriver()
-        else:
-            logger.info("Not using cufile")
-            self.cufile = None
-            self.cudart = ctypes.CDLL("libcudart.so")
+    def next_seq(self) -> int:
+        with self.lock:
+            self.seq += 1
+            return self.seq
 
-        self.use_direct_io = False
+    def _observe(self, records: List[GdsManifestRecord]) -> None:
+        if records:
+            with self.lock:
+                self.seq = max(self.seq, records[-1].seq)
 
-        if config.extra_config is not None:
-            use_direct_io = get_extra_config_bool("use_direct_io", config)
-            if use_direct_io is not None:
-                self.use_direct_io = use_direct_io
+    def _load(self) -> Optional[List[GdsManifestRecord]]:
+        names = [
+            name
+            for name in os.listdir(self.dir)
+            if name.endswith(_MANIFEST_CHECKPOINT_SUFFIX)
+            or name.endswith(_MANIFEST_JOURNAL_SUFFIX)
+        ]
+        if not names:
+            return None
 
-        if not os.path.exists(self.gds_path):
-            os.makedirs(self.gds_path, exist_ok=True)
+        records: List[GdsManifestRecord] = []
+        for name in names:
+            path = os.path.join(self.dir, name)
+            is_checkpoint = name.endswith(_MANIFEST_CHECKPOINT_SUFFIX)
+            is_own = path in (self.checkpoint_path, self.journal_path)
+            peer = None
+            if is_checkpoint or is_own:
+                with open(path, "rb") as f:
+                    buf = f.read()
+            else:
+                # Read through the descriptor that is tailed later, so that
+                # a journal replaced in between isn't missed.
+                with self.tail_lock:
+                    peer = self._open_peer(path)
+                buf = os.pread(peer.fd, os.fstat(peer.fd).st_size, 0)
+            if len(buf) < _MANIFEST_HEADER.size:
+                if is_checkpoint:
+                    logger.warning(f"Truncated GDS manifest checkpoint {path}")
+                    return None
+                continue
+            magic, version, _ = _MANIFEST_HEADER.unpack_from(buf, 0)
+            if magic != _MANIFEST_MAGIC or version != _MANIFEST_VERSION:
+                logger.warning(f"Unsupported GDS manifest file {path}")
+                return None
+            end = _MANIFEST_HEADER.size
+            for end, record in unpack_manifest_records(buf, end):
+                records.append(record)
+                if is_own:
+                    self._own(record, pack_manifest_record(record))
+                    if not is_checkpoint:
+                        self.journal_records += 1
+            if peer is not None:
+                peer.offset = end
+            if end != len(buf):
+                if is_checkpoint:
+                    logger.warning(f"Corrupted GDS manifest checkpoint {path}")
+                    return None
+                logger.warning(
+                    f"Dropping {len(buf) - end} bytes of torn journal tail in {path}"
+                )
+                if path == self.journal_path:
+                    # New records are appended, they must follow the last
+                    # good one to be readable by this writer and its tailers.
+                    os.truncate(path, end)
+        records.sort(key=lambda record: record.seq)
+        return records
 
-        self.stats = None  # TODO: plug into LMCache Statistics
+    def _own(self, record: GdsManifestRecord, packed: bytes) -> None:
+        if record.op == _MANIFEST_OP_PUT:
+            self.owned[record.key] = packed
+        else:
+            self.owned.pop(record.key, None)
 
-        self.hot_lock = threading.Lock()
-        self.hot_cache: OrderedDict[CacheEngineKey, DiskCacheMetadata] = OrderedDict()
-        self.metadata_dirs: set[str] = set()
+    def append(self, record: GdsManifestRecord) -> None:
+        packed = pack_manifest_record(record)
+        with self.lock:
+            self.pending.append(packed)
+            self._own(record, packed)
 
-        self.put_lock = threading.Lock()
-        self.put_tasks: set[CacheEngineKey] = set()
+    def flush(self) -> bool:
+        """
+        Appends the pending records to the journal, returns whether the
+        journal has grown enough to be folded into a new checkpoint.
+        """
+        with self.lock:
+            self._flush_locked()
+            return self.journal_records >= self.checkpoint_records
 
-        self.rand = random.Random(self.dst_device)
+    def _flush_locked(self) -> None:
+        if not self.pending:
+            return
+        if self.journal_fd is None:
+            self.journal_fd = os.open(
+                self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+            if os.fstat(self.journal_fd).st_size == 0:
+                os.write(self.journal_fd, self._header())
+        os.write(self.journal_fd, b"".join(self.pending))
+        self.journal_records += len(self.pending)
+        self.pending = []
 
-        if hasattr(self.memory_allocator, "base_pointer"):
-            logger.debug(f"Using base pointer {self.memory_allocator.base_pointer}")
-            self.cufile_base_pointer = self.memory_allocator.base_pointer
-        else:
-            logger.info("No base pointer found, cufile will use bounce buffers")
-            self.cufile_base_pointer = None
-        asyncio.run_coroutine_threadsafe(self._scan_metadata(), self.loop)
-        self.save_metadata_tasks: set[asyncio.Task] = set()
+    @staticmethod
+    def _header() -> bytes:
+        return _MANIFEST_HEADER.pack(_MANIFEST_MAGIC, _MANIFEST_VERSION, 0)
 
-    async def _scan_metadata(self):
-        # TODO: even though we only run it once on startup, this is still
-        # not super scalable - test whether Rust code will be faster here, or
-        # whether we can serialize meta-data in groups for faster loading.
-        tasks = []
-        start = time.perf_counter()
-        with os.scandir(self.gds_path) as it:
-            for entry in it:
-                if not entry.is_dir():
-                    continue
-                l1_dir = os.path.basename(entry.name)
-                if len(l1_dir) != 2:
-                    continue
-                tasks.append(
-                    asyncio.to_thread(
-                        self._scan_metadata_subdir,
-                        os.path.join(self.gds_path, l1_dir),
-                        l1_dir,
-                    )
+    def checkpoint(self) -> None:
+        """
+        Writes the owned records to a new checkpoint and starts a new
+        journal. Only the snapshot is taken under `lock`, puts keep being
+        journaled while the checkpoint is written and synced.
+        """
+        with self.checkpoint_lock:
+            journal_tmp_path = self.journal_path + ".tmp"
+            with self.lock:
+                self._flush_locked()
+                owned = b"".join(self.owned.values())
+                entries = len(self.owned)
+                if self.journal_fd is not None:
+                    os.close(self.journal_fd)
+                # Records from now on go to the next journal. It replaces
+                # the current one once the checkpoint holding it is durable,
+                # a new file instead of a truncation, so that writers
+                # tailing the old journal still read it to its end.
+                self.journal_fd = os.open(
+                    journal_tmp_path,
+                    os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_TRUNC,
+                    0o644,
                 )
-        # TODO: If Python 3.11+, can we use TaskGroup instead?
-        await asyncio.gather(*tasks)
-        end = time.perf_counter()
-        logger.info(
-            f"Read {len(self.hot_cache)} cache entries from persistent "
-            f"storage in {end - start:.2f} seconds"
-        )
+                os.write(self.journal_fd, self._header())
+                self.journal_records = 0
 
-    def _scan_metadata_subdir(self, path, l1_dir):
-        target_suffix = _DATA_FILE_SUFFIX + _METADATA_FILE_SUFFIX
-        with os.scandir(path) as it:
-            for entry in it:
-                if not entry.is_dir():
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self._header())
+                f.write(owned)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_path, self.checkpoint_path)
+            os.rename(journal_tmp_path, self.journal_path)
+        logger.info(f"Checkpointed {entries} entries into {self.checkpoint_path}")
+
+    def tail(self) -> List[GdsManifestRecord]:
+        """
+        Returns the records the other writers appended to their journals
+        since the last call, or since the load, in sequence order.
+        """
+        records: List[GdsManifestRecord] = []
+        with self.tail_lock:
+            for name in os.listdir(self.dir):
+                path = os.path.join(self.dir, name)
+                if (
+                    not name.endswith(_MANIFEST_JOURNAL_SUFFIX)
+                    or path == self.journal_path
+                ):
                     continue
-                l2_dir = os.path.basename(entry.name)
-                if len(l2_dir) != 2:
+                try:
+                    inode = os.stat(path).st_ino
+                    peer = self.peers.get(path)
+                    if peer is None:
+                        # A writer that started after the load. Open its
+                        # journal first, its checkpoint may be replaced.
+                        peer = self._open_peer(path)
+                        records.extend(self._read_checkpoint(path))
+                    elif peer.inode != inode:
+                        # The writer checkpointed, finish the old journal.
+                        records.extend(self._read_peer(path, peer))
+                        peer = self._open_peer(path)
+                except FileNotFoundError:
                     continue
-                with os.scandir(os.path.join(path, l2_dir)) as it2:
-                    for fentry in it2:
-                        if not fentry.is_file():
-                            continue
-                        if not fentry.name.endswith(target_suffix):
-                            continue
-                        filename = os.path.basename(fentry.name)
-                        key_str = filename[:-14].replace("_", "/")
-                        try:
-                            key = CacheEngineKey.from_string(key_str)
-                        except ValueError as e:
-                            logger.error(
-                                f"Filename {filename} can't be converted "
-                                f"back into cache key: {e}"
-                            )
-                            continue
-                        try:
-                            self._read_metadata(key, fentry.path, l1_dir + l2_dir)
-                        except UnsupportedMetadataVersion:
-                            logger.error(
-                                "Unsupported metadata version for "
-                                f"{fentry.path}, ignoring"
-                            )
+                records.extend(self._read_peer(path, peer))
+        records.sort(key=lambda record: record.seq)
+        self._observe(records)
+        return records
 
-    def _read_metadata(self, key, filename, subdir_key):
-        with open(filename, "rb") as f:
-            buf = f.read(_METADATA_MAX_SIZE)
+    def _open_peer(self, path: str) -> _PeerJournal:
+        fd = os.open(path, os.O_RDONLY)
+        peer = _PeerJournal(fd, os.fstat(fd).st_ino)
+        old = self.peers.get(path)
+        if old is not None:
+            os.close(old.fd)
+        self.peers[path] = peer
+        return peer
 
-        shape, dtype, size, fmt, extra_metadata = unpack_metadata(buf)
-        if extra_metadata["lmcache_version"] != str(_METADATA_VERSION):
-            raise RuntimeError("unhandled lmcache metadata")
-        logger.debug(
-            f"Read metadata for {key} from {filename}: "
-            f"shape={shape}, dtype={dtype}, size={size}, fmt={fmt}, "
-            f"extra_metadata={extra_metadata}"
-        )
-        # TODO(extra_metadata)
-        metadata = DiskCacheMetadata(
-            filename.removesuffix(_METADATA_FILE_SUFFIX), size, shape, dtype, fmt
+    def _read_peer(self, path: str, peer: _PeerJournal) -> List[GdsManifestRecord]:
+        size = os.fstat(peer.fd).st_size
+        if peer.offset == 0:
+            if size < _MANIFEST_HEADER.size:
+                return []
+            magic, version, _ = _MANIFEST_HEADER.unpack(
+                os.pread(peer.fd, _MANIFEST_HEADER.size, 0)
+            )
+            if magic != _MANIFEST_MAGIC or version != _MANIFEST_VERSION:
+                logger.warning(f"Unsupported GDS manifest file {path}, ignoring")
+                peer.offset = -1
+                return []
+            peer.offset = _MANIFEST_HEADER.size
+        if peer.offset < 0 or size <= peer.offset:
+            return []
+        buf = os.pread(peer.fd, size - peer.offset, peer.offset)
+        records = []
+        end = 0
+        # A record being appended is picked up by the next call.
+        for end, record in unpack_manifest_records(buf, 0):
+            records.append(record)
+        peer.offset += end
+        return records
+
+    def _read_checkpoint(self, journal_path: str) -> List[GdsManifestRecord]:
+        path = (
+            journal_path.removesuffix(_MANIFEST_JOURNAL_SUFFIX)
+            + _MANIFEST_CHECKPOINT_SUFFIX
         )
-        with self.hot_lock:
-            self.metadata_dirs.add(subdir_key)
-            self.hot_cache[key] = metadata
-        return metadata
+        try:
+            with open(path, "rb") as f:
+                buf = f.read()
+        except FileNotFoundError:
+            return []
+        if len(buf) < _MANIFEST_HEADER.size:
+            return []
+        magic, version, _ = _MANIFEST_HEADER.unpack_from(buf, 0)
+        if magic != _MANIFEST_MAGIC or version != _MANIFEST_VERSION:
+            return []
+        return [
+            record for _, record in unpack_manifest_records(buf, _MANIFEST_HEADER.size)
+        ]
 
-    def __str__(self):
-        return self.__class__.__name__
+    def close(self) -> None:
+        """
+        Flushes and syncs the journal and marks the manifest as cleanly
+        closed. Only call it once no more records are appended.
+        """
+        with self.lock:
+            self._flush_locked()
+            if self.journal_fd is not None:
+                os.fsync(self.journal_fd)
+                os.close(self.journal_fd)
+                self.journal_fd = None
+            with open(self.clean_path, "wb") as f:
+                os.fsync(f.fileno())
+        with self.tail_lock:
+            for peer in self.peers.values():
+                os.close(peer.fd)
+            self.peers.clear()
 
-    def contains(self, key: CacheEngineKey, pin: bool = False) -> bool:
-        # TODO: implement pin() semantics
-        with self.hot_lock:
-            res = key in self.hot_cache
-        if res:
-            return True
-        if self._try_to_read_metadata(key):
+
+class GdsNegativeCache:
+    """
+    Keys recently found missing on the filesystem, so that repeated lookups
+    of a prompt (the scheduler polls waiting requests) do not stat the
+    shared filesystem again until `ttl` seconds have passed, which bounds
+    how long a chunk written by another node stays invisible.
+    """
+
+    def __init__(self, ttl: float, capacity: int):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        # key -> deadline, oldest first
+        self.entries: OrderedDict[CacheEngineKey, float] = OrderedDict()
+
+    def is_known_missing(self, key: CacheEngineKey) -> bool:
+        with self.lock:
+            deadline = self.entries.get(key)
+            if deadline is None:
+                return False
+            if deadline < time.monotonic():
+                del self.entries[key]
+                return False
             return True
-        return False
 
-    def _try_to_read_metadata(self, key: CacheEngineKey) -> Optional[DiskCacheMetadata]:
-        path, subdir_key, _, _ = self._key_to_path(key)
-        path += _METADATA_FILE_SUFFIX
+    def add(self, key: CacheEngineKey) -> None:
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = time.monotonic() + self.ttl
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def discard(self, key: CacheEngineKey) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class GdsIndexScan:
+    """
+    Tracks the startup scan of the file-per-chunk layout, one leaf
+    directory (`<root>/<l1>/<l2>`) at a time. Directories are handed out
+    most recently modified first, and a lookup in a directory that has not
+    been scanned yet scans it on the spot, so the backend answers lookups
+    while the scan is still running. After `time_budget` seconds or
+    `entry_budget` indexed entries the background scan stops and the
+    remaining directories are only scanned on demand.
+    """
+
+    def __init__(
+        self,
+        scan_fn: Callable[[str], int],
+        time_budget: float = 0.0,
+        entry_budget: int = 0,
+    ):
+        self.scan_fn = scan_fn
+        self.time_budget = time_budget
+        self.entry_budget = entry_budget
+        self.lock = threading.Lock()
+        # (-mtime, dir), most recently modified first
+        self.pending: List[Tuple[float, str]] = []
+        self.scanning: Dict[str, threading.Event] = {}
+        self.scanned: Set[str] = set()
+        # Directories found by the enumeration, and how many of them are
+        # scanned. Lookups may also scan directories that do not exist.
+        self.known: Set[str] = set()
+        self.num_scanned_known = 0
+        self.num_entries = 0
+        self.num_on_demand = 0
+        self.start = time.perf_counter()
+        self.enumerated = False
+
+    def add(self, dirs: List[Tuple[str, float]]) -> None:
+        with self.lock:
+            for path, mtime in dirs:
+                if path in self.known:
+                    continue
+                self.known.add(path)
+                if path in self.scanned:
+                    self.num_scanned_known += 1
+                else:
+                    heapq.heappush(self.pending, (-mtime, path))
+
+    @property
+    def budget_exhausted(self) -> bool:
+        if self.time_budget > 0:
+            if time.perf_counter() - self.start >= self.time_budget:
+                return True
+        return self.entry_budget > 0 and self.num_entries >= self.entry_budget
+
+    @property
+    def done(self) -> bool:
+        with self.lock:
+            return self.enumerated and self.num_scanned_known >= len(self.known)
+
+    def next(self) -> Optional[str]:
+        """
+        The next directory for the background scan, None when there is
+        nothing left or the budget is spent.
+        """
+        if self.budget_exhausted:
+            return None
+        with self.lock:
+            while self.pending:
+                _, path = heapq.heappop(self.pending)
+                if path not in self.scanned and path not in self.scanning:
+                    return path
+        return None
+
+    def ensure(self, path: str, on_demand: bool = False) -> bool:
+        """
+        Scan `path` unless it was already scanned, waiting for the scan if
+        another thread is running it. Returns False if it had been scanned
+        before.
+        """
+        with self.lock:
+            if path in self.scanned:
+                return False
+            event = self.scanning.get(path)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self.scanning[path] = event
+        if not owner:
+            event.wait()
+            return True
+        count = 0
+        try:
+            count = self.scan_fn(path)
+        except OSError as e:
+            logger.error(f"Failed to scan {path}: {e}")
+        finally:
+            with self.lock:
+                self.scanned.add(path)
+                if path in self.known:
+                    self.num_scanned_known += 1
+                self.num_entries += count
+                if on_demand:
+                    self.num_on_demand += 1
+                del self.scanning[path]
+            event.set()
+        return True
+
+    def progress(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "scanned_dirs": self.num_scanned_known,
+                "total_dirs": len(self.known),
+                "entries": self.num_entries,
+                "on_demand_dirs": self.num_on_demand,
+                "elapsed": time.perf_counter() - self.start,
+                "enumerated": self.enumerated,
+            }
+
+
+class GdsEvictionPolicy:
+    """
+    Decides which entries of the GdsBackend hot cache to evict when the tier
+    is over `max_gds_size`. Called with the backend's hot lock held.
+    """
+
+    def on_hit(
+        self,
+        key: CacheEngineKey,
+        hot_cache: "OrderedDict[CacheEngineKey, GdsCacheMetadata]",
+    ) -> None:
+        pass
+
+    def victims(
+        self,
+        hot_cache: "OrderedDict[CacheEngineKey, GdsCacheMetadata]",
+        nbytes: int,
+        footprint,
+    ) -> List[CacheEngineKey]:
+        """
+        Returns unpinned keys, oldest first, until they free `nbytes`.
+        """
+        victims = []
+        freed = 0
+        for key, entry in hot_cache.items():
+            if freed >= nbytes:
+                break
+            if entry.is_pinned:
+                continue
+            victims.append(key)
+            freed += footprint(entry)
+        return victims
+
+
+class FIFOGdsEvictionPolicy(GdsEvictionPolicy):
+    pass
+
+
+class LRUGdsEvictionPolicy(GdsEvictionPolicy):
+    def on_hit(
+        self,
+        key: CacheEngineKey,
+        hot_cache: "OrderedDict[CacheEngineKey, GdsCacheMetadata]",
+    ) -> None:
+        if key in hot_cache:
+            hot_cache.move_to_end(key)
+
+
+_EVICTION_POLICIES = {
+    "lru": LRUGdsEvictionPolicy,
+    "fifo": FIFOGdsEvictionPolicy,
+}
+
+
+class GdsAdmissionPolicy:
+    """
+    Decides which chunks offered to the GdsBackend are written. A put call
+    offers the chunks of one request in prefix order, and a chunk is only
+    useful if the chunks before it can be found too, so a policy admits a
+    leading run of them.
+    """
+
+    def __init__(self, config: LMCacheEngineConfig):
+        pass
+
+    def admit(
+        self,
+        keys: List[CacheEngineKey],
+        memory_objs: List[MemoryObj],
+        victim: Callable[[int], Optional[CacheEngineKey]],
+    ) -> int:
+        """
+        Returns how many of the leading chunks are admitted. `victim(nbytes)`
+        returns the key that would be evicted to make room for `nbytes`, or
+        None if they fit.
+        """
+        return len(keys)
+
+    def on_hit(self, key: CacheEngineKey) -> None:
+        pass
+
+
+class MinPrefixGdsAdmissionPolicy(GdsAdmissionPolicy):
+    """
+    Skips prompts shorter than `gds_admission_min_tokens` tokens, short
+    prefixes are recomputed about as fast as they are loaded. The prefix
+    length is where the last chunk of the put ends in the prompt, so a long
+    prompt stored over several calls is admitted and a short one stored in
+    a single call is not. Chunks without their positions count from the
+    start of the put.
+    """
+
+    def __init__(self, config: LMCacheEngineConfig):
+        min_tokens = get_extra_config_int("gds_admission_min_tokens", config)
+        if min_tokens is None:
+            min_tokens = _DEFAULT_ADMISSION_MIN_TOKENS
+        self.min_tokens = min_tokens
+
+    def admit(
+        self,
+        keys: List[CacheEngineKey],
+        memory_objs: List[MemoryObj],
+        victim: Callable[[int], Optional[CacheEngineKey]],
+    ) -> int:
+        prefix = 0
+        for memory_obj in memory_objs:
+            positions = getattr(memory_obj.metadata, "cached_positions", None)
+            if positions is not None and len(positions) > 0:
+                prefix = max(prefix, int(positions[-1]) + 1)
+            else:
+                prefix += memory_obj.get_num_tokens()
+        return len(keys) if prefix >= self.min_tokens else 0
+
+
+class TinyLFUGdsAdmissionPolicy(GdsAdmissionPolicy):
+    """
+    TinyLFU: a count-min sketch estimates how often each key was offered or
+    hit. When the tier is full a chunk is only admitted if it is more
+    frequent than the chunk it would evict, and it always needs to have
+    been seen `gds_admission_min_frequency` times. The counters are halved
+    periodically, so the estimate follows recent popularity.
+    """
+
+    def __init__(self, config: LMCacheEngineConfig):
+        width = (
+            get_extra_config_int("gds_admission_sketch_width", config)
+            or _DEFAULT_ADMISSION_SKETCH_WIDTH
+        )
+        # A power of two, so that an index is a mask away from a hash.
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self.counters = np.zeros(_ADMISSION_SKETCH_DEPTH * self.width, np.uint8)
+        self.sample_size = _ADMISSION_SKETCH_SAMPLE_FACTOR * self.width
+        self.additions = 0
+        self.min_frequency = (
+            get_extra_config_int("gds_admission_min_frequency", config) or 1
+        )
+        self.lock = threading.Lock()
+
+    def _indexes(self, key: CacheEngineKey) -> List[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h2 = (h >> 32) | 1
+        mask = self.width - 1
+        return [
+            row * self.width + ((h + row * h2) & mask)
+            for row in range(_ADMISSION_SKETCH_DEPTH)
+        ]
+
+    def _estimate(self, key: CacheEngineKey) -> int:
+        return int(self.counters[self._indexes(key)].min())
+
+    def _record(self, key: CacheEngineKey) -> int:
+        indexes = self._indexes(key)
+        counts = self.counters[indexes]
+        count = int(counts.min())
+        if count < _ADMISSION_SKETCH_MAX_COUNT:
+            count += 1
+            # Conservative update: only the smallest counters grow.
+            self.counters[indexes] = np.maximum(counts, count)
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.counters >>= 1
+            self.additions //= 2
+        return count
+
+    def admit(
+        self,
+        keys: List[CacheEngineKey],
+        memory_objs: List[MemoryObj],
+        victim: Callable[[int], Optional[CacheEngineKey]],
+    ) -> int:
+        nbytes = 0
+        with self.lock:
+            counts = [self._record(key) for key in keys]
+        for i, (count, memory_obj) in enumerate(zip(counts, memory_objs, strict=True)):
+            if count < self.min_frequency:
+                return i
+            nbytes += memory_obj.get_size()
+            victim_key = victim(nbytes)
+            if victim_key is not None:
+                with self.lock:
+                    victim_count = self._estimate(victim_key)
+                if count <= victim_count:
+                    return i
+        return len(keys)
+
+    def on_hit(self, key: CacheEngineKey) -> None:
+        with self.lock:
+            self._record(key)
+
+
+class TokenBucketGdsAdmissionPolicy(GdsAdmissionPolicy):
+    """
+    Caps the write bandwidth spent on the tier at
+    `gds_admission_write_mb_per_s`, with bursts of up to
+    `gds_admission_burst_mb`. Put it last, so that only chunks the other
+    policies admit spend the budget.
+    """
+
+    def __init__(self, config: LMCacheEngineConfig):
+        rate_mb = get_extra_config_float("gds_admission_write_mb_per_s", config)
+        if rate_mb is None:
+            rate_mb = _DEFAULT_ADMISSION_WRITE_MB_PER_S
+        self.rate = rate_mb * 1024**2
+        burst_mb = get_extra_config_float("gds_admission_burst_mb", config)
+        self.burst = burst_mb * 1024**2 if burst_mb is not None else self.rate
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def admit(
+        self,
+        keys: List[CacheEngineKey],
+        memory_objs: List[MemoryObj],
+        victim: Callable[[int], Optional[CacheEngineKey]],
+    ) -> int:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            for i, memory_obj in enumerate(memory_objs):
+                if self.tokens < memory_obj.get_size():
+                    return i
+                self.tokens -= memory_obj.get_size()
+        return len(keys)
+
+
+_ADMISSION_POLICIES = {
+    "min_prefix": MinPrefixGdsAdmissionPolicy,
+    "tinylfu": TinyLFUGdsAdmissionPolicy,
+    "token_bucket": TokenBucketGdsAdmissionPolicy,
+}
+
+
+class GdsSegmentLog:
+    """
+    Append-only segment files for the GDS tier.
+
+    Instead of one file (plus temp file, rename and sidecar) per chunk,
+    chunks are appended as records into large preallocated segment files.
+    A record is the packed metadata block followed by the payload, padded to
+    `_SEGMENT_ALIGN`, so persisting a chunk costs one aligned write at an
+    offset reserved here and no metadata operations on the filesystem.
+
+    Segments are named `{writer_id}-{seq}.kvlog`, so several writers can
+    share one directory. A writer only appends to and compacts its own
+    segments. The metadata block is written after the payload, so a torn
+    record is never visible to the scan.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        writer_id: str,
+        segment_size: int,
+        compaction_threshold: float,
+    ):
+        assert segment_size % _SEGMENT_ALIGN == 0
+        self.dir = os.path.join(root, _SEGMENT_DIR)
+        os.makedirs(self.dir, exist_ok=True)
+        self.writer_id = writer_id
+        self.segment_size = segment_size
+        self.compaction_threshold = compaction_threshold
+
+        self.lock = threading.Lock()
+        # segment path -> bytes reserved / bytes still referenced by the index
+        self.used_bytes: Dict[str, int] = {}
+        self.live_bytes: Dict[str, int] = {}
+        # segment path -> keys whose newest record lives in that segment
+        self.segment_keys: Dict[str, Set[CacheEngineKey]] = {}
+        # segment path -> number of in-flight reads
+        self.readers: Dict[str, int] = {}
+        # segment path -> records reserved and not committed yet
+        self.pending: Dict[str, int] = {}
+        # compacted segments waiting for their readers to drain
+        self.retired: Set[str] = set()
+        self.fds: Dict[str, int] = {}
+        # Called with the path of every segment once it is deleted.
+        self.on_delete: Optional[Callable[[str], None]] = None
+
+        self.next_seq = self._max_own_seq() + 1
+        self.active_path: Optional[str] = None
+        self.active_offset = 0
+        # Preallocated segments (path, fd) to switch to once the active one
+        # is full. One thread at a time preallocates, without the lock.
+        self.spares: List[Tuple[str, int]] = []
+        self.preallocating = False
+        self.spare_ready = threading.Condition(self.lock)
+
+    @staticmethod
+    def parse_name(path: str) -> Optional[Tuple[str, int]]:
+        """
+        Returns the writer id and sequence number of a segment file name.
+        """
+        name = os.path.basename(path)
+        if not name.endswith(_SEGMENT_FILE_SUFFIX):
+            return None
+        writer_id, _, seq = name[: -len(_SEGMENT_FILE_SUFFIX)].rpartition("-")
+        if not writer_id or not seq.isdigit():
+            return None
+        return writer_id, int(seq)
+
+    def _max_own_seq(self) -> int:
+        max_seq = -1
+        with os.scandir(self.dir) as it:
+            for entry in it:
+                parsed = self.parse_name(entry.name)
+                if parsed is not None and parsed[0] == self.writer_id:
+                    max_seq = max(max_seq, parsed[1])
+        return max_seq
+
+    def is_own(self, path: str) -> bool:
+        parsed = self.parse_name(path)
+        return parsed is not None and parsed[0] == self.writer_id
+
+    def list_segments(self) -> List[str]:
+        with os.scandir(self.dir) as it:
+            return sorted(
+                entry.path
+                for entry in it
+                if entry.is_file() and entry.name.endswith(_SEGMENT_FILE_SUFFIX)
+            )
+
+    @staticmethod
+    def record_size(payload_nbytes: int) -> int:
+        return align_up(_METADATA_MAX_SIZE + payload_nbytes, _SEGMENT_ALIGN)
+
+    def _create_segment(self) -> Tuple[str, int]:
+        """
+        Creates and preallocates a segment file. Runs without the lock, as
+        preallocating a segment can take a while.
+        """
+        while True:
+            with self.lock:
+                seq = self.next_seq
+                self.next_seq += 1
+            path = os.path.join(
+                self.dir, f"{self.writer_id}-{seq:08d}{_SEGMENT_FILE_SUFFIX}"
+            )
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                continue
+            break
+        try:
+            os.posix_fallocate(fd, 0, self.segment_size)
+        except OSError:
+            # Not every filesystem supports fallocate, a sparse file is
+            # still correct, only less friendly to the allocator.
+            os.ftruncate(fd, self.segment_size)
+        return path, fd
+
+    def _preallocate(self) -> None:
+        spare = None
+        try:
+            spare = self._create_segment()
+        finally:
+            with self.lock:
+                self.preallocating = False
+                if spare is not None:
+                    self.spares.append(spare)
+                self.spare_ready.notify_all()
+
+    def _place_locked(self, sizes: List[int]) -> Optional[List[Tuple[str, int]]]:
+        """
+        Places records back to back in the active segment, switching to a
+        spare if they don't fit. Returns None if there is no spare.
+        """
+        total = sum(sizes)
+        if self.active_path is None or self.active_offset + total > self.segment_size:
+            if not self.spares:
+                return None
+            path, fd = self.spares.pop(0)
+            self.fds[path] = fd
+            self.used_bytes[path] = 0
+            self.live_bytes[path] = 0
+            self.segment_keys[path] = set()
+            self.active_path = path
+            self.active_offset = 0
+            logger.info(f"Opened GDS segment {path}")
+        path = self.active_path
+        placements = []
+        for size in sizes:
+            placements.append((path, self.active_offset))
+            self.active_offset += size
+        self.used_bytes[path] += total
+        self.pending[path] = self.pending.get(path, 0) + len(sizes)
+        return placements
+
+    def _reserve(self, sizes: List[int]) -> List[Tuple[str, int]]:
+        while True:
+            with self.lock:
+                placements = self._place_locked(sizes)
+                if placements is None and self.preallocating:
+                    self.spare_ready.wait()
+                    continue
+                # Keep a spare ready, so that writers rarely wait for one.
+                preallocate = not self.spares and not self.preallocating
+                if preallocate:
+                    self.preallocating = True
+            if preallocate:
+                self._preallocate()
+            if placements is not None:
+                return placements
+
+    def reserve(self, payload_nbytes: int) -> Tuple[str, int]:
+        """
+        Reserve space for one record, returns the segment path and the
+        offset of the record (i.e. of its metadata block).
+        """
+        size = self.record_size(payload_nbytes)
+        if size > self.segment_size:
+            raise RuntimeError(
+                f"Chunk of {payload_nbytes} bytes does not fit into a "
+                f"segment of {self.segment_size} bytes"
+            )
+        return self._reserve([size])[0]
+
+    def reserve_many(self, payload_nbytes: List[int]) -> List[Tuple[str, int]]:
+        """
+        Reserve back to back records in one segment, so that the chunks of a
+        request stay adjacent on disk. Falls back to separate reservations
+        if they can't fit into one segment.
+        """
+        sizes = [self.record_size(nbytes) for nbytes in payload_nbytes]
+        if sum(sizes) > self.segment_size:
+            return [self.reserve(nbytes) for nbytes in payload_nbytes]
+        return self._reserve(sizes)
+
+    def commit(self, path: str) -> None:
+        """
+        Marks a reserved record as written (or abandoned) and indexed, a
+        segment with records in flight is neither compacted nor deleted.
+        """
+        with self.lock:
+            self.pending[path] -= 1
+            if self.pending[path] == 0:
+                del self.pending[path]
+                self._maybe_delete_locked(path)
+
+    def get_fd(self, path: str) -> int:
+        with self.lock:
+            fd = self.fds.get(path)
+            if fd is None:
+                fd = os.open(path, os.O_RDWR)
+                self.fds[path] = fd
+            return fd
+
+    def track(self, path: str, key: CacheEngineKey, payload_nbytes: int) -> None:
+        size = self.record_size(payload_nbytes)
+        with self.lock:
+            # Until a scan tells otherwise, a segment we did not write in
+            # this run counts as full.
+            self.used_bytes.setdefault(path, self.segment_size)
+            self.live_bytes[path] = self.live_bytes.get(path, 0) + size
+            self.segment_keys.setdefault(path, set()).add(key)
+
+    def untrack(self, path: str, key: CacheEngineKey, payload_nbytes: int) -> None:
+        size = self.record_size(payload_nbytes)
+        with self.lock:
+            if path in self.live_bytes:
+                self.live_bytes[path] -= size
+            keys = self.segment_keys.get(path)
+            if keys is not None:
+                keys.discard(key)
+
+    def acquire_read(self, path: str) -> bool:
+        """
+        Keeps `path` from being deleted until release_read. Fails for a
+        segment that is retired or gone, the record has moved then.
+        """
+        with self.lock:
+            if path in self.retired or path not in self.used_bytes:
+                return False
+            self.readers[path] = self.readers.get(path, 0) + 1
+            return True
+
+    def release_read(self, path: str) -> None:
+        with self.lock:
+            self.readers[path] -= 1
+            if self.readers[path] == 0:
+                del self.readers[path]
+                self._maybe_delete_locked(path)
+
+    def compaction_candidates(self) -> List[str]:
+        candidates = []
+        with self.lock:
+            for path, used in self.used_bytes.items():
+                if path == self.active_path or path in self.retired:
+                    continue
+                if not self.is_own(path) or used == 0 or path in self.pending:
+                    continue
+                if self.live_bytes.get(path, 0) < used * self.compaction_threshold:
+                    candidates.append(path)
+        return candidates
+
+    def live_keys(self, path: str) -> List[CacheEngineKey]:
+        with self.lock:
+            return list(self.segment_keys.get(path, ()))
+
+    def retire(self, path: str) -> None:
+        with self.lock:
+            self.retired.add(path)
+            self._maybe_delete_locked(path)
+
+    def _maybe_delete_locked(self, path: str) -> None:
+        if (
+            path in self.retired
+            and path not in self.readers
+            and path not in self.pending
+        ):
+            self._delete_locked(path)
+
+    def _delete_locked(self, path: str) -> None:
+        fd = self.fds.pop(path, None)
+        if fd is not None:
+            os.close(fd)
+        self.retired.discard(path)
+        self.used_bytes.pop(path, None)
+        self.live_bytes.pop(path, None)
+        self.segment_keys.pop(path, None)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        if self.on_delete is not None:
+            self.on_delete(path)
+        logger.info(f"Removed compacted GDS segment {path}")
+
+    def scan(self, path: str) -> Iterator[Tuple[int, GdsChunkHeader]]:
+        """
+        Yields (record offset, header) for every committed record of a
+        segment, stopping at the first unwritten record.
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            offset = 0
+            while offset + _METADATA_MAX_SIZE <= size:
+                buf = os.pread(fd, _METADATA_MAX_SIZE, offset)
+                if len(buf) < 8 or struct.unpack("<Q", buf[:8])[0] == 0:
+                    break
+                try:
+                    header = unpack_metadata(buf)
+                except Exception:
+                    logger.warning(
+                        f"Stopping scan of {path} at offset {offset}: "
+                        "invalid record metadata"
+                    )
+                    break
+                yield offset, header
+                offset += self.record_size(header.nbytes)
+        finally:
+            os.close(fd)
+        with self.lock:
+            self.used_bytes[path] = offset
+
+    def close(self) -> None:
+        with self.lock:
+            for fd in self.fds.values():
+                os.close(fd)
+            self.fds.clear()
+            for path, fd in self.spares:
+                os.close(fd)
+                os.unlink(path)
+            self.spares.clear()
+
+
+def align_down(value: int, alignment: int) -> int:
+    return value - value % alignment
+
+
+def _check_cuda(res: int) -> None:
+    if res != 0:
+        raise RuntimeError(f"CUDA runtime call failed with code {res}")
+
+
+class GdsIOEngine(metaclass=abc.ABCMeta):
+    """
+    Moves blocks between files and a fixed set of host buffers. Reads and
+    writes of (fd, offset, buffer index, length) are submitted, `reap`
+    waits for at least one of them and returns (buffer index, result)
+    pairs, the result being the number of bytes transferred or -errno.
+    A buffer has at most one I/O in flight.
+    """
+
+    def __init__(self, buffers: List[mmap.mmap]):
+        self.buffers = buffers
+        self.views = [memoryview(buf) for buf in buffers]
+
+    @abc.abstractmethod
+    def submit_read(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def submit_write(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def reap(self) -> List[Tuple[int, int]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Releases what the engine holds, called with no I/O in flight.
+        """
+
+
+class SyncGdsIOEngine(GdsIOEngine):
+    """
+    preadv/pwritev on the calling thread, the I/O is done on submit.
+    """
+
+    def __init__(self, buffers: List[mmap.mmap]):
+        super().__init__(buffers)
+        self.completed: List[Tuple[int, int]] = []
+
+    def _run(self, func, fd: int, offset: int, buffer: int, length: int) -> None:
+        try:
+            res = func(fd, [self.views[buffer][:length]], offset)
+        except OSError as e:
+            res = -(e.errno or errno.EIO)
+        self.completed.append((buffer, res))
+
+    def submit_read(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        self._run(os.preadv, fd, offset, buffer, length)
+
+    def submit_write(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        self._run(os.pwritev, fd, offset, buffer, length)
+
+    def reap(self) -> List[Tuple[int, int]]:
+        completed, self.completed = self.completed, []
+        return completed
+
+
+class ThreadPoolGdsIOEngine(GdsIOEngine):
+    """
+    preadv/pwritev on a thread pool shared by all the engines of a backend,
+    so that one caller keeps several I/Os in flight.
+    """
+
+    def __init__(self, buffers: List[mmap.mmap], executor: ThreadPoolExecutor):
+        super().__init__(buffers)
+        self.executor = executor
+        self.inflight: Dict[Future, int] = {}
+
+    def _submit(self, func, fd: int, offset: int, buffer: int, length: int) -> None:
+        future = self.executor.submit(func, fd, [self.views[buffer][:length]], offset)
+        self.inflight[future] = buffer
+
+    def submit_read(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        self._submit(os.preadv, fd, offset, buffer, length)
+
+    def submit_write(self, fd: int, offset: int, buffer: int, length: int) -> None:
+        self._submit(os.pwritev, fd, offset, buffer, length)
+
+    def reap(self) -> List[Tuple[int, int]]:
+        done, _ = wait_futures(self.inflight, return_when=FIRST_COMPLETED)
+        completed = []
+        for future in done:
+            buffer = self.inflight.pop(future)
+            try:
+                res = future.result()
+            except OSError as e:
+                res = -(e.errno or errno.EIO)
+            completed.append((buffer, res))
+        return completed
+
+
+class _BounceRing:
+    """
+    The pinned buffers, the I/O engine, the CUDA stream and the per-buffer
+    events of one I/O thread. They live as long as the thread or until the
+    engine is closed. `lock` is held by the thread while it uses the ring,
+    so that a close waits for the I/O in progress.
+    """
+
+    def __init__(
+        self,
+        block_size: int,
+        depth: int,
+        cudart: Optional[ctypes.CDLL],
+        io_engine_factory: Callable[[List[mmap.mmap]], GdsIOEngine],
+    ):
+        self.cudart = cudart
+        # Anonymous mappings are page aligned, as O_DIRECT requires.
+        self.buffers = [mmap.mmap(-1, block_size) for _ in range(depth)]
+        self.addrs = [
+            ctypes.addressof(ctypes.c_char.from_buffer(buf)) for buf in self.buffers
+        ]
+        self.io = io_engine_factory(self.buffers)
+        self.pending = [False] * depth
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stream = ctypes.c_void_p()
+        self.events = [ctypes.c_void_p() for _ in range(depth)]
+        self.registered = False
+        if cudart is None:
+            return
+        _check_cuda(cudart.cudaStreamCreate(ctypes.byref(self.stream)))
+        for event in self.events:
+            _check_cuda(cudart.cudaEventCreate(ctypes.byref(event)))
+        # Pinned, so that the copies are truly asynchronous. Pageable
+        # buffers still work, the copies are just synchronous.
+        self.registered = all(
+            cudart.cudaHostRegister(
+                ctypes.c_void_p(addr), ctypes.c_size_t(block_size), 0
+            )
+            == 0
+            for addr in self.addrs
+        )
+
+    def wait(self, slot: int) -> None:
+        if self.pending[slot]:
+            assert self.cudart is not None
+            _check_cuda(self.cudart.cudaEventSynchronize(self.events[slot]))
+            self.pending[slot] = False
+
+    def wait_all(self) -> None:
+        for slot in range(len(self.pending)):
+            self.wait(slot)
+
+    def close(self) -> None:
+        self.wait_all()
+        self.closed = True
+        self.io.close()
+        if self.cudart is None:
+            return
+        if self.registered:
+            for addr in self.addrs:
+                self.cudart.cudaHostUnregister(ctypes.c_void_p(addr))
+        for event in self.events:
+            self.cudart.cudaEventDestroy(event)
+        self.cudart.cudaStreamDestroy(self.stream)
+
+
+class GdsBounceEngine:
+    """
+    The I/O path used when cuFile is not. Instead of mapping the file, a
+    chunk is moved in blocks of `block_size` through a ring of `depth`
+    pinned host buffers. A read keeps reads (O_DIRECT when the fd allows
+    it) of the next blocks in flight in the free buffers while the copies of
+    the completed ones to the destination run on the thread's stream. A
+    write copies the next blocks into the free buffers while the filled
+    ones are being written. The file I/O itself is done by a GdsIOEngine.
+
+    `cudart` may be None, then only host destinations are supported, which
+    is what makes this testable without a GPU.
+    """
+
+    def __init__(
+        self,
+        block_size: int,
+        depth: int,
+        cudart: Optional[ctypes.CDLL] = None,
+        device_index: Optional[int] = None,
+        io_engine_factory: Optional[Callable[[List[mmap.mmap]], GdsIOEngine]] = None,
+    ):
+        self.block_size = align_up(block_size, _DIRECT_IO_ALIGN)
+        self.depth = depth
+        self.cudart = cudart
+        self.device_index = device_index
+        self.io_engine_factory = io_engine_factory or SyncGdsIOEngine
+        self.local = threading.local()
+        # Every thread's ring, for close.
+        self.rings: List[_BounceRing] = []
+        self.rings_lock = threading.Lock()
+        self.closed = False
+
+    def _ring(self) -> _BounceRing:
+        """
+        The calling thread's ring, locked, the caller releases `ring.lock`.
+        """
+        ring = getattr(self.local, "ring", None)
+        if ring is None:
+            if self.cudart is not None and self.device_index is not None:
+                _check_cuda(self.cudart.cudaSetDevice(self.device_index))
+            ring = _BounceRing(
+                self.block_size, self.depth, self.cudart, self.io_engine_factory
+            )
+            with self.rings_lock:
+                if self.closed:
+                    ring.close()
+                else:
+                    self.rings.append(ring)
+            self.local.ring = ring
+        ring.lock.acquire()
+        if ring.closed:
+            ring.lock.release()
+            raise RuntimeError("The GDS bounce engine is closed")
+        return ring
+
+    def close(self) -> None:
+        """
+        Tears down the rings of all the threads, waiting for the I/O each is
+        doing. Reads and writes fail after this.
+        """
+        with self.rings_lock:
+            self.closed = True
+            rings, self.rings = self.rings, []
+        for ring in rings:
+            with ring.lock:
+                ring.close()
+
+    def _copy(
+        self,
+        ring: _BounceRing,
+        slot: int,
+        src: int,
+        dst: int,
+        nbytes: int,
+        kind: Optional[int],
+    ) -> None:
+        """
+        Copies between a ring buffer and the caller's memory, asynchronously
+        on the ring's stream for a `kind` of cudaMemcpy, else with memmove.
+        """
+        if kind is None:
+            ctypes.memmove(dst, src, nbytes)
+            return
+        assert self.cudart is not None, "device copies need the CUDA runtime"
+        _check_cuda(
+            self.cudart.cudaMemcpyAsync(
+                ctypes.c_void_p(dst),
+                ctypes.c_void_p(src),
+                ctypes.c_size_t(nbytes),
+                ctypes.c_int(kind),
+                ring.stream,
+            )
+        )
+        _check_cuda(self.cudart.cudaEventRecord(ring.events[slot], ring.stream))
+        ring.pending[slot] = True
+
+    @staticmethod
+    def _drain(ring: _BounceRing, inflight: Dict[int, Any]) -> None:
+        # Never leave an I/O running into a buffer after an error.
+        while inflight:
+            for slot, _ in ring.io.reap():
+                inflight.pop(slot, None)
+
+    def read(
+        self,
+        fd: int,
+        file_offset: int,
+        dst: int,
+        nbytes: int,
+        to_device: bool = True,
+    ) -> int:
+        """
+        Reads `nbytes` at `file_offset` of `fd` to the address `dst`, returns
+        the number of bytes read, less than `nbytes` only at end of file.
+        """
+        ring = self._ring()
+        start = align_down(file_offset, _DIRECT_IO_ALIGN)
+        head = file_offset - start
+        end = head + nbytes
+        nblocks = -(-align_up(end, _DIRECT_IO_ALIGN) // self.block_size)
+        kind = _CUDA_MEMCPY_HOST_TO_DEVICE if to_device else None
+        free = list(range(self.depth))
+        # slot -> (block, length)
+        inflight: Dict[int, Tuple[int, int]] = {}
+        next_block = 0
+        done = 0
+        eof = False
+        try:
+            while inflight or (next_block < nblocks and not eof):
+                while free and next_block < nblocks and not eof:
+                    slot = free.pop()
+                    ring.wait(slot)
+                    block_start = next_block * self.block_size
+                    length = min(
+                        self.block_size,
+                        align_up(end, _DIRECT_IO_ALIGN) - block_start,
+                    )
+                    ring.io.submit_read(fd, start + block_start, slot, length)
+                    inflight[slot] = (next_block, length)
+                    next_block += 1
+                for slot, res in ring.io.reap():
+                    block, length = inflight.pop(slot)
+                    free.append(slot)
+                    if res < 0:
+                        raise OSError(-res, os.strerror(-res))
+                    if res < length:
+                        eof = True
+                    block_start = block * self.block_size
+                    # The part of the payload that arrived in this block.
+                    lo = max(block_start, head)
+                    hi = min(block_start + res, end)
+                    if hi <= lo:
+                        continue
+                    self._copy(
+                        ring,
+                        slot,
+                        ring.addrs[slot] + lo - block_start,
+                        dst + lo - head,
+                        hi - lo,
+                        kind,
+                    )
+                    done += hi - lo
+        finally:
+            self._drain(ring, inflight)
+            ring.wait_all()
+            ring.lock.release()
+        return done
+
+    def write(
+        self,
+        fd: int,
+        file_offset: int,
+        src: int,
+        nbytes: int,
+        from_device: bool = True,
+        prefix: bytes = b"",
+    ) -> int:
+        """
+        Writes `prefix` followed by `nbytes` at the address `src` to `fd` at
+        the aligned `file_offset`. The last block is zero padded to the
+        O_DIRECT alignment, returns the padded length written.
+        """
+        assert file_offset % _DIRECT_IO_ALIGN == 0
+        assert len(prefix) <= self.block_size
+        ring = self._ring()
+        total = len(prefix) + nbytes
+        nblocks = -(-total // self.block_size)
+        kind = _CUDA_MEMCPY_DEVICE_TO_HOST if from_device else None
+
+        def fill(slot: int, block: int) -> int:
+            start = block * self.block_size
+            end = min(start + self.block_size, total)
+            addr = ring.addrs[slot]
+            if start < len(prefix):
+                chunk = prefix[start : min(end, len(prefix))]
+                ctypes.memmove(addr, chunk, len(chunk))
+            payload_start = max(start, len(prefix))
+            if payload_start < end:
+                self._copy(
+                    ring,
+                    slot,
+                    src + payload_start - len(prefix),
+                    addr + payload_start - start,
+                    end - payload_start,
+                    kind,
+                )
+            length = align_up(end - start, _DIRECT_IO_ALIGN)
+            if length > end - start:
+                ctypes.memset(addr + end - start, 0, length - (end - start))
+            return length
+
+        free = list(range(self.depth))
+        # slot -> length
+        inflight: Dict[int, int] = {}
+        next_block = 0
+        written = 0
+        try:
+            while inflight or next_block < nblocks:
+                # Start the copies of all the blocks that have a buffer
+                # before waiting for any of them.
+                filled = []
+                while free and next_block < nblocks:
+                    slot = free.pop()
+                    filled.append((slot, next_block, fill(slot, next_block)))
+                    next_block += 1
+                for slot, block, length in filled:
+                    ring.wait(slot)
+                    ring.io.submit_write(
+                        fd, file_offset + block * self.block_size, slot, length
+                    )
+                    inflight[slot] = length
+                for slot, res in ring.io.reap():
+                    length = inflight.pop(slot)
+                    free.append(slot)
+                    if res < 0:
+                        raise OSError(-res, os.strerror(-res))
+                    if res != length:
+                        raise OSError(
+                            errno.EIO, f"short write of {res} out of {length} bytes"
+                        )
+                    written += length
+        finally:
+            self._drain(ring, inflight)
+            ring.wait_all()
+            ring.lock.release()
+        return written
+
+
+class GdsCodec(metaclass=abc.ABCMeta):
+    """
+    Lossless compression of chunk payloads for the non-cuFile path. A
+    payload is cut into frames of `frame_size` bytes that are compressed
+    independently on `executor`, so several cores work on one chunk:
+
+        frame size, frame count, compressed size of every frame (u32 each),
+        followed by the compressed frames.
+    """
+
+    id = _CODEC_NONE
+    name = "none"
+
+    def __init__(self, level: int, frame_size: int, executor: ThreadPoolExecutor):
+        self.level = level
+        self.frame_size = frame_size
+        self.executor = executor
+
+    @abc.abstractmethod
+    def compress_frame(self, data: memoryview) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def decompress_frame(self, data: memoryview, raw_size: int) -> bytes:
+        raise NotImplementedError
+
+    def compress(self, data: memoryview) -> bytes:
+        frames = [
+            data[start : start + self.frame_size]
+            for start in range(0, len(data), self.frame_size)
+        ]
+        compressed = list(self.executor.map(self.compress_frame, frames))
+        header = struct.pack(
+            f"<II{len(frames)}I",
+            self.frame_size,
+            len(frames),
+            *(len(frame) for frame in compressed),
+        )
+        return b"".join([header, *compressed])
+
+    def decompress(self, data: memoryview, out: memoryview) -> None:
+        if len(data) < 8:
+            raise ValueError("truncated compressed payload")
+        frame_size, num_frames = struct.unpack_from("<II", data)
+        pos = 8 + 4 * num_frames
+        if pos > len(data):
+            raise ValueError("truncated compressed payload")
+        sizes = struct.unpack_from(f"<{num_frames}I", data, 8)
+        frames = []
+        for i, size in enumerate(sizes):
+            start = i * frame_size
+            if start >= len(out):
+                raise ValueError("invalid compressed payload")
+            raw_size = min(frame_size, len(out) - start)
+            frames.append((data[pos : pos + size], start, raw_size))
+            pos += size
+        if pos != len(data) or num_frames * frame_size < len(out):
+            raise ValueError("invalid compressed payload")
+
+        def decompress_one(frame: Tuple[memoryview, int, int]) -> None:
+            src, start, raw_size = frame
+            raw = self.decompress_frame(src, raw_size)
+            if len(raw) != raw_size:
+                raise ValueError("invalid compressed frame")
+            out[start : start + raw_size] = raw
+
+        for _ in self.executor.map(decompress_one, frames):
+            pass
+
+
+class Lz4GdsCodec(GdsCodec):
+    id = 1
+    name = "lz4"
+
+    def __init__(self, level: int, frame_size: int, executor: ThreadPoolExecutor):
+        super().__init__(level, frame_size, executor)
+        # Third Party
+        import lz4.block
+
+        self.lz4 = lz4.block
+
+    def compress_frame(self, data: memoryview) -> bytes:
+        if self.level > 0:
+            return self.lz4.compress(
+                data,
+                mode="high_compression",
+                compression=self.level,
+                store_size=False,
+            )
+        return self.lz4.compress(data, store_size=False)
+
+    def decompress_frame(self, data: memoryview, raw_size: int) -> bytes:
+        try:
+            return self.lz4.decompress(data, uncompressed_size=raw_size)
+        except self.lz4.LZ4BlockError as e:
+            raise ValueError(str(e)) from None
+
+
+class ZstdGdsCodec(GdsCodec):
+    id = 2
+    name = "zstd"
+
+    def __init__(self, level: int, frame_size: int, executor: ThreadPoolExecutor):
+        super().__init__(level, frame_size, executor)
+        # Third Party
+        import zstandard
+
+        self.zstd = zstandard
+        # Compressor objects are not thread safe.
+        self.local = threading.local()
+
+    def compress_frame(self, data: memoryview) -> bytes:
+        compressor = getattr(self.local, "compressor", None)
+        if compressor is None:
+            compressor = self.zstd.ZstdCompressor(level=self.level or 3)
+            self.local.compressor = compressor
+        return compressor.compress(data)
+
+    def decompress_frame(self, data: memoryview, raw_size: int) -> bytes:
+        decompressor = getattr(self.local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self.zstd.ZstdDecompressor()
+            self.local.decompressor = decompressor
+        try:
+            return decompressor.decompress(data, max_output_size=raw_size)
+        except self.zstd.ZstdError as e:
+            raise ValueError(str(e)) from None
+
+
+_CODECS: Dict[str, type] = {codec.name: codec for codec in (Lz4GdsCodec, ZstdGdsCodec)}
+
+
+@dataclass
+class _CachedHandle:
+    handle: Any
+    users: int = 0
+    evicted: bool = False
+
+
+class GdsHandleCache:
+    """
+    LRU cache of open file handles, so that reading a chunk or appending to
+    a segment does not pay the cuFile open and handle registration (or the
+    os.open of the POSIX path) on every call.
+
+    A handle is whatever `open_fn(path, mode)` returns. Handles evicted or
+    invalidated while in use are closed when their last user is done, and
+    callers must invalidate a path before it is renamed over or deleted so
+    a cached handle never points to a stale inode.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        open_fn: Callable[[str, str], Any],
+        close_fn: Callable[[Any], None],
+    ):
+        self.capacity = capacity
+        self.open_fn = open_fn
+        self.close_fn = close_fn
+        self.lock = threading.Lock()
+        self.handles: OrderedDict[Tuple[str, str], _CachedHandle] = OrderedDict()
+
+    @contextmanager
+    def open(self, path: str, mode: str) -> Iterator[Any]:
+        cached = self._acquire(path, mode)
+        try:
+            yield cached.handle
+        finally:
+            self._release(cached)
+
+    def _acquire(self, path: str, mode: str) -> _CachedHandle:
+        with self.lock:
+            cached = self.handles.get((path, mode))
+            if cached is not None:
+                self.handles.move_to_end((path, mode))
+                cached.users += 1
+                return cached
+        handle = self.open_fn(path, mode)
+        to_close = []
+        with self.lock:
+            cached = self.handles.get((path, mode))
+            if cached is None:
+                cached = _CachedHandle(handle)
+                self.handles[(path, mode)] = cached
+            else:
+                # Opened concurrently by another thread, use theirs.
+                to_close.append(handle)
+            cached.users += 1
+            while len(self.handles) > self.capacity:
+                _, victim = self.handles.popitem(last=False)
+                to_close.extend(self._evict_locked(victim))
+        for handle in to_close:
+            self.close_fn(handle)
+        return cached
+
+    def _release(self, cached: _CachedHandle) -> None:
+        with self.lock:
+            cached.users -= 1
+            close = cached.evicted and cached.users == 0
+        if close:
+            self.close_fn(cached.handle)
+
+    @staticmethod
+    def _evict_locked(cached: _CachedHandle) -> List[Any]:
+        cached.evicted = True
+        return [cached.handle] if cached.users == 0 else []
+
+    def invalidate(self, path: str) -> None:
+        to_close = []
+        with self.lock:
+            for handle_key in [k for k in self.handles if k[0] == path]:
+                to_close.extend(self._evict_locked(self.handles.pop(handle_key)))
+        for handle in to_close:
+            self.close_fn(handle)
+
+    def close(self) -> None:
+        to_close = []
+        with self.lock:
+            for cached in self.handles.values():
+                to_close.extend(self._evict_locked(cached))
+            self.handles.clear()
+        for handle in to_close:
+            self.close_fn(handle)
+
+
+class GdsBufferRegistry:
+    """
+    Device memory ranges registered with cuFile once for the lifetime of the
+    backend. cuFile I/O into a registered range skips cuFile's internal
+    bounce buffers and the per-call pinning of the target pages.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # base pointer -> length
+        self.ranges: Dict[int, int] = {}
+        try:
+            # Third Party
+            from cufile import bindings
+
+            self._register = bindings.cuFileBufRegister
+            self._deregister = bindings.cuFileBufDeregister
+        except (ImportError, AttributeError):
+            logger.info("cuFile buffer registration is not available")
+            self._register = None
+            self._deregister = None
+
+    def register(self, base_pointer: int, length: int) -> bool:
+        if self._register is None:
+            return False
+        with self.lock:
+            if base_pointer in self.ranges:
+                return True
+            try:
+                self._register(ctypes.c_void_p(base_pointer), length, 0)
+            except Exception as e:
+                logger.warning(
+                    f"Failed to register {length} bytes at {base_pointer:#x} "
+                    f"with cuFile: {e}"
+                )
+                return False
+            self.ranges[base_pointer] = length
+        logger.info(f"Registered {length} bytes at {base_pointer:#x} with cuFile")
+        return True
+
+    def lookup(self, pointer: int) -> Optional[int]:
+        """
+        Returns the base of the registered range holding `pointer`.
+        """
+        with self.lock:
+            for base, length in self.ranges.items():
+                if base <= pointer < base + length:
+                    return base
+        return None
+
+    def close(self) -> None:
+        with self.lock:
+            ranges, self.ranges = self.ranges, {}
+        assert self._deregister is not None or not ranges
+        for base in ranges:
+            try:
+                self._deregister(ctypes.c_void_p(base))
+            except Exception as e:
+                logger.warning(f"Failed to deregister {base:#x} from cuFile: {e}")
+
+
+class GdsStats:
+    """
+    Prometheus metrics of the GdsBackend instances of a process, next to the
+    ones of LMCacheStatsLogger. Series are labeled with the backend's device
+    and, for transfers, the path a chunk took: cufile, bounce, mmap or
+    compressed.
+
+    They don't go through LMCStatsMonitor: its LMCacheStats has a fixed set
+    of fields, with nothing for a second disk tier, and this patch only
+    replaces the backend and the cache engine. The metrics are registered in
+    the default registry, so LMCacheStatsLogger's endpoint exports them too.
+    The tier's usage is `lmcache:gds_usage_bytes`, the local disk backend
+    keeps `lmcache:local_storage_usage` to itself.
+    """
+
+    _metrics: Optional[Dict[str, Any]] = None
+    _metrics_lock = threading.Lock()
+
+    def __init__(self, device: str):
+        self.device = device
+        metrics = self._get_metrics()
+        self.put_latency = metrics["put_latency"]
+        self.get_latency = metrics["get_latency"]
+        self.bytes_read = metrics["bytes_read"]
+        self.bytes_written = metrics["bytes_written"]
+        self.hits = metrics["lookups"].labels(device=device, result="hit")
+        self.misses = metrics["lookups"].labels(device=device, result="miss")
+        self.dropped_puts = metrics["dropped_puts"].labels(device=device)
+        self.deduplicated_puts = metrics["deduplicated_puts"].labels(device=device)
+        self.rejected_puts = metrics["rejected_puts"].labels(device=device)
+        self.corrupt_chunks = metrics["corrupt_chunks"].labels(device=device)
+        self.write_queue = metrics["write_queue"].labels(device=device)
+        self.inflight_reads = metrics["inflight_reads"].labels(device=device)
+        self.usage = metrics["usage"].labels(device=device)
+        self.index_load = metrics["index_load"].labels(device=device)
+
+    @classmethod
+    def _get_metrics(cls) -> Dict[str, Any]:
+        # Metrics can only be registered once per process.
+        with cls._metrics_lock:
+            if cls._metrics is None:
+                cls._metrics = {
+                    "put_latency": Histogram(
+                        "lmcache:gds_put_latency_seconds",
+                        "Time from admitting a put to the chunk being indexed",
+                        ["device", "path"],
+                        buckets=_LATENCY_BUCKETS,
+                    ),
+                    "get_latency": Histogram(
+                        "lmcache:gds_get_latency_seconds",
+                        "Time to read a chunk into a memory object",
+                        ["device", "path"],
+                        buckets=_LATENCY_BUCKETS,
+                    ),
+                    "bytes_read": Counter(
+                        "lmcache:gds_read_bytes",
+                        "Bytes read from gds_path",
+                        ["device", "path"],
+                    ),
+                    "bytes_written": Counter(
+                        "lmcache:gds_written_bytes",
+                        "Bytes written to gds_path",
+                        ["device", "path"],
+                    ),
+                    "lookups": Counter(
+                        "lmcache:gds_lookups",
+                        "Lookups of the GDS tier by result",
+                        ["device", "result"],
+                    ),
+                    "dropped_puts": Counter(
+                        "lmcache:gds_dropped_puts",
+                        "Puts dropped because the write queue was full",
+                        ["device"],
+                    ),
+                    "deduplicated_puts": Counter(
+                        "lmcache:gds_deduplicated_puts",
+                        "Puts skipped because the chunk was already stored",
+                        ["device"],
+                    ),
+                    "rejected_puts": Counter(
+                        "lmcache:gds_rejected_puts",
+                        "Puts turned away by the admission policies",
+                        ["device"],
+                    ),
+                    "corrupt_chunks": Counter(
+                        "lmcache:gds_corrupt_chunks",
+                        "Chunks that failed their checksum",
+                        ["device"],
+                    ),
+                    "write_queue": Gauge(
+                        "lmcache:gds_write_queue_length",
+                        "Puts queued or being written",
+                        ["device"],
+                        multiprocess_mode="livesum",
+                    ),
+                    "inflight_reads": Gauge(
+                        "lmcache:gds_inflight_reads",
+                        "Reads in flight",
+                        ["device"],
+                        multiprocess_mode="livesum",
+                    ),
+                    "usage": Gauge(
+                        "lmcache:gds_usage_bytes",
+                        "Estimated disk space of the chunks indexed by the GDS tier",
+                        ["device"],
+                        multiprocess_mode="livesum",
+                    ),
+                    "index_load": Gauge(
+                        "lmcache:gds_index_load_seconds",
+                        "Time it took to load the index at startup",
+                        ["device"],
+                        multiprocess_mode="livesum",
+                    ),
+                }
+            return cls._metrics
+
+    def observe_put(self, path: str, seconds: float, nbytes: int) -> None:
+        self.put_latency.labels(device=self.device, path=path).observe(seconds)
+        self.bytes_written.labels(device=self.device, path=path).inc(nbytes)
+
+    def observe_get(self, path: str, seconds: float) -> None:
+        self.get_latency.labels(device=self.device, path=path).observe(seconds)
+
+    def observe_read(self, path: str, nbytes: int) -> None:
+        self.bytes_read.labels(device=self.device, path=path).inc(nbytes)
+
+
+@dataclass
+class _GdsPutJob:
+    key: CacheEngineKey
+    memory_obj: MemoryObj
+    # Bytes reserved against max_gds_size.
+    nbytes: int
+    future: Future
+    # Where the chunk went, filled in by the write worker.
+    path: Optional[str] = None
+    offset: int = _METADATA_MAX_SIZE
+    tmp: Optional[str] = None
+    metadata: Optional[bytes] = None
+    checksum: Optional[int] = None
+    codec: int = _CODEC_NONE
+    # Bytes that went to storage.
+    stored: int = 0
+    error: Optional[Exception] = None
+    start: float = 0.0
+    # The chunk was already stored, by this or another instance.
+    adopted: bool = False
+
+
+@dataclass
+class _GdsSharedRead:
+    """
+    A read of a chunk that concurrent gets of the same key wait for.
+    """
+
+    future: Future
+    # Gets waiting for the read, each gets a reference to the result.
+    waiters: int = 0
+
+
+class GdsBackend(StorageBackendInterface):
+    """
+    Originally based on the open sourced WekaGdsBackend, this is a backend that
+    leverages NVIDIA's cuFile API to issue GDS requests directly to the
+    GDS-supported remote filesystem.  In order to use it, users need to specify
+    `gds_path` and `cufile_buffer_size` in their LMCache config.
+
+    Cache Directory Structure created by this Backend:
+    /{gds_path}/{first_level}/{second_level}/{data & metadata} This structure
+    is semi-arbitrary. We create two levels in the directory hierarchy to
+    parallelize loading the data during initialization in the Python code.
+
+    NOTE: If GPUDirect is not supported on that other filesystem, then CuFile will
+    fall back to POSIX I/O.
+
+    With `gds_paths` in extra_config, a list of `path[:weight]` entries, the
+    chunk files are spread over several directories, see GdsStripes. The
+    manifest and the segments stay under `gds_path`.
+
+    With `gds_metadata_sidecar: false` in extra_config, the metadata is only
+    kept in the header of the data file and no `.metadata` file is written.
+
+    With `gds_use_segment_log: true` in extra_config, chunks are instead
+    appended into preallocated segment files under /{gds_path}/segments, see
+    GdsSegmentLog.
+    """
+
+    def __init__(
+        self,
+        config: LMCacheEngineConfig,
+        loop: asyncio.AbstractEventLoop,
+        memory_allocator: MemoryAllocatorInterface,
+        dst_device: str = "cuda",
+    ):
+        assert dst_device.startswith("cuda")
+        super().__init__(dst_device)
+
+        self.config = config
+        self.loop = loop
+        self.memory_allocator = memory_allocator
+        self.dst_device = dst_device
+
+        assert config.gds_path is not None, "Need to specify gds_path for GdsBackend"
+        self.gds_path = config.gds_path
+        self.fstype = get_fstype(config.gds_path)
+
+        # Log the fstype - this is useful in reports and varying optimizations
+        # based on the kind of fstype used.
+        logger.info(
+            f"GDS backend using fstype '{self.fstype}' on path '{self.gds_path}'"
+        )
+
+        stripes = [(self.gds_path, 1.0)]
+        if config.extra_config is not None and "gds_paths" in config.extra_config:
+            stripes = parse_gds_paths(config.extra_config["gds_paths"])
+        self.stripes = GdsStripes(stripes)
+        if len(self.stripes) > 1:
+            for path, weight in stripes:
+                os.makedirs(path, exist_ok=True)
+                logger.info(
+                    f"GDS backend striping over '{path}' with weight {weight}, "
+                    f"fstype '{get_fstype(path)}'"
+                )
+
+        self.use_cufile = True
+        use_cufile_from_config = False
+
+        if config.extra_config is not None:
+            use_cufile = get_extra_config_bool("use_cufile", config)
+            if use_cufile is not None:
+                self.use_cufile = use_cufile
+                use_cufile_from_config = True
+
+        if self.fstype in ["tmpfs", "overlayfs"]:
+            # TODO: we can replace the auto-detection of unsupported cufile
+            # file systems by doing a small cufile API test on them. If as
+            # read/write test fails, we can fallback to not using cufile APIs.
+            if use_cufile_from_config:
+                logger.warning("No automatic disabling of cufile usage due to fstype")
+            else:
+                logger.info("Automatic disabling of cufile usage due to fstype")
+                self.use_cufile = False
+
+        if self.use_cufile:
+            logger.info("Using cufile")
+            # HACK(Jiayi): cufile import is buggy on some hardware
+            # (e.g., without GPUDirect), so it's temporarily put here.
+            # Third Party
+            import cufile
+
+            self.cudart = None
+            self.cufile = cufile
+            self._cufile_driver = self.cufile.CuFileDriver()
+        else:
+            logger.info("Not using cufile")
+            self.cufile = None
+            self.cudart = ctypes.CDLL("libcudart.so")
+
+        # Without cufile, chunks move through pinned bounce buffers, see
+        # GdsBounceEngine, unless the older mmap paths are asked for.
+        self.bounce_engine: Optional[GdsBounceEngine] = None
+        self.io_executor: Optional[ThreadPoolExecutor] = None
+        self.bounce_direct_io = True
+        fallback_engines = {}
+        for name in ("gds_fallback_read_engine", "gds_fallback_write_engine"):
+            engine = "bounce"
+            if config.extra_config is not None:
+                engine = config.extra_config.get(name, "bounce")
+            if engine not in _FALLBACK_ENGINES:
+                raise RuntimeError(
+                    f"Invalid value `{engine}` for `{name}` in extra_config, "
+                    f"expected one of {list(_FALLBACK_ENGINES)}"
+                )
+            fallback_engines[name] = engine
+        self.bounce_reads = (
+            not self.use_cufile
+            and fallback_engines["gds_fallback_read_engine"] == "bounce"
+        )
+        self.bounce_writes = (
+            not self.use_cufile
+            and fallback_engines["gds_fallback_write_engine"] == "bounce"
+        )
+        # When bounce writes reach the disk: never forced, after every
+        # chunk, or once per segment for a write group.
+        self.bounce_fdatasync = "never"
+        if config.extra_config is not None:
+            self.bounce_fdatasync = config.extra_config.get(
+                "gds_bounce_fdatasync", "never"
+            )
+        if self.bounce_fdatasync not in _FDATASYNC_POLICIES:
+            raise RuntimeError(
+                f"Invalid value `{self.bounce_fdatasync}` for "
+                "`gds_bounce_fdatasync` in extra_config, expected one of "
+                f"{list(_FDATASYNC_POLICIES)}"
+            )
+        if self.bounce_reads or self.bounce_writes:
+            self.bounce_engine = GdsBounceEngine(
+                (
+                    get_extra_config_int("gds_bounce_block_size_kb", config)
+                    or _DEFAULT_BOUNCE_BLOCK_SIZE_KB
+                )
+                * 1024,
+                get_extra_config_int("gds_bounce_buffers", config)
+                or _DEFAULT_BOUNCE_BUFFERS,
+                self.cudart,
+                torch.device(dst_device).index,
+                self._make_io_engine_factory(config),
+            )
+
+        self.use_direct_io = False
+
+        if config.extra_config is not None:
+            use_direct_io = get_extra_config_bool("use_direct_io", config)
+            if use_direct_io is not None:
+                self.use_direct_io = use_direct_io
+
+        # The header at the start of each data file holds the same bytes as
+        # the `.metadata` sidecar. Without the sidecar, the data files are
+        # what the startup scan reads.
+        self.metadata_sidecar = get_extra_config_bool_or(
+            "gds_metadata_sidecar", config, True
+        )
+
+        # New chunks get the 4K JSON header every reader understands, or
+        # with `gds_metadata_version: 2` the binary v2 header of
+        # `gds_metadata_size` bytes. Both are read either way. Only set 2
+        # once every instance sharing the gds_path reads v2, older ones
+        # fail on the chunks it writes. Records of the segment layout keep
+        # the 4K header, their offsets in the manifest assume it.
+        self.metadata_version = (
+            get_extra_config_int("gds_metadata_version", config)
+            or _DEFAULT_METADATA_VERSION
+        )
+        if self.metadata_version not in _METADATA_VERSIONS:
+            raise RuntimeError(
+                f"Invalid value `{self.metadata_version}` for "
+                "`gds_metadata_version` in extra_config, expected one of "
+                f"{list(_METADATA_VERSIONS)}"
+            )
+        self.metadata_size = (
+            get_extra_config_int("gds_metadata_size", config) or _METADATA_MAX_SIZE
+        )
+        if (
+            self.metadata_size % _METADATA_MIN_SIZE
+            or not _METADATA_MIN_SIZE <= self.metadata_size <= _METADATA_MAX_SIZE
+        ):
+            raise RuntimeError(
+                f"Invalid value `{self.metadata_size}` for `gds_metadata_size` "
+                f"in extra_config, expected a multiple of {_METADATA_MIN_SIZE} "
+                f"up to {_METADATA_MAX_SIZE}"
+            )
+        if self.metadata_version == 1 and self.metadata_size != _METADATA_MAX_SIZE:
+            raise RuntimeError(
+                f"`gds_metadata_size` must be {_METADATA_MAX_SIZE} with "
+                "`gds_metadata_version: 1`"
+            )
+
+        # Chunks are written with a payload checksum if `gds_checksum` is
+        # true, off by default as it copies every chunk in device memory to
+        # the host. Reads check it per `gds_verify_reads`: off, sampled (a
+        # `gds_verify_sample_rate` fraction of them) or always. The scrubber
+        # checks every chunk once per `gds_scrub_interval` seconds, reading
+        # at most `gds_scrub_rate_mb` MB/s (0, the default, disables it). It
+        # leaves other writers' segments alone, but chunk files on a shared
+        # gds_path are read by every instance that scrubs, so enable it on
+        # one of them. Corrupt chunks are dropped from the index and moved
+        # to quarantine/.
+        self.write_checksums = get_extra_config_bool_or("gds_checksum", config, False)
+        self.verify_reads = "sampled"
+        if config.extra_config is not None:
+            self.verify_reads = config.extra_config.get("gds_verify_reads", "sampled")
+        if self.verify_reads not in _VERIFY_POLICIES:
+            raise RuntimeError(
+                f"Invalid value `{self.verify_reads}` for `gds_verify_reads` "
+                f"in extra_config, expected one of {list(_VERIFY_POLICIES)}"
+            )
+        self.verify_sample_rate = get_extra_config_float(
+            "gds_verify_sample_rate", config
+        )
+        if self.verify_sample_rate is None:
+            self.verify_sample_rate = _DEFAULT_VERIFY_SAMPLE_RATE
+        scrub_rate_mb = get_extra_config_float("gds_scrub_rate_mb", config)
+        if scrub_rate_mb is None:
+            scrub_rate_mb = _DEFAULT_SCRUB_RATE_MB
+        self.scrub_rate = scrub_rate_mb * 1024**2
+        self.scrub_interval = (
+            get_extra_config_float("gds_scrub_interval", config)
+            or _DEFAULT_SCRUB_INTERVAL
+        )
+        self.num_corrupt_chunks = 0
+        self.checksum_stream: Optional[torch.cuda.Stream] = None
+        if torch.cuda.is_available():
+            self.checksum_stream = torch.cuda.Stream(torch.device(dst_device))
+
+        # Temp files of writes that crashed or failed are deleted once they
+        # are `gds_tmp_max_age` seconds old, which leaves the writes of other
+        # instances sharing gds_path alone. The tree is checked at startup
+        # and every `gds_reap_interval` seconds (0 for startup only).
+        self.tmp_max_age = get_extra_config_float("gds_tmp_max_age", config)
+        if self.tmp_max_age is None:
+            self.tmp_max_age = _DEFAULT_TMP_MAX_AGE
+        self.reap_interval = get_extra_config_float("gds_reap_interval", config)
+        if self.reap_interval is None:
+            self.reap_interval = _DEFAULT_REAP_INTERVAL
+        self.num_reaped_files = 0
+        self.reaped_bytes = 0
+
+        if not os.path.exists(self.gds_path):
+            os.makedirs(self.gds_path, exist_ok=True)
+
+        self.stats = GdsStats(dst_device)
+
+        self.hot_lock = threading.Lock()
+        self.hot_cache: OrderedDict[CacheEngineKey, DiskCacheMetadata] = OrderedDict()
+
+        # With `gds_shared_path: true`, for instances sharing gds_path,
+        # misses of the index are checked on the filesystem, where another
+        # node may have written the chunk, at most every
+        # `gds_negative_lookup_ttl` seconds per key. By default they are not
+        # checked once the index is loaded.
+        self.index_loaded = False
+        self.shared_path = get_extra_config_bool_or("gds_shared_path", config, False)
+        # Instances sharing gds_path publish chunk files with a hard link,
+        # so that only the first writer of a chunk stores it.
+        self.publish_link = self.shared_path
+        self.num_deduplicated_puts = 0
+        negative_lookup_ttl = get_extra_config_float("gds_negative_lookup_ttl", config)
+        if negative_lookup_ttl is None:
+            negative_lookup_ttl = _DEFAULT_NEGATIVE_LOOKUP_TTL
+        self.negative_cache = GdsNegativeCache(
+            negative_lookup_ttl,
+            get_extra_config_int("gds_negative_lookup_entries", config)
+            or _DEFAULT_NEGATIVE_LOOKUP_ENTRIES,
+        )
+        self.metadata_dirs: set[str] = set()
+
+        # Puts being written by key, a put of a key that is already being
+        # written shares the future of that write.
+        self.put_lock = threading.Lock()
+        self.put_tasks: Dict[CacheEngineKey, Future] = {}
+        # Reads in flight by key, concurrent gets of a key share one read.
+        self.shared_reads_lock = threading.Lock()
+        self.shared_reads: Dict[CacheEngineKey, _GdsSharedRead] = {}
+        self.num_shared_gets = 0
+
+        # Seeded from os.urandom, instances sharing gds_path must not pick
+        # the same temp file names.
+        self.rand = random.Random()
+
+        # Identifies the files this instance owns in a shared gds_path.
+        self.writer_lock_fd: Optional[int] = None
+        self.writer_id = self._claim_writer_id(
+            f"{socket.gethostname()}-{self.dst_device.replace(':', '')}"
+        )
+
+        self.segment_log: Optional[GdsSegmentLog] = None
+        if get_extra_config_bool_or("gds_use_segment_log", config, False):
+            if len(self.stripes) > 1:
+                logger.warning(
+                    "The GDS segment log is not striped, all segments go "
+                    f"to {self.gds_path}"
+                )
+            segment_size_mb = (
+                get_extra_config_int("gds_segment_size_mb", config)
+                or _DEFAULT_SEGMENT_SIZE_MB
+            )
+            compaction_threshold = get_extra_config_float(
+                "gds_compaction_threshold", config
+            )
+            if compaction_threshold is None:
+                compaction_threshold = _DEFAULT_COMPACTION_THRESHOLD
+            self.segment_log = GdsSegmentLog(
+                self.gds_path,
+                self.writer_id,
+                align_up(segment_size_mb * 1024**2, _SEGMENT_ALIGN),
+                compaction_threshold,
+            )
+            logger.info(
+                f"GDS backend using segment log of {segment_size_mb} MB "
+                f"segments in {self.segment_log.dir}"
+            )
+        self.compaction_lock = threading.Lock()
+        self.compaction_scheduled = False
+
+        self.manifest: Optional[GdsManifest] = None
+        if get_extra_config_bool_or("gds_use_manifest", config, True):
+            self.manifest = GdsManifest(
+                self.gds_path,
+                self.writer_id,
+                get_extra_config_int("gds_manifest_checkpoint_records", config)
+                or _DEFAULT_MANIFEST_CHECKPOINT_RECORDS,
+            )
+        else:
+            # The chunks stored from now on are in no manifest.
+            GdsManifest.invalidate(self.gds_path)
+        self.manifest_flush_interval = get_extra_config_float(
+            "gds_manifest_flush_interval", config
+        )
+        if self.manifest_flush_interval is None:
+            self.manifest_flush_interval = _DEFAULT_MANIFEST_FLUSH_INTERVAL
+        # With `gds_shared_path` the journals of the other instances are
+        # tailed every `gds_manifest_tail_interval` seconds, so their chunks
+        # show up in the index without a stat per lookup miss. 0 turns it
+        # off and misses are looked up on the filesystem instead.
+        self.manifest_tail_interval = get_extra_config_float(
+            "gds_manifest_tail_interval", config
+        )
+        if self.manifest_tail_interval is None:
+            self.manifest_tail_interval = _DEFAULT_MANIFEST_TAIL_INTERVAL
+        # Other instances may have indexed a chunk file this one evicts, or
+        # be reading it. With `gds_shared_path` the file is only unlinked
+        # `gds_shared_unlink_delay` seconds after the delete was journaled,
+        # by default long enough for the journal to be flushed and tailed
+        # and for reads of the file to finish.
+        self.unlink_delay = get_extra_config_float("gds_shared_unlink_delay", config)
+        if self.unlink_delay is None:
+            self.unlink_delay = (
+                self.manifest_flush_interval
+                + self.manifest_tail_interval
+                + _SHARED_UNLINK_GRACE
+            )
+        self.manifest_tailing = False
+        self.num_peer_entries = 0
+
+        # Without a manifest the index is built by scanning gds_path, which
+        # serves lookups while it runs. `gds_scan_budget_seconds` and
+        # `gds_scan_budget_entries` (0 for no limit) bound the background
+        # part of it, directories left over are scanned when looked up.
+        self.index_scan: Optional[GdsIndexScan] = None
+        self.scan_time_budget = (
+            get_extra_config_float("gds_scan_budget_seconds", config) or 0.0
+        )
+        self.scan_entry_budget = (
+            get_extra_config_int("gds_scan_budget_entries", config) or 0
+        )
+
+        # Without cufile, chunks cross the wire through host memory, and
+        # `gds_compression: lz4|zstd` compresses them there on
+        # `gds_compression_threads` threads. Chunks whose first frame does
+        # not shrink below `gds_compression_max_ratio` of its size are
+        # stored as they are. The codec is recorded in the v2 header, so it
+        # needs `gds_metadata_version: 2`. Compressed chunks are readable
+        # whatever the setting is.
+        self.codec_lock = threading.Lock()
+        self.codecs: Dict[int, GdsCodec] = {}
+        self.codec_executor: Optional[ThreadPoolExecutor] = None
+        self.codec_level = get_extra_config_int("gds_compression_level", config) or 0
+        self.codec_threads = (
+            get_extra_config_int("gds_compression_threads", config)
+            or _DEFAULT_COMPRESSION_THREADS
+        )
+        self.codec_frame_size = (
+            get_extra_config_int("gds_compression_frame_kb", config)
+            or _DEFAULT_COMPRESSION_FRAME_KB
+        ) * 1024
+        self.compression_max_ratio = (
+            get_extra_config_float("gds_compression_max_ratio", config)
+            or _DEFAULT_COMPRESSION_MAX_RATIO
+        )
+        self.num_compressed_puts = 0
+        self.num_uncompressed_puts = 0
+        self.compressed_bytes_saved = 0
+        codec_name = "none"
+        if config.extra_config is not None:
+            codec_name = config.extra_config.get("gds_compression", "none")
+        if codec_name != "none" and codec_name not in _CODECS:
+            raise RuntimeError(
+                f"Invalid value `{codec_name}` for `gds_compression` in "
+                f"extra_config, expected one of {['none', *_CODECS]}"
+            )
+        self.codec: Optional[GdsCodec] = None
+        if codec_name == "none":
+            pass
+        elif self.cufile:
+            logger.warning("GDS compression only applies without cufile, ignoring")
+        elif self.segment_log is not None:
+            logger.warning("The GDS segment log is not compressed")
+        elif self.metadata_version == 1:
+            raise RuntimeError("`gds_compression` needs `gds_metadata_version: 2`")
+        else:
+            self.codec = self._codec(_CODECS[codec_name].id)
+            logger.info(f"Compressing GDS chunks with {codec_name}")
+        self.closing = False
+
+        # All blocking work runs on the backend's own pools, pinned to the
+        # CPUs of the NUMA nodes of dst_device and of `gds_nic`: one lane
+        # for reads, one for writes and one for the index, sidecars,
+        # compaction and deletes, so reads never wait behind a write backlog.
+        self.io_cpus: Optional[Set[int]] = None
+        if get_extra_config_bool_or("gds_numa_affinity", config, True):
+            nic = None
+            if config.extra_config is not None:
+                nic = config.extra_config.get("gds_nic")
+            self.io_cpus = get_io_cpus(self.dst_device, nic)
+            if self.io_cpus is not None:
+                logger.info(f"Pinning GDS I/O threads to CPUs {sorted(self.io_cpus)}")
+        self.background_workers = (
+            get_extra_config_int("gds_background_workers", config)
+            or _DEFAULT_BACKGROUND_WORKERS
+        )
+        self.background_executor = self._make_executor(
+            self.background_workers, "gds-bg"
+        )
+
+        # Prefetched reads waiting to be picked up by get_blocking or
+        # get_non_blocking, with the deadline after which they are dropped.
+        self.prefetch_lock = threading.Lock()
+        self.prefetch_tasks: Dict[CacheEngineKey, Tuple[Future, float]] = {}
+        self.max_prefetched = (
+            get_extra_config_int("gds_max_prefetched", config)
+            or _DEFAULT_MAX_PREFETCHED
+        )
+        self.prefetch_ttl = (
+            get_extra_config_float("gds_prefetch_ttl", config) or _DEFAULT_PREFETCH_TTL
+        )
+        self.prefetch_on_lookup = get_extra_config_bool_or(
+            "gds_prefetch_on_lookup", config, False
+        )
+        # Chunks of a prompt are looked up and read in prefix order. The
+        # chunk stored after each key is remembered from batched puts and
+        # gets, and a lookup hit reads ahead the next chunks the index has.
+        # The window starts at `gds_readahead_chunks` (0 turns read-ahead
+        # off), grows by one for every read-ahead chunk that is consumed up
+        # to `gds_readahead_max_chunks` and halves for every one that
+        # expires unused after `gds_readahead_ttl` seconds. Read-ahead
+        # chunks share the allocator with the reads of retrieves, so those
+        # not consumed yet hold at most `gds_readahead_budget_mb` MB, by
+        # default a quarter of `cufile_buffer_size`.
+        self.readahead_window = (
+            get_extra_config_int("gds_readahead_chunks", config) or 0
+        )
+        self.readahead_enabled = self.readahead_window > 0
+        self.readahead_max = max(
+            get_extra_config_int("gds_readahead_max_chunks", config)
+            or _DEFAULT_READAHEAD_MAX_CHUNKS,
+            self.readahead_window,
+        )
+        self.readahead_ttl = (
+            get_extra_config_float("gds_readahead_ttl", config)
+            or _DEFAULT_READAHEAD_TTL
+        )
+        readahead_budget_mb = get_extra_config_float("gds_readahead_budget_mb", config)
+        if readahead_budget_mb is None:
+            readahead_budget_mb = _DEFAULT_READAHEAD_BUDGET_FRACTION * (
+                config.cufile_buffer_size or 0
+            )
+        self.readahead_budget = int(readahead_budget_mb * 1024**2)
+        # Read-ahead chunks not consumed yet and their sizes.
+        self.readahead_keys: Dict[CacheEngineKey, int] = {}
+        self.readahead_bytes = 0
+        self.num_readahead_hits = 0
+        self.num_readahead_wasted = 0
+        self.successor_lock = threading.Lock()
+        self.successors: OrderedDict[CacheEngineKey, CacheEngineKey] = OrderedDict()
+        self.max_successors = (
+            get_extra_config_int("gds_readahead_successors", config)
+            or _DEFAULT_READAHEAD_SUCCESSORS
+        )
+        self.read_semaphore = asyncio.Semaphore(
+            get_extra_config_int("gds_max_inflight_reads", config)
+            or _DEFAULT_MAX_INFLIGHT_READS
+        )
+        self.inflight_lock = threading.Lock()
+        self.inflight_reads = 0
+
+        # Reads of a batched get are issued concurrently, up to this many
+        # at a time.
+        self.read_queue_depth = (
+            get_extra_config_int("gds_read_queue_depth", config)
+            or _DEFAULT_READ_QUEUE_DEPTH
+        )
+        self.read_executor = self._make_executor(self.read_queue_depth, "gds-read")
+
+        # Capacity bound of the tier, 0 means unbounded. `usage` estimates
+        # the disk space of the indexed chunks from their sizes, see
+        # _footprint, `reserved` that of the puts in flight.
+        max_gds_size = get_extra_config_float("max_gds_size", config) or 0
+        self.max_gds_size = int(max_gds_size * 1024**3)
+        policy_name = "lru"
+        if config.extra_config is not None:
+            policy_name = config.extra_config.get("gds_eviction_policy", "lru")
+        if policy_name not in _EVICTION_POLICIES:
+            raise RuntimeError(
+                f"Invalid value `{policy_name}` for `gds_eviction_policy` "
+                f"in extra_config, expected one of {list(_EVICTION_POLICIES)}"
+            )
+        self.eviction_policy: GdsEvictionPolicy = _EVICTION_POLICIES[policy_name]()
+        # Admission policies in front of the writes, applied in the order
+        # of `gds_admission_policy` (a list or a comma separated string of
+        # names). Each one only sees the chunks the previous ones admitted.
+        admission_names: Union[str, List[str]] = []
+        if config.extra_config is not None:
+            admission_names = config.extra_config.get("gds_admission_policy") or []
+        if isinstance(admission_names, str):
+            admission_names = [
+                name.strip() for name in admission_names.split(",") if name.strip()
+            ]
+        for name in admission_names:
+            if name not in _ADMISSION_POLICIES:
+                raise RuntimeError(
+                    f"Invalid value `{name}` for `gds_admission_policy` "
+                    f"in extra_config, expected one of {list(_ADMISSION_POLICIES)}"
+                )
+        self.admission_policies: List[GdsAdmissionPolicy] = [
+            _ADMISSION_POLICIES[name](config) for name in admission_names
+        ]
+        self.num_rejected_puts = 0
+        self.usage = 0
+        self.reserved = 0
+        self.delete_tasks: set[asyncio.Future] = set()
+        if self.max_gds_size:
+            logger.info(
+                f"GDS tier bounded to {max_gds_size} GB, "
+                f"evicting with the {policy_name} policy"
+            )
+
+        # Puts go through a bounded queue drained by `write_workers`
+        # workers. `write_queued` counts the admitted puts not finished yet.
+        self.write_queue_depth = (
+            get_extra_config_int("gds_write_queue_depth", config)
+            or _DEFAULT_WRITE_QUEUE_DEPTH
+        )
+        self.write_queue_policy = "drop"
+        if config.extra_config is not None:
+            self.write_queue_policy = config.extra_config.get(
+                "gds_write_queue_policy", "drop"
+            )
+        if self.write_queue_policy not in _WRITE_QUEUE_POLICIES:
+            raise RuntimeError(
+                f"Invalid value `{self.write_queue_policy}` for "
+                "`gds_write_queue_policy` in extra_config, expected one of "
+                f"{list(_WRITE_QUEUE_POLICIES)}"
+            )
+        # Adjacent chunks of a put call go to one worker in groups of this
+        # size, whose writes are merged in the segment layout only.
+        self.write_coalesce_chunks = (
+            get_extra_config_int("gds_write_coalesce_chunks", config)
+            or _DEFAULT_WRITE_COALESCE_CHUNKS
+        )
+        if self.write_coalesce_chunks > self.write_queue_depth:
+            raise RuntimeError(
+                f"Invalid value `{self.write_coalesce_chunks}` for "
+                "`gds_write_coalesce_chunks` in extra_config, expected at most "
+                f"gds_write_queue_depth ({self.write_queue_depth})"
+            )
+        self.write_workers = (
+            get_extra_config_int("gds_write_workers", config) or _DEFAULT_WRITE_WORKERS
+        )
+        self.write_lock = threading.Lock()
+        self.write_space = threading.Condition(self.write_lock)
+        self.write_queued = 0
+        self.num_dropped_puts = 0
+        # A None tells a worker to exit, see close.
+        self.write_queue: asyncio.Queue[Optional[List[_GdsPutJob]]] = asyncio.Queue()
+        self.write_executor = self._make_executor(self.write_workers, "gds-write")
+
+        if hasattr(self.memory_allocator, "base_pointer"):
+            logger.debug(f"Using base pointer {self.memory_allocator.base_pointer}")
+            self.cufile_base_pointer = self.memory_allocator.base_pointer
+        else:
+            logger.info("No base pointer found, cufile will use bounce buffers")
+            self.cufile_base_pointer = None
+
+        # Without a base pointer, register the allocator's buffer once
+        # instead of letting cuFile bounce every transfer.
+        self.buffer_registry: Optional[GdsBufferRegistry] = None
+        allocator_tensor = getattr(self.memory_allocator, "tensor", None)
+        if (
+            self.use_cufile
+            and self.cufile_base_pointer is None
+            and isinstance(allocator_tensor, torch.Tensor)
+            and allocator_tensor.is_cuda
+        ):
+            self.buffer_registry = GdsBufferRegistry()
+            self.buffer_registry.register(
+                allocator_tensor.data_ptr(), allocator_tensor.nbytes
+            )
+
+        handle_cache_size = get_extra_config_int("gds_handle_cache_size", config)
+        if handle_cache_size is None:
+            handle_cache_size = _DEFAULT_HANDLE_CACHE_SIZE
+        self.handle_cache = GdsHandleCache(
+            handle_cache_size, self._open_handle, self._close_handle
+        )
+        if self.segment_log is not None:
+            self.segment_log.on_delete = self.handle_cache.invalidate
+        asyncio.run_coroutine_threadsafe(self._startup(), self.loop)
+        if len(self.stripes) > 1:
+            self.stripe_report_interval = (
+                get_extra_config_float("gds_stripe_report_interval", config)
+                or _DEFAULT_STRIPE_REPORT_INTERVAL
+            )
+            asyncio.run_coroutine_threadsafe(self._stripe_report_loop(), self.loop)
+        self.save_metadata_tasks: set[asyncio.Future] = set()
+        self.write_worker_futures = [
+            asyncio.run_coroutine_threadsafe(self._write_worker(), self.loop)
+            for _ in range(self.write_workers)
+        ]
+        if self.scrub_rate > 0:
+            asyncio.run_coroutine_threadsafe(self._scrub_loop(), self.loop)
+        asyncio.run_coroutine_threadsafe(self._stats_loop(), self.loop)
+        asyncio.run_coroutine_threadsafe(self._prefetch_expiry_loop(), self.loop)
+
+    def _make_io_engine_factory(
+        self, config: LMCacheEngineConfig
+    ) -> Callable[[List[mmap.mmap]], GdsIOEngine]:
+        io_engine = "sync"
+        if config.extra_config is not None:
+            io_engine = config.extra_config.get("gds_io_engine", "sync")
+        if io_engine not in _IO_ENGINES:
+            raise RuntimeError(
+                f"Invalid value `{io_engine}` for `gds_io_engine` in extra_config, "
+                f"expected one of {list(_IO_ENGINES)}"
+            )
+        queue_depth = (
+            get_extra_config_int("gds_io_queue_depth", config)
+            or _DEFAULT_IO_QUEUE_DEPTH
+        )
+        logger.info(f"GDS bounce buffers use the {io_engine} I/O engine")
+        if io_engine == "threads":
+            # Not pinned, these threads only ever wait on the kernel.
+            io_executor = ThreadPoolExecutor(
+                max_workers=queue_depth, thread_name_prefix="gds-io"
+            )
+            self.io_executor = io_executor
+            return lambda buffers: ThreadPoolGdsIOEngine(buffers, io_executor)
+        return SyncGdsIOEngine
+
+    def _make_executor(self, max_workers: int, name: str) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name,
+            initializer=self._pin_io_thread,
+        )
+
+    def _pin_io_thread(self) -> None:
+        if self.io_cpus is not None:
+            os.sched_setaffinity(0, self.io_cpus)
+
+    def _run_background(self, func, *args) -> asyncio.Future:
+        return self.loop.run_in_executor(self.background_executor, func, *args)
+
+    async def _startup(self):
+        await self._load_index()
+        # A complete scan has reaped the tree already.
+        scanned = self.index_scan is not None and self.index_scan.done
+        if not scanned or self.reap_interval > 0:
+            self.loop.create_task(self._reap_loop(scanned))
+
+    async def _load_index(self):
+        """
+        Populate the hot cache from the manifest, or from a full scan of
+        gds_path if there is no usable manifest.
+        """
+        start = time.perf_counter()
+        if self.manifest is None:
+            if await self._scan_metadata():
+                self.index_loaded = True
+            self.stats.index_load.set(time.perf_counter() - start)
+            return
+
+        records = await self._run_background(self.manifest.load)
+        if records is not None:
+            await self._run_background(self._apply_manifest_records, records)
+            end = time.perf_counter()
+            logger.info(
+                f"Read {len(self.hot_cache)} cache entries from the manifest "
+                f"in {end - start:.2f} seconds"
+            )
+        else:
+            logger.info("No usable GDS manifest, repairing it from a full scan")
+            # The manifest has to cover everything, so no budget here.
+            await self._scan_metadata(budgeted=False)
+            # Adopt everything found so that the next start is fast.
+            with self.hot_lock:
+                entries = list(self.hot_cache.items())
+            for key, entry in entries:
+                self._manifest_put(key, entry)
+            await self._run_background(self.manifest.checkpoint)
+        self.index_loaded = True
+        self.stats.index_load.set(time.perf_counter() - start)
+        self.loop.create_task(self._manifest_flush_loop())
+        if self.shared_path and self.manifest_tail_interval > 0:
+            self.manifest_tailing = True
+            self.loop.create_task(self._manifest_tail_loop())
+
+    def _apply_manifest_records(
+        self, records: List[GdsManifestRecord], from_peers: bool = False
+    ) -> None:
+        """
+        Replays manifest records into the index. Records tailed from other
+        writers (`from_peers`) leave this writer's own entries alone.
+        """
+        for record in records:
+            try:
+                key = CacheEngineKey.from_string(record.key)
+            except ValueError as e:
+                logger.error(f"Manifest key {record.key} is invalid: {e}")
+                continue
+            if from_peers:
+                with self.hot_lock:
+                    old = self.hot_cache.get(key)
+                # Own segment records stay. A peer's segment record may have
+                # been moved by its compaction, and a chunk file is shared,
+                # so a peer deleting it deletes it for everyone.
+                if old is not None and not self._in_peer_segment(old):
+                    if old.in_segment or record.op == _MANIFEST_OP_PUT:
+                        continue
+                if record.op == _MANIFEST_OP_PUT:
+                    self.num_peer_entries += 1
+            if record.op == _MANIFEST_OP_DEL:
+                self._pop_entry(key)
+                continue
+            if record.location:
+                if self.segment_log is None:
+                    # Written with the segment layout, which is disabled.
+                    continue
+                path = os.path.join(self.segment_log.dir, record.location)
+            else:
+                # Where the chunk was written, the key may hash to another
+                # stripe since gds_paths changed.
+                if record.stripe not in self.stripes.paths:
+                    logger.debug(
+                        f"Skipping {record.key} on {record.stripe}, which is "
+                        "not in gds_paths anymore"
+                    )
+                    continue
+                path, subdir_key, _, _ = self._key_to_path(key, record.stripe)
+                with self.hot_lock:
+                    self.metadata_dirs.add(subdir_key)
+            self._insert_metadata(
+                key,
+                GdsCacheMetadata(
+                    path,
+                    record.size,
+                    record.shape,
+                    record.dtype,
+                    record.fmt,
+                    offset=record.offset,
+                    in_segment=bool(record.location),
+                    codec=record.codec,
+                    stored=record.stored,
+                ),
+            )
+
+    def _manifest_put(self, key: CacheEngineKey, entry: GdsCacheMetadata) -> None:
+        if self.manifest is None:
+            return
+        self.manifest.append(
+            GdsManifestRecord(
+                _MANIFEST_OP_PUT,
+                self.manifest.next_seq(),
+                key.to_string(),
+                os.path.basename(entry.path) if entry.in_segment else "",
+                entry.offset,
+                entry.size,
+                entry.shape,
+                entry.dtype,
+                entry.fmt,
+                entry.codec,
+                entry.stored,
+                (
+                    ""
+                    if entry.in_segment
+                    else self.stripes.paths[self.stripes.stripe_of_path(entry.path)]
+                ),
+            )
+        )
+
+    def _in_peer_segment(self, entry: GdsCacheMetadata) -> bool:
+        return (
+            entry.in_segment
+            and self.segment_log is not None
+            and not self.segment_log.is_own(entry.path)
+        )
+
+    def _manifest_delete(self, key: CacheEngineKey) -> None:
+        if self.manifest is None:
+            return
+        self.manifest.append(
+            GdsManifestRecord(
+                _MANIFEST_OP_DEL, self.manifest.next_seq(), key.to_string()
+            )
+        )
+
+    async def _manifest_flush_loop(self):
+        assert self.manifest is not None
+        while not self.closing:
+            await asyncio.sleep(self.manifest_flush_interval)
+            if await self._run_background(self.manifest.flush):
+                await self._run_background(self.manifest.checkpoint)
+
+    async def _manifest_tail_loop(self):
+        assert self.manifest is not None
+        while not self.closing:
+            await asyncio.sleep(self.manifest_tail_interval)
+            try:
+                records = await self._run_background(self.manifest.tail)
+            except OSError as e:
+                logger.warning(f"Failed to tail the GDS manifest: {e}")
+                continue
+            if records:
+                await self._run_background(self._apply_manifest_records, records, True)
+
+    async def _stats_loop(self):
+        while not self.closing:
+            self.stats.usage.set(self.usage)
+            await asyncio.sleep(_STATS_INTERVAL)
+
+    async def _prefetch_expiry_loop(self):
+        # Frees the memory of prefetches nobody asked for, also when no
+        # other prefetch comes to expire them.
+        while not self.closing:
+            await asyncio.sleep(_PREFETCH_EXPIRY_INTERVAL)
+            self._expire_prefetches()
+
+    async def _stripe_report_loop(self):
+        while not self.closing:
+            await asyncio.sleep(self.stripe_report_interval)
+            for path, (read, write) in self.stripes.throughput().items():
+                logger.info(
+                    f"GDS stripe {path}: read {read:.1f} MB/s, write {write:.1f} MB/s"
+                )
+
+    async def _scan_metadata(self, budgeted: bool = True) -> bool:
+        """
+        Index the chunk files under every stripe, most recently modified
+        directories first. Returns False if the budget ran out before
+        everything was indexed.
+        """
+        # TODO: even though we only run it once on startup, this is still
+        # not super scalable - test whether Rust code will be faster here, or
+        # whether we can serialize meta-data in groups for faster loading.
+        scan = GdsIndexScan(
+            self._scan_metadata_subdir,
+            self.scan_time_budget if budgeted else 0.0,
+            self.scan_entry_budget if budgeted else 0,
+        )
+        self.index_scan = scan
+        tasks = []
+        if self.segment_log is not None:
+            # Segments are scanned in order so that a newer record of a key
+            # replaces an older one.
+            tasks.append(self._run_background(self._scan_segments))
+        listings = []
+        for root in self.stripes.paths:
+            with os.scandir(root) as it:
+                for entry in it:
+                    if entry.is_dir() and len(entry.name) == 2:
+                        listings.append(
+                            self._run_background(self._list_scan_dirs, entry.path)
+                        )
+        for dirs in await asyncio.gather(*listings):
+            scan.add(dirs)
+        scan.enumerated = True
+        tasks.extend(self._scan_worker(scan) for _ in range(self.background_workers))
+        progress_task = self.loop.create_task(self._scan_progress_loop(scan))
+        # TODO: If Python 3.11+, can we use TaskGroup instead?
+        await asyncio.gather(*tasks)
+        progress_task.cancel()
+        progress = scan.progress()
+        if scan.done:
+            logger.info(
+                f"Read {len(self.hot_cache)} cache entries from persistent "
+                f"storage in {progress['elapsed']:.2f} seconds"
+            )
+            return True
+        logger.info(
+            f"GDS index scan stopped after {progress['elapsed']:.2f} seconds "
+            f"with {progress['entries']} entries, the remaining "
+            f"{progress['total_dirs'] - progress['scanned_dirs']} directories "
+            "are scanned when looked up"
+        )
+        return False
+
+    async def _scan_worker(self, scan: GdsIndexScan):
+        while not self.closing:
+            path = scan.next()
+            if path is None:
+                return
+            await self._run_background(scan.ensure, path)
+
+    async def _scan_progress_loop(self, scan: GdsIndexScan):
+        while True:
+            await asyncio.sleep(_SCAN_PROGRESS_LOG_INTERVAL)
+            progress = scan.progress()
+            logger.info(
+                f"GDS index scan: {progress['scanned_dirs']}/"
+                f"{progress['total_dirs']} directories, "
+                f"{progress['entries']} entries "
+                f"({progress['on_demand_dirs']} directories on lookup) "
+                f"in {progress['elapsed']:.0f} seconds"
+            )
+
+    @property
+    def index_progress(self) -> Optional[Dict[str, Any]]:
+        """
+        Progress of the startup scan, None if the index came from the
+        manifest.
+        """
+        if self.index_scan is None:
+            return None
+        return self.index_scan.progress()
+
+    def _list_scan_dirs(self, path: str) -> List[Tuple[str, float]]:
+        """
+        The leaf directories below the l1 directory `path` with their
+        modification times.
+        """
+        dirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir() or len(entry.name) != 2:
+                    continue
+                try:
+                    dirs.append((entry.path, entry.stat().st_mtime))
+                except FileNotFoundError:
+                    continue
+        return dirs
+
+    def _scan_metadata_subdir(self, path: str) -> int:
+        """
+        Index the chunk files in the leaf directory `path`, returns how
+        many were found.
+        """
+        target_suffix = _DATA_FILE_SUFFIX
+        if self.metadata_sidecar:
+            target_suffix += _METADATA_FILE_SUFFIX
+        count = 0
+        try:
+            it = os.scandir(path)
+        except FileNotFoundError:
+            return 0
+        with it:
+            for fentry in it:
+                if not fentry.is_file():
+                    continue
+                if is_tmp_file(fentry.name):
+                    self._reap_tmp_file(fentry)
+                    continue
+                if not fentry.name.endswith(target_suffix):
+                    continue
+                filename = os.path.basename(fentry.name)
+                key_str = filename[: -len(target_suffix)].replace("_", "/")
+                try:
+                    key = CacheEngineKey.from_string(key_str)
+                except ValueError as e:
+                    logger.error(
+                        f"Filename {filename} can't be converted "
+                        f"back into cache key: {e}"
+                    )
+                    continue
+                try:
+                    self._read_metadata(key, fentry.path, path)
+                    count += 1
+                except UnsupportedMetadataVersion:
+                    logger.error(
+                        f"Unsupported metadata version for {fentry.path}, ignoring"
+                    )
+                except ValueError as e:
+                    logger.error(f"Invalid metadata in {fentry.path}, ignoring: {e}")
+        return count
+
+    async def _reap_loop(self, wait_first: bool):
+        if wait_first:
+            await asyncio.sleep(self.reap_interval)
+        while not self.closing:
+            start = time.perf_counter()
+            files, nbytes = self.num_reaped_files, self.reaped_bytes
+            for root in self.stripes.paths:
+                with os.scandir(root) as it:
+                    l1_dirs = [
+                        entry.path
+                        for entry in it
+                        if entry.is_dir() and len(entry.name) == 2
+                    ]
+                for l1_dir in l1_dirs:
+                    if self.closing:
+                        return
+                    await self._run_background(self._reap_l1_dir, l1_dir)
+            if self.num_reaped_files > files:
+                logger.info(
+                    f"Reaped {self.num_reaped_files - files} stale GDS temp "
+                    f"files, {(self.reaped_bytes - nbytes) / 1024**2:.1f} MB, "
+                    f"in {time.perf_counter() - start:.1f} seconds"
+                )
+            if self.reap_interval <= 0:
+                return
+            await asyncio.sleep(self.reap_interval)
+
+    def _reap_l1_dir(self, path: str) -> None:
+        for leaf_dir, _ in self._list_scan_dirs(path):
+            try:
+                it = os.scandir(leaf_dir)
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_file() and is_tmp_file(entry.name):
+                        self._reap_tmp_file(entry)
+
+    def _reap_tmp_file(self, entry: os.DirEntry) -> None:
+        try:
+            st = entry.stat()
+            if time.time() - st.st_mtime < self.tmp_max_age:
+                return
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            # Renamed into place or reaped by another instance.
+            return
+        self.num_reaped_files += 1
+        self.reaped_bytes += st.st_blocks * 512
+        logger.debug(f"Reaped stale temp file {entry.path}")
+
+    def _scan_segments(self):
+        assert self.segment_log is not None
+        # Compaction may copy a stale record behind a newer one, so the
+        # record's sequence number and not its position decides which wins.
+        seqs: Dict[CacheEngineKey, int] = {}
+        for path in self.segment_log.list_segments():
+            for record_offset, header in self.segment_log.scan(path):
+                try:
+                    if header.key is None:
+                        raise ValueError("no key")
+                    key = CacheEngineKey.from_string(header.key)
+                except ValueError as e:
+                    logger.error(
+                        f"Record in {path} at offset {record_offset} can't be "
+                        f"converted back into cache key: {e}"
+                    )
+                    continue
+                if seqs.get(key, -1) > header.seq:
+                    continue
+                seqs[key] = header.seq
+                self._insert_metadata(
+                    key,
+                    GdsCacheMetadata(
+                        path,
+                        header.nbytes,
+                        header.shape,
+                        header.dtype,
+                        header.fmt,
+                        offset=record_offset + header.header_size,
+                        in_segment=True,
+                        checksum=header.entry_checksum,
+                    ),
+                )
+
+    def _read_metadata(self, key, filename, subdir_key):
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            if not filename.endswith(_METADATA_FILE_SUFFIX):
+                # The header of a data file, don't read ahead into the
+                # payload.
+                os.posix_fadvise(fd, 0, _METADATA_MAX_SIZE, os.POSIX_FADV_RANDOM)
+            buf = os.pread(fd, _METADATA_MAX_SIZE, 0)
+        finally:
+            os.close(fd)
+
+        header = unpack_metadata(buf)
+        logger.debug(f"Read metadata for {key} from {filename}: {header}")
+        path = filename.removesuffix(_METADATA_FILE_SUFFIX)
+        stored = 0
+        if header.codec != _CODEC_NONE:
+            stored = os.stat(path).st_size - header.header_size
+        metadata = GdsCacheMetadata(
+            path,
+            header.nbytes,
+            header.shape,
+            header.dtype,
+            header.fmt,
+            offset=header.header_size,
+            checksum=header.entry_checksum,
+            codec=header.codec,
+            stored=stored,
+        )
+        with self.hot_lock:
+            self.metadata_dirs.add(subdir_key)
+        self._insert_metadata(key, metadata)
+        return metadata
+
+    def _footprint(self, entry: GdsCacheMetadata) -> int:
+        """
+        Estimated disk space of an indexed chunk, without a stat: its record
+        in a segment, or its chunk file with the stored payload size and its
+        sidecar when sidecars are written. Actual allocation depends on the
+        filesystem, and chunks written by other instances or with other
+        settings may lack the sidecar counted here.
+        """
+        if entry.in_segment:
+            return GdsSegmentLog.record_size(entry.size)
+        return self._disk_size(entry.offset, entry.stored or entry.size)
+
+    def _disk_size(self, header_size: int, payload_size: int) -> int:
+        """
+        Estimated disk space of a chunk file and its sidecar, in blocks of
+        _DISK_BLOCK_SIZE.
+        """
+        size = align_up(header_size + payload_size, _DISK_BLOCK_SIZE)
+        if self.metadata_sidecar:
+            size += align_up(header_size, _DISK_BLOCK_SIZE)
+        return size
+
+    def _insert_metadata(self, key: CacheEngineKey, metadata: GdsCacheMetadata):
+        self.negative_cache.discard(key)
+        with self.hot_lock:
+            old = self.hot_cache.get(key)
+            if old is not None:
+                metadata.pin_count = old.pin_count
+                self.usage -= self._footprint(old)
+            self.hot_cache[key] = metadata
+            self.usage += self._footprint(metadata)
+        if self.segment_log is None:
+            return
+        if old is not None and old.in_segment and old is not metadata:
+            self.segment_log.untrack(old.path, key, old.size)
+        if metadata.in_segment:
+            self.segment_log.track(metadata.path, key, metadata.size)
+        if old is not None and old.in_segment:
+            self._maybe_schedule_compaction()
+
+    def __str__(self):
+        return self.__class__.__name__
+
+    def contains(self, key: CacheEngineKey, pin: bool = False) -> bool:
+        hit = self._contains(key, pin)
+        if hit:
+            self.stats.hits.inc()
+            for policy in self.admission_policies:
+                policy.on_hit(key)
+        else:
+            self.stats.misses.inc()
+        return hit
+
+    def _contains(self, key: CacheEngineKey, pin: bool) -> bool:
+        with self.hot_lock:
+            res = key in self.hot_cache
+        scanned_now = False
+        if not res and not self.index_loaded and self.index_scan is not None:
+            # The startup scan is still running, index the key's directory
+            # instead of looking for the key alone.
+            scanned_now = self.index_scan.ensure(
+                self._key_to_path(key)[1], on_demand=True
+            )
+            with self.hot_lock:
+                res = key in self.hot_cache
+            if not res and (scanned_now or not self.shared_path):
+                if self.shared_path:
+                    # The directory was just listed.
+                    self.negative_cache.add(key)
+                return False
+        if not res:
+            if self.index_loaded and (not self.shared_path or self.manifest_tailing):
+                # Nobody else writes here, or the other writers' chunks come
+                # in from their manifest journals.
+                return False
+            if self.negative_cache.is_known_missing(key):
+                return False
+            if not self._try_to_read_metadata(key):
+                self.negative_cache.add(key)
+                return False
+        if pin:
+            # Keep the chunk from being evicted until the request's
+            # retrieve is done and vllm unpins it.
+            with self.hot_lock:
+                entry = self.hot_cache.get(key)
+                if entry is None:
+                    return False
+                entry.pin()
+                self.eviction_policy.on_hit(key, self.hot_cache)
+        if pin and self.prefetch_on_lookup:
+            # vllm looks up with pin=True right before scheduling the
+            # request, start reading while it is being scheduled.
+            self.submit_prefetch_task(key)
+        if self.readahead_enabled:
+            self._read_ahead(key)
+        return True
+
+    def _try_to_read_metadata(self, key: CacheEngineKey) -> Optional[DiskCacheMetadata]:
+        path, subdir_key, _, _ = self._key_to_path(key)
+        if self.metadata_sidecar:
+            path += _METADATA_FILE_SUFFIX
         if os.path.exists(path):
             try:
-                return self._read_metadata(key, path, subdir_key)
+                metadata = self._read_metadata(key, path, subdir_key)
+                self._manifest_put(key, metadata)
+                return metadata
             except UnsupportedMetadataVersion:
                 logger.error(f"Unsupported metadata version for {path}, ignoring")
+            except ValueError as e:
+                logger.error(f"Invalid metadata in {path}, ignoring: {e}")
         return None
 
     def _key_to_path(
         self,
         key: CacheEngineKey,
+        stripe: Optional[str] = None,
     ) -> Tuple[str, str, str, str]:
+        """
+        Returns the data file path of `key`, the directory holding it and
+        the two directory levels below the stripe root. The stripe is the
+        one the key hashes to unless given.
+        """
         hash = str(key.chunk_hash)
         l1_dir = hash[:2]
         l2_dir = hash[2:4]
         key_str = key.to_string()
         assert "_" not in key_str, "key string should not contain `_`"
+        root = stripe or self.stripes.paths[self.stripes.stripe_of_hash(key.chunk_hash)]
+        subdir = os.path.join(root, l1_dir, l2_dir)
         return (
-            os.path.join(
-                self.gds_path,
-                l1_dir,
-                l2_dir,
-                key_str.replace("/", "_") + _DATA_FILE_SUFFIX,
-            ),
-            l1_dir + l2_dir,
+            os.path.join(subdir, key_str.replace("/", "_") + _DATA_FILE_SUFFIX),
+            subdir,
             l1_dir,
             l2_dir,
         )
 
+    def _claim_writer_id(self, base: str) -> str:
+        """
+        Returns `{base}-{slot}` for the lowest slot whose lock file under
+        /{gds_path}/writers no live process holds, so that processes on
+        one host and device (or containers with the same hostname) never
+        share a writer id while a restart reuses its predecessor's one and
+        keeps compacting its segments. The lock is held until close. Falls
+        back to a random id if the filesystem has no locking.
+        """
+        writers_dir = os.path.join(self.gds_path, _WRITERS_DIR)
+        try:
+            os.makedirs(writers_dir, exist_ok=True)
+            for slot in range(_MAX_WRITER_SLOTS):
+                writer_id = f"{base}-{slot}"
+                fd = os.open(
+                    os.path.join(writers_dir, writer_id + _WRITER_LOCK_SUFFIX),
+                    os.O_RDWR | os.O_CREAT,
+                    0o644,
+                )
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError as e:
+                    os.close(fd)
+                    if e.errno in (errno.EAGAIN, errno.EACCES):
+                        continue
+                    raise
+                self.writer_lock_fd = fd
+                return writer_id
+        except OSError as e:
+            logger.warning(f"Can't lock a GDS writer slot in {writers_dir}: {e}")
+        writer_id = f"{base}-{uuid.uuid4().hex}"
+        logger.warning(f"Using the one-off GDS writer id {writer_id}")
+        return writer_id
+
     def exists_in_put_tasks(self, key: CacheEngineKey) -> bool:
         with self.put_lock:
             return key in self.put_tasks
@@ -398,16 +4070,8 @@ class GdsBackend(StorageBackendInterface):
     def submit_put_task(
         self, key: CacheEngineKey, memory_obj: MemoryObj
     ) -> Optional[Future]:
-        assert memory_obj.tensor is not None
-        memory_obj.ref_count_up()
-
-        with self.put_lock:
-            self.put_tasks.add(key)
-
-        future = asyncio.run_coroutine_threadsafe(
-            self._async_save_bytes_to_disk(key, memory_obj), self.loop
-        )
-        return future
+        futures = self._enqueue_puts([key], [memory_obj])
+        return futures[0]
 
     def batched_submit_put_task(
         self,
@@ -415,105 +4079,742 @@ class GdsBackend(StorageBackendInterface):
         memory_objs: List[MemoryObj],
         transfer_spec=None,
     ) -> Optional[List[Future]]:
-        return [
-            self.submit_put_task(key, memory_obj)
-            for key, memory_obj in zip(keys, memory_objs, strict=False)
-        ]
+        """
+        The chunks of one call are adjacent chunks of the same request,
+        they are queued in groups of up to `gds_write_coalesce_chunks` that
+        are each written by one worker in one go. Only the segment layout
+        merges a group's I/O, placing its records back to back; the file
+        layout still writes one file per chunk.
+        """
+        return self._enqueue_puts(keys, memory_objs)
+
+    def _enqueue_puts(
+        self,
+        keys: List[CacheEngineKey],
+        memory_objs: List[MemoryObj],
+    ) -> List[Optional[Future]]:
+        if self.closing:
+            return [None] * len(keys)
+        futures: List[Optional[Future]] = []
+        group: List[_GdsPutJob] = []
+
+        def flush() -> None:
+            nonlocal group
+            if group:
+                self.loop.call_soon_threadsafe(self.write_queue.put_nowait, group)
+                group = []
+
+        self._learn_successors(keys)
+        admitted = self._admission(keys, memory_objs)
+        for i, (key, memory_obj) in enumerate(zip(keys, memory_objs, strict=False)):
+            if i >= admitted:
+                futures.append(None)
+                continue
+            future: Future = Future()
+            if self._already_stored(key):
+                # Nothing to write, and nothing to reserve or evict for it.
+                self._count_deduplicated_puts(1)
+                future.set_result(None)
+                futures.append(future)
+                continue
+            with self.put_lock:
+                inflight = self.put_tasks.get(key)
+                if inflight is None:
+                    self.put_tasks[key] = future
+            if inflight is not None:
+                # The chunk is being written already.
+                self._count_deduplicated_puts(1)
+                futures.append(inflight)
+                continue
+            job = self._admit_put(key, memory_obj, future, flush)
+            if job is None:
+                with self.put_lock:
+                    del self.put_tasks[key]
+                # Puts that attached to this one see it dropped too.
+                future.set_result(None)
+                futures.append(None)
+                continue
+            futures.append(job.future)
+            group.append(job)
+            if len(group) == self.write_coalesce_chunks:
+                flush()
+        flush()
+        return futures
+
+    def _already_stored(self, key: CacheEngineKey) -> bool:
+        """
+        Whether the chunk is indexed. A chunk published by another instance
+        sharing gds_path is found by the write worker, which keeps the
+        filesystem off the put path.
+        """
+        with self.hot_lock:
+            return key in self.hot_cache
+
+    def _admission(
+        self, keys: List[CacheEngineKey], memory_objs: List[MemoryObj]
+    ) -> int:
+        """
+        Returns how many of the leading chunks the admission policies let
+        through.
+        """
+        admitted = len(keys)
+        for policy in self.admission_policies:
+            if not admitted:
+                break
+            admitted = policy.admit(
+                keys[:admitted], memory_objs[:admitted], self._admission_victim
+            )
+        rejected = len(keys) - admitted
+        if rejected:
+            with self.put_lock:
+                self.num_rejected_puts += rejected
+            self.stats.rejected_puts.inc(rejected)
+        return admitted
 
-    async def _async_save_bytes_to_disk(
+    def _admission_victim(self, nbytes: int) -> Optional[CacheEngineKey]:
+        if not self.max_gds_size:
+            return None
+        with self.hot_lock:
+            if self.usage + self.reserved + nbytes <= self.max_gds_size:
+                return None
+            victims = self.eviction_policy.victims(self.hot_cache, 1, self._footprint)
+        return victims[0] if victims else None
+
+    def _admit_put(
         self,
         key: CacheEngineKey,
         memory_obj: MemoryObj,
-    ) -> None:
+        future: Future,
+        flush: Callable[[], None],
+    ) -> Optional[_GdsPutJob]:
+        """
+        Takes a slot of the write queue and reserves space in the tier for
+        the chunk, or returns None if the put is dropped. With the block
+        policy, `flush` queues the caller's pending group before waiting for
+        a slot, as its jobs may hold the slots waited for.
+        """
+        assert memory_obj.tensor is not None
+        with self.write_lock:
+            if self.write_queue_policy == "block":
+                if self.write_queued >= self.write_queue_depth:
+                    flush()
+                    self.write_space.wait_for(
+                        lambda: self.write_queued < self.write_queue_depth
+                    )
+            elif self.write_queued >= self.write_queue_depth:
+                self.num_dropped_puts += 1
+                self.stats.dropped_puts.inc()
+                if self.num_dropped_puts % _DROPPED_PUTS_LOG_INTERVAL == 1:
+                    logger.warning(
+                        f"GDS write queue is full, dropped {self.num_dropped_puts} "
+                        "puts so far"
+                    )
+                return None
+            self.write_queued += 1
+            self.stats.write_queue.set(self.write_queued)
+        if self.segment_log is not None:
+            nbytes = GdsSegmentLog.record_size(memory_obj.get_size())
+        else:
+            nbytes = self._disk_size(self.metadata_size, memory_obj.get_size())
+        if not self._make_room(nbytes):
+            logger.warning(f"GDS tier is full of pinned chunks, not storing {key}")
+            self._release_write_slot()
+            return None
+        memory_obj.ref_count_up()
+        return _GdsPutJob(key, memory_obj, nbytes, future, start=time.perf_counter())
+
+    def _release_write_slot(self) -> None:
+        with self.write_lock:
+            self.write_queued -= 1
+            self.stats.write_queue.set(self.write_queued)
+            self.write_space.notify()
+
+    @property
+    def write_queue_length(self) -> int:
+        """
+        Puts admitted and not finished yet, queued or being written.
+        """
+        return self.write_queued
+
+    def _make_room(self, nbytes: int) -> bool:
+        """
+        Evicts chunks until `nbytes` more fit into `max_gds_size` and
+        reserves them. The files are deleted in the background.
+        """
+        if not self.max_gds_size:
+            return True
+        with self.hot_lock:
+            excess = self.usage + self.reserved + nbytes - self.max_gds_size
+            victims = []
+            if excess > 0:
+                victims = self.eviction_policy.victims(
+                    self.hot_cache, excess, self._footprint
+                )
+                freed = sum(self._footprint(self.hot_cache[k]) for k in victims)
+                if freed < excess:
+                    return False
+            self.reserved += nbytes
+        if victims:
+            logger.debug(f"Evicting {len(victims)} chunks from the GDS tier")
+            self.batched_remove(victims)
+        return True
+
+    async def _write_worker(self) -> None:
+        while True:
+            group = await self.write_queue.get()
+            if group is None:
+                return
+            try:
+                await self.loop.run_in_executor(
+                    self.write_executor, self._write_group, group
+                )
+            except Exception as e:
+                for job in group:
+                    job.error = job.error or e
+            for job in group:
+                try:
+                    self._finish_put(job)
+                except Exception as e:
+                    # Keep the worker alive for the puts queued behind.
+                    logger.error(
+                        f"Failed to finish the put of {job.key}: {e}", exc_info=True
+                    )
+
+    def _write_group(self, group: List[_GdsPutJob]) -> None:
         """
-        Convert KV to bytes and async store bytes to disk.
+        Writes a group of adjacent chunks on a write worker thread. In the
+        segment layout the records of the group are placed back to back.
+        Chunks that are already indexed are not written again.
         """
-        kv_chunk = memory_obj.tensor
+        with self.hot_lock:
+            for job in group:
+                job.adopted = job.key in self.hot_cache
+        pending = [job for job in group if not job.adopted]
+        self._count_deduplicated_puts(len(group) - len(pending))
+        if self.segment_log is not None:
+            placements = self.segment_log.reserve_many(
+                [job.memory_obj.get_size() for job in pending]
+            )
+            for job, (seg_path, record_offset) in zip(pending, placements, strict=True):
+                job.path = seg_path
+                job.offset = record_offset + _METADATA_MAX_SIZE
+        for job in pending:
+            try:
+                self._write_job(job)
+            except Exception as e:
+                job.error = e
+        if (
+            self.segment_log is not None
+            and self.bounce_writes
+            and self.bounce_fdatasync == "group"
+        ):
+            for seg_path in {job.path for job in pending if job.error is None}:
+                assert seg_path is not None
+                os.fdatasync(self.segment_log.get_fd(seg_path))
+
+    def _write_job(self, job: _GdsPutJob) -> None:
+        kv_chunk = job.memory_obj.tensor
         assert kv_chunk is not None
-        path, subdir_key, l1_dir, l2_dir = self._key_to_path(key)
+        fmt = job.memory_obj.metadata.fmt
+        if self.write_checksums:
+            job.checksum = payload_checksum(kv_chunk, self.checksum_stream)
+        if self.segment_log is not None:
+            assert job.path is not None
+            self._save_segment(
+                job.path,
+                job.offset - _METADATA_MAX_SIZE,
+                job.key.to_string(),
+                kv_chunk,
+                fmt,
+                self.cufile_base_pointer,
+                job.memory_obj.metadata.address,
+                job.checksum,
+            )
+            job.stored = kv_chunk.nbytes
+            logger.debug(
+                f"Saved {kv_chunk.numel()} elements of {kv_chunk.dtype} "
+                f"to {job.path} at offset {job.offset}"
+            )
+            return
+        path, subdir_key, _, _ = self._key_to_path(job.key)
         # TODO: maybe remove `metadata_dirs` and insert mkdir calls
         # only for the case where creating the CuFile fails on ENOENT. It
         # also makes the code more resilient to out-of-band deletions
         if subdir_key not in self.metadata_dirs:
-            os.makedirs(os.path.join(self.gds_path, l1_dir, l2_dir), exist_ok=True)
-            self.metadata_dirs.add(subdir_key)
-        tmp = ".tmp" + rand_suffix(self.rand, 8)
-        fmt = memory_obj.metadata.fmt
-        metadata = await asyncio.to_thread(
-            self._save_gds,
+            os.makedirs(subdir_key, exist_ok=True)
+            with self.hot_lock:
+                self.metadata_dirs.add(subdir_key)
+        replace = False
+        if self.shared_path and os.path.exists(path):
+            # Another instance sharing gds_path stored the chunk, the
+            # content behind a key never changes.
+            if self._adopt_published(job.key, path, subdir_key):
+                job.adopted = True
+                self._count_deduplicated_puts(1)
+                return
+            replace = True
+        compressed = None
+        if self.codec is not None:
+            compressed = self._compress_chunk(kv_chunk)
+            if compressed is not None:
+                job.codec = self.codec.id
+        job.tmp = _TMP_FILE_SUFFIX + rand_suffix(self.rand, _TMP_SUFFIX_LEN)
+        job.metadata = self._save_gds(
             path,
-            tmp,
+            job.tmp,
             kv_chunk,
             fmt,
             self.cufile_base_pointer,
-            memory_obj.metadata.address,
+            job.memory_obj.metadata.address,
+            job.checksum,
+            compressed,
+            replace,
         )
-
+        if job.metadata is None:
+            # Another instance published the chunk while it was written.
+            if not self._adopt_published(job.key, path, subdir_key):
+                raise RuntimeError(f"Can't read {path} published by another writer")
+            job.adopted = True
+            self._count_deduplicated_puts(1)
+            return
+        job.stored = len(compressed) if compressed is not None else kv_chunk.nbytes
+        self.stripes.account(path, job.stored, write=True)
         logger.debug(
             f"Saved {kv_chunk.numel()} elements of {kv_chunk.dtype} "
-            f"to {path} with metadata {metadata}"
+            f"to {path} with metadata {job.metadata}"
         )
-        self.insert_key(key, memory_obj)
-        memory_obj.ref_count_down()
 
-        task = asyncio.create_task(
-            save_metadata(path + _METADATA_FILE_SUFFIX, tmp, metadata)
-        )
-        self.save_metadata_tasks.add(task)
-        task.add_done_callback(self.save_metadata_tasks.discard)
+    def _adopt_published(self, key: CacheEngineKey, path: str, subdir_key: str) -> bool:
+        """
+        Indexes the chunk file of `key` written by another writer, returns
+        False if it's gone or can't be read.
+        """
+        try:
+            metadata = self._read_metadata(key, path, subdir_key)
+        except FileNotFoundError:
+            return False
+        except (UnsupportedMetadataVersion, ValueError) as e:
+            logger.warning(f"Replacing unreadable chunk file {path}: {e}")
+            return False
+        self._manifest_put(key, metadata)
+        return True
+
+    def _count_deduplicated_puts(self, count: int) -> None:
+        if not count:
+            return
+        with self.put_lock:
+            self.num_deduplicated_puts += count
+        self.stats.deduplicated_puts.inc(count)
+
+    async def _drop_queued_puts(self) -> None:
+        """
+        Fails the puts still queued at close and tells the workers to exit
+        once done with the groups they are writing.
+        """
+        while not self.write_queue.empty():
+            group = self.write_queue.get_nowait()
+            for job in group or ():
+                job.error = RuntimeError("GDS backend closed before the write")
+                self._finish_put(job)
+        for _ in self.write_worker_futures:
+            self.write_queue.put_nowait(None)
+
+    def _finish_put(self, job: _GdsPutJob) -> None:
+        key = job.key
+        if job.error is None:
+            try:
+                self._index_put(job)
+            except Exception as e:
+                logger.error(f"Failed to index the put of {key}: {e}", exc_info=True)
+                job.error = e
+        if self.segment_log is not None and job.path is not None:
+            # Indexed, or abandoned on error.
+            self.segment_log.commit(job.path)
+        job.memory_obj.ref_count_down()
+        if self.max_gds_size:
+            with self.hot_lock:
+                self.reserved -= job.nbytes
         with self.put_lock:
-            self.put_tasks.discard(key)
+            self.put_tasks.pop(key, None)
+        self._release_write_slot()
+        if job.error is None:
+            job.future.set_result(None)
+        else:
+            job.future.set_exception(job.error)
 
-    def insert_key(self, key: CacheEngineKey, memory_obj: MemoryObj) -> None:
-        path, _, _, _ = self._key_to_path(key)
+    def _index_put(self, job: _GdsPutJob) -> None:
+        key = job.key
+        self.stats.observe_put(
+            self._io_path(job.codec, write=True),
+            time.perf_counter() - job.start,
+            job.stored,
+        )
+        if job.adopted:
+            # Indexed when the stored chunk was found.
+            return
+        if self.segment_log is not None:
+            self.insert_key(
+                key,
+                job.memory_obj,
+                path=job.path,
+                offset=job.offset,
+                checksum=job.checksum,
+            )
+            return
+        self.insert_key(
+            key,
+            job.memory_obj,
+            offset=self.metadata_size,
+            checksum=job.checksum,
+            codec=job.codec,
+            stored=job.stored if job.codec != _CODEC_NONE else 0,
+        )
+        if self.metadata_sidecar:
+            path, _, _, _ = self._key_to_path(key)
+            assert job.tmp is not None and job.metadata is not None
+            task = self._run_background(
+                save_metadata,
+                path + _METADATA_FILE_SUFFIX,
+                job.tmp,
+                job.metadata,
+            )
+            self.save_metadata_tasks.add(task)
+            task.add_done_callback(self.save_metadata_tasks.discard)
+
+    def insert_key(
+        self,
+        key: CacheEngineKey,
+        memory_obj: MemoryObj,
+        path: Optional[str] = None,
+        offset: int = _METADATA_MAX_SIZE,
+        checksum: Optional[int] = None,
+        codec: int = _CODEC_NONE,
+        stored: int = 0,
+    ) -> None:
+        in_segment = path is not None
+        if path is None:
+            path, _, _, _ = self._key_to_path(key)
         size = memory_obj.get_size()
         shape = memory_obj.metadata.shape
         dtype = memory_obj.metadata.dtype
         fmt = memory_obj.metadata.fmt
-        with self.hot_lock:
-            self.hot_cache[key] = DiskCacheMetadata(path, size, shape, dtype, fmt)
+        metadata = GdsCacheMetadata(
+            path,
+            size,
+            shape,
+            dtype,
+            fmt,
+            offset=offset,
+            in_segment=in_segment,
+            checksum=checksum if checksum is not None else _NO_CHECKSUM,
+            codec=codec,
+            stored=stored,
+        )
+        self._insert_metadata(key, metadata)
+        self._manifest_put(key, metadata)
 
     def submit_prefetch_task(
         self,
         key: CacheEngineKey,
+        readahead: bool = False,
     ) -> bool:
-        # with self.hot_lock:
-        #     entry = self.hot_cache.get(key)
-        # if entry is None:
-        #     return None
-
-        # path = entry.path
-        # dtype = entry.dtype
-        # shape = entry.shape
-        # assert dtype is not None
-        # assert shape is not None
-        # return asyncio.run_coroutine_threadsafe(
-        #     self._async_load_bytes_from_disk(key, path, dtype, shape), self.loop
-        # )
-
-        # TODO(Jiayi): Need to modify this when prefetch interface is determined.
-
-        # TODO(Jiayi): add `test_gds_backend_sanity` back after implementing this
-        return False
+        """
+        Start reading the chunk in the background, a later get_blocking or
+        get_non_blocking of the key picks up the result. `readahead` marks a
+        speculative read, which expires sooner and adapts the read-ahead
+        window.
+        """
+        self._expire_prefetches()
+        with self.hot_lock:
+            entry = self.hot_cache.get(key)
+            if entry is None:
+                return False
+            nbytes = entry.size
+        with self.prefetch_lock:
+            if key in self.prefetch_tasks:
+                return True
+            if len(self.prefetch_tasks) >= self.max_prefetched:
+                logger.debug(f"Too many outstanding prefetches, skipping {key}")
+                return False
+            if readahead and self.readahead_bytes + nbytes > self.readahead_budget:
+                logger.debug(f"Read-ahead budget is used up, skipping {key}")
+                return False
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._async_load_bytes_from_disk(key), self.loop
+        )
+        with self.prefetch_lock:
+            if key in self.prefetch_tasks:
+                # Lost a race with another prefetch of the same key.
+                self._release_on_done(future)
+                future.cancel()
+                return True
+            ttl = self.readahead_ttl if readahead else self.prefetch_ttl
+            self.prefetch_tasks[key] = (future, time.monotonic() + ttl)
+            if readahead:
+                self.readahead_keys[key] = nbytes
+                self.readahead_bytes += nbytes
+        return True
+
+    def cancel_prefetch(self, key: CacheEngineKey) -> bool:
+        """
+        Drop an outstanding prefetch. A read that already started still
+        completes, its memory object is freed right away.
+        """
+        with self.prefetch_lock:
+            task = self.prefetch_tasks.pop(key, None)
+            if key in self.readahead_keys:
+                # A wrong guess.
+                self.readahead_bytes -= self.readahead_keys.pop(key)
+                self.num_readahead_wasted += 1
+                self.readahead_window = max(1, self.readahead_window // 2)
+        if task is None:
+            return False
+        future, _ = task
+        self._release_on_done(future)
+        future.cancel()
+        return True
+
+    def _expire_prefetches(self) -> None:
+        now = time.monotonic()
+        with self.prefetch_lock:
+            expired = [
+                key
+                for key, (_, deadline) in self.prefetch_tasks.items()
+                if deadline < now
+            ]
+        for key in expired:
+            logger.debug(f"Prefetch of {key} was never consumed, dropping it")
+            self.cancel_prefetch(key)
+
+    @staticmethod
+    def _release_on_done(future: Union[Future, asyncio.Future]) -> None:
+        def release(f: Union[Future, asyncio.Future]) -> None:
+            if f.cancelled() or f.exception() is not None:
+                return
+            memory_obj = f.result()
+            if memory_obj is not None:
+                memory_obj.ref_count_down()
+
+        future.add_done_callback(release)
+
+    def _take_prefetch(self, key: CacheEngineKey) -> Optional[Future]:
+        with self.prefetch_lock:
+            task = self.prefetch_tasks.pop(key, None)
+            if key in self.readahead_keys:
+                self.readahead_bytes -= self.readahead_keys.pop(key)
+                self.num_readahead_hits += 1
+                self.readahead_window = min(
+                    self.readahead_max, self.readahead_window + 1
+                )
+        return task[0] if task is not None else None
+
+    def _learn_successors(self, keys: List[CacheEngineKey]) -> None:
+        """
+        Remembers that each of `keys` is followed by the next one, the keys
+        being adjacent chunks of one request.
+        """
+        if not self.readahead_enabled or len(keys) < 2:
+            return
+        with self.successor_lock:
+            for key, next_key in zip(keys, keys[1:], strict=False):
+                self.successors[key] = next_key
+                self.successors.move_to_end(key)
+            while len(self.successors) > self.max_successors:
+                self.successors.popitem(last=False)
+
+    def _read_ahead(self, key: CacheEngineKey) -> None:
+        """
+        Prefetches the chunks known to follow `key` that are in the index,
+        up to the read-ahead window. Chunks already being read are skipped
+        over, the walk stops at the first one that isn't stored.
+        """
+        with self.prefetch_lock:
+            window = self.readahead_window
+        for _ in range(window):
+            with self.successor_lock:
+                next_key = self.successors.get(key)
+            if next_key is None:
+                return
+            with self.prefetch_lock:
+                pending = next_key in self.prefetch_tasks
+            if not pending and not self.submit_prefetch_task(next_key, readahead=True):
+                return
+            key = next_key
 
     async def _async_load_bytes_from_disk(
         self,
         key: CacheEngineKey,
-        path: str,
-        dtype: torch.dtype,
-        shape: torch.Size,
     ) -> Optional[MemoryObj]:
-        return self._load_bytes_from_disk(key, path, dtype, shape)
+        async with self.read_semaphore:
+            read = self.loop.run_in_executor(
+                self.read_executor, self._load_key_shared, key
+            )
+            try:
+                return await asyncio.shield(read)
+            except asyncio.CancelledError:
+                # The read itself can't be interrupted, free its result.
+                self._release_on_done(read)
+                raise
 
     def get_blocking(
         self,
         key: CacheEngineKey,
     ) -> Optional[MemoryObj]:
-        with self.hot_lock:
-            entry = self.hot_cache.get(key)
-        if entry is None:
-            return None
+        future = self._take_prefetch(key)
+        if future is not None:
+            try:
+                memory_obj = future.result()
+            except Exception as e:
+                logger.warning(f"Prefetch of {key} failed: {e}")
+                memory_obj = None
+            if memory_obj is not None:
+                return memory_obj
+        return self._load_key_shared(key)
+
+    def batched_get_blocking(
+        self,
+        keys: List[CacheEngineKey],
+    ) -> List[Optional[MemoryObj]]:
+        """
+        Read all chunks concurrently, up to `gds_read_queue_depth` at a
+        time, and return them in key order. Like get_blocking, a chunk that
+        can't be read comes back as None.
+        """
+        if len(keys) <= 1:
+            return [self.get_blocking(key) for key in keys]
+        self._learn_successors(keys)
+        return asyncio.run_coroutine_threadsafe(
+            self._async_batched_get(keys), self.loop
+        ).result()
+
+    async def _async_batched_get(
+        self,
+        keys: List[CacheEngineKey],
+    ) -> List[Optional[MemoryObj]]:
+        semaphore = asyncio.Semaphore(self.read_queue_depth)
+
+        async def get_one(key: CacheEngineKey) -> Optional[MemoryObj]:
+            prefetch = self._take_prefetch(key)
+            if prefetch is not None:
+                try:
+                    memory_obj = await asyncio.wrap_future(prefetch)
+                except Exception as e:
+                    logger.warning(f"Prefetch of {key} failed: {e}")
+                    memory_obj = None
+                if memory_obj is not None:
+                    return memory_obj
+            async with semaphore:
+                return await self.loop.run_in_executor(
+                    self.read_executor, self._load_key_shared, key
+                )
+
+        # Issue the reads round robin over the stripes, so that the first
+        # `read_queue_depth` reads already keep every stripe busy.
+        order = self._stripe_interleaved_order(keys)
+        interleaved = await asyncio.gather(
+            *(get_one(keys[i]) for i in order), return_exceptions=True
+        )
+        results: List = [None] * len(keys)
+        for i, result in zip(order, interleaved, strict=True):
+            results[i] = result
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            # Same as a failing get_blocking, but don't leak the chunks
+            # that were read successfully.
+            for r in results:
+                if r is not None and not isinstance(r, BaseException):
+                    r.ref_count_down()
+            raise errors[0]
+        return results
+
+    def _stripe_interleaved_order(self, keys: List[CacheEngineKey]) -> List[int]:
+        if len(self.stripes) == 1:
+            return list(range(len(keys)))
+        per_stripe: Dict[int, List[int]] = {}
+        for i, key in enumerate(keys):
+            stripe = self.stripes.stripe_of_hash(key.chunk_hash)
+            per_stripe.setdefault(stripe, []).append(i)
+        order = []
+        queues = list(per_stripe.values())
+        for rank in range(max(len(q) for q in queues)):
+            order.extend(q[rank] for q in queues if rank < len(q))
+        return order
+
+    def _load_key_shared(self, key: CacheEngineKey) -> Optional[MemoryObj]:
+        """
+        Reads the chunk, or waits for a read of it that is already running
+        and shares its memory object, with one reference per caller.
+        """
+        with self.shared_reads_lock:
+            shared = self.shared_reads.get(key)
+            if shared is None:
+                shared = _GdsSharedRead(Future())
+                self.shared_reads[key] = shared
+                leader = True
+            else:
+                shared.waiters += 1
+                self.num_shared_gets += 1
+                leader = False
+        if not leader:
+            return shared.future.result()
+        try:
+            memory_obj = self._load_key(key)
+        except BaseException as e:
+            with self.shared_reads_lock:
+                del self.shared_reads[key]
+            shared.future.set_exception(e)
+            raise
+        with self.shared_reads_lock:
+            del self.shared_reads[key]
+            # Take the waiters' references before this caller can drop its
+            # own and free the object.
+            if memory_obj is not None:
+                for _ in range(shared.waiters):
+                    memory_obj.ref_count_up()
+        shared.future.set_result(memory_obj)
+        return memory_obj
+
+    def _load_key(
+        self,
+        key: CacheEngineKey,
+    ) -> Optional[MemoryObj]:
+        # Every read path ends up here, the scrubber yields to them.
+        self._count_inflight_reads(1)
+        try:
+            return self._read_key(key)
+        finally:
+            self._count_inflight_reads(-1)
+
+    def _count_inflight_reads(self, delta: int) -> None:
+        with self.inflight_lock:
+            self.inflight_reads += delta
+            self.stats.inflight_reads.set(self.inflight_reads)
+
+    def _read_key(self, key: CacheEngineKey) -> Optional[MemoryObj]:
+        for _ in range(_SEGMENT_READ_ATTEMPTS):
+            with self.hot_lock:
+                entry = self.hot_cache.get(key)
+                if entry is not None:
+                    self.eviction_policy.on_hit(key, self.hot_cache)
+            if entry is None:
+                return None
+            if not entry.in_segment:
+                return self._load_entry(key, entry)
+            assert self.segment_log is not None
+            if self.segment_log.acquire_read(entry.path):
+                try:
+                    return self._load_entry(key, entry)
+                finally:
+                    self.segment_log.release_read(entry.path)
+            # The segment was compacted under us, look the entry up again
+            # for the record's new location.
+        logger.debug(f"{key} kept moving between segments, treating it as a miss")
+        return None
 
+    def _load_entry(
+        self, key: CacheEngineKey, entry: GdsCacheMetadata
+    ) -> Optional[MemoryObj]:
         path = entry.path
         dtype = entry.dtype
         shape = entry.shape
@@ -521,7 +4822,190 @@ class GdsBackend(StorageBackendInterface):
         assert dtype is not None
         assert shape is not None
         assert fmt is not None
-        return self._load_bytes_from_disk(key, path, dtype=dtype, shape=shape, fmt=fmt)
+        start = time.perf_counter()
+        try:
+            memory_obj = self._load_bytes_from_disk(
+                key,
+                path,
+                dtype=dtype,
+                shape=shape,
+                fmt=fmt,
+                offset=entry.offset,
+                codec=entry.codec,
+                expected=entry,
+            )
+        except FileNotFoundError:
+            # Evicted between the lookup and the read.
+            logger.debug(f"{path} is gone, treating {key} as a miss")
+            self._pop_entry(key, expected=entry)
+            return None
+        if memory_obj is not None and self._should_verify():
+            assert memory_obj.tensor is not None
+            if not self._verify_payload(key, entry, memory_obj.tensor):
+                memory_obj.ref_count_down()
+                return None
+        if memory_obj is not None:
+            self.stats.observe_get(
+                self._io_path(entry.codec, write=False), time.perf_counter() - start
+            )
+        return memory_obj
+
+    def _io_path(self, codec: int, write: bool) -> str:
+        """
+        How a chunk moves between gds_path and the GPU, for the metrics.
+        """
+        if codec != _CODEC_NONE:
+            return "compressed"
+        if self.cufile:
+            return "cufile"
+        if self.bounce_writes if write else self.bounce_reads:
+            return "bounce"
+        return "mmap"
+
+    def _should_verify(self) -> bool:
+        if self.verify_reads == "always":
+            return True
+        if self.verify_reads == "sampled":
+            return self.rand.random() < self.verify_sample_rate
+        return False
+
+    def _entry_checksum(self, entry: GdsCacheMetadata) -> int:
+        """
+        The payload checksum of `entry`, read from its header if the entry
+        came from the manifest, which does not record it.
+        """
+        if entry.checksum is None:
+            record_offset = entry.offset - _METADATA_MAX_SIZE if entry.in_segment else 0
+            fd = os.open(entry.path, os.O_RDONLY)
+            try:
+                buf = os.pread(fd, _METADATA_MAX_SIZE, record_offset)
+            finally:
+                os.close(fd)
+            try:
+                entry.checksum = unpack_metadata(buf).entry_checksum
+            except (UnsupportedMetadataVersion, ValueError):
+                entry.checksum = _NO_CHECKSUM
+        return entry.checksum
+
+    def _verify_payload(
+        self, key: CacheEngineKey, entry: GdsCacheMetadata, payload: torch.Tensor
+    ) -> bool:
+        expected = self._entry_checksum(entry)
+        if (
+            expected == _NO_CHECKSUM
+            or payload_checksum(payload, self.checksum_stream) == expected
+        ):
+            return True
+        logger.error(f"Checksum mismatch for {key} in {entry.path}")
+        self._quarantine(key, entry)
+        return False
+
+    def _quarantine(self, key: CacheEngineKey, entry: GdsCacheMetadata) -> None:
+        """
+        Drop a corrupt chunk from the index. Chunk files are kept in
+        quarantine/ below their stripe for inspection, segment records are
+        reclaimed by compaction.
+        """
+        if self._pop_entry(key, expected=entry) is None:
+            # Replaced by a new put in the meantime.
+            return
+        self._manifest_delete(key)
+        self.num_corrupt_chunks += 1
+        self.stats.corrupt_chunks.inc()
+        if entry.in_segment:
+            return
+        root = os.path.dirname(os.path.dirname(os.path.dirname(entry.path)))
+        quarantine_dir = os.path.join(root, _QUARANTINE_DIR)
+        os.makedirs(quarantine_dir, exist_ok=True)
+        target = os.path.join(quarantine_dir, os.path.basename(entry.path))
+        try:
+            os.rename(entry.path, target)
+            os.unlink(entry.path + _METADATA_FILE_SUFFIX)
+        except FileNotFoundError:
+            pass
+        self.handle_cache.invalidate(entry.path)
+        logger.warning(f"Moved corrupt chunk {key} to {target}")
+
+    async def _scrub_loop(self):
+        while not self.closing:
+            await asyncio.sleep(self.scrub_interval)
+            with self.hot_lock:
+                keys = list(self.hot_cache)
+            corrupt = self.num_corrupt_chunks
+            start = time.perf_counter()
+            scrubbed = 0
+            for key in keys:
+                # Foreground reads go first, for up to a second.
+                deadline = time.monotonic() + 1.0
+                while self.inflight_reads > 0 and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                if self.closing:
+                    return
+                scrubbed += await self._run_background(self._scrub_key, key)
+                ahead = scrubbed / self.scrub_rate - (time.perf_counter() - start)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+            logger.info(
+                f"GDS scrub checked {len(keys)} chunks, "
+                f"{scrubbed / 1024**2:.0f} MB in "
+                f"{time.perf_counter() - start:.0f} seconds, found "
+                f"{self.num_corrupt_chunks - corrupt} corrupt"
+            )
+
+    def _scrub_key(self, key: CacheEngineKey) -> int:
+        """
+        Check the payload of `key` against its checksum, returns the bytes
+        read.
+        """
+        with self.hot_lock:
+            entry = self.hot_cache.get(key)
+        if entry is None or self._in_peer_segment(entry):
+            return 0
+        if not entry.in_segment:
+            return self._scrub_entry(key, entry)
+        assert self.segment_log is not None
+        if not self.segment_log.acquire_read(entry.path):
+            return 0
+        try:
+            return self._scrub_entry(key, entry)
+        finally:
+            self.segment_log.release_read(entry.path)
+
+    def _scrub_entry(self, key: CacheEngineKey, entry: GdsCacheMetadata) -> int:
+        try:
+            expected = self._entry_checksum(entry)
+            if expected == _NO_CHECKSUM:
+                return 0
+            fd = os.open(entry.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return 0
+        try:
+            stored_size = entry.size
+            if entry.codec != _CODEC_NONE:
+                stored_size = max(os.fstat(fd).st_size - entry.offset, 0)
+            stored = bytearray(stored_size)
+            nbytes = os.preadv(fd, [stored], entry.offset)
+            # Don't push the chunks being served out of the page cache.
+            os.posix_fadvise(fd, entry.offset, stored_size, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        if nbytes != stored_size:
+            logger.error(f"{entry.path} holds {nbytes} of {stored_size} bytes of {key}")
+            self._quarantine(key, entry)
+            return nbytes
+        buf = stored
+        if entry.codec != _CODEC_NONE:
+            buf = bytearray(entry.size)
+            try:
+                self._codec(entry.codec).decompress(memoryview(stored), memoryview(buf))
+            except ValueError as e:
+                logger.error(f"Can't decompress {key} in {entry.path}: {e}")
+                self._quarantine(key, entry)
+                return nbytes
+        if payload_checksum(torch.frombuffer(buf, dtype=torch.uint8)) != expected:
+            logger.error(f"Checksum mismatch for {key} in {entry.path}")
+            self._quarantine(key, entry)
+        return nbytes
 
     def _load_bytes_from_disk(
         self,
@@ -530,9 +5014,13 @@ class GdsBackend(StorageBackendInterface):
         dtype: torch.dtype,
         shape: torch.Size,
         fmt: MemoryFormat,
+        offset: int = _METADATA_MAX_SIZE,
+        codec: int = _CODEC_NONE,
+        expected: Optional[GdsCacheMetadata] = None,
     ) -> Optional[MemoryObj]:
         """
-        Load byte array from disk.
+        Load byte array from disk. A failed read drops `key` from the index
+        only if it still maps to `expected`, the entry that was read.
         """
         memory_obj = self.memory_allocator.allocate(shape, dtype, fmt=fmt)
         if memory_obj is None:
@@ -542,21 +5030,30 @@ class GdsBackend(StorageBackendInterface):
         assert memory_obj.tensor.is_cuda
         assert torch.device(self.dst_device) == torch.device(memory_obj.tensor.device)
 
-        offset = _METADATA_MAX_SIZE
-        if self.cufile_base_pointer is None:
-            addr = ctypes.c_void_p(memory_obj.tensor.data_ptr())
-            dev_offset = 0
-        else:
-            addr = ctypes.c_void_p(self.cufile_base_pointer)
-            dev_offset = memory_obj.metadata.address
-        ret = self._load_gds(path, offset, addr, memory_obj.get_size(), dev_offset)
+        addr, dev_offset = self._device_address(
+            memory_obj.tensor, self.cufile_base_pointer, memory_obj.metadata.address
+        )
+        try:
+            if codec != _CODEC_NONE:
+                ret = self._load_compressed(path, offset, codec, memory_obj.tensor)
+            else:
+                ret = self._load_gds(
+                    path, offset, addr, memory_obj.get_size(), dev_offset
+                )
+        except FileNotFoundError:
+            memory_obj.ref_count_down()
+            raise
+        except ValueError as e:
+            logger.error(f"Error decompressing {path}: {e}, removing entry from cache")
+            self._pop_entry(key, expected=expected)
+            memory_obj.ref_count_down()
+            return None
         if ret != memory_obj.get_size():
             if ret < 0:
                 logger.error(
                     f"Error loading {path}: ret: {ret} removing entry from cache"
                 )
-                with self.hot_lock:
-                    self.hot_cache.pop(key)
+                self._pop_entry(key, expected=expected)
             else:
                 # TODO: we should probably count errors and
                 # remove the entry if it's a persistent problem.
@@ -566,14 +5063,91 @@ class GdsBackend(StorageBackendInterface):
                 )
             memory_obj.ref_count_down()
             return None
+        if codec == _CODEC_NONE:
+            self.stripes.account(path, ret, write=False)
+            self.stats.observe_read(self._io_path(codec, write=False), ret)
         return memory_obj
 
     def get_non_blocking(
         self,
         key: CacheEngineKey,
     ) -> Optional[Future]:
-        # TODO: Using a dummy wrapper around prefetch for now.
-        return self.submit_prefetch_task(key)
+        """
+        Returns a future resolving to the MemoryObj, reusing an outstanding
+        prefetch of the key if there is one.
+        """
+        future = self._take_prefetch(key)
+        if future is not None:
+            return future
+        with self.hot_lock:
+            if key not in self.hot_cache:
+                return None
+        return asyncio.run_coroutine_threadsafe(
+            self._async_load_bytes_from_disk(key), self.loop
+        )
+
+    def _open_handle(self, path: str, mode: str):
+        if self.cufile:
+            f = self.cufile.CuFile(path, mode, use_direct_io=self.use_direct_io)
+            f.open()
+            return f
+        if mode == "direct":
+            return os.open(path, os.O_RDONLY | os.O_DIRECT)
+        if mode == "direct+":
+            return os.open(path, os.O_RDWR | os.O_DIRECT)
+        return os.open(path, os.O_RDWR if mode == "r+" else os.O_RDONLY)
+
+    def _close_handle(self, handle) -> None:
+        if self.cufile:
+            handle.close()
+        else:
+            os.close(handle)
+
+    def _device_address(
+        self,
+        kv_chunk: torch.Tensor,
+        base_pointer: Optional[int],
+        device_offset: int,
+    ) -> Tuple[ctypes.c_void_p, int]:
+        """
+        Returns the (base address, offset) pair to hand to cuFile for
+        `kv_chunk`, relative to a registered buffer whenever possible.
+        """
+        if base_pointer is not None:
+            return ctypes.c_void_p(base_pointer), device_offset
+        pointer = kv_chunk.data_ptr()
+        if self.buffer_registry is not None:
+            base = self.buffer_registry.lookup(pointer)
+            if base is not None:
+                return ctypes.c_void_p(base), pointer - base
+        return ctypes.c_void_p(pointer), 0
+
+    def _publish(self, tmp_path: str, path: str, replace: bool) -> bool:
+        """
+        Moves a written temp file to `path`. On a shared gds_path the file
+        is hard linked, which fails if the chunk exists: the first writer
+        wins and the others drop their copy. Returns False if it lost.
+        """
+        if self.publish_link and not replace:
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                remove_tmp_file(tmp_path)
+                return False
+            except OSError as e:
+                if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.EXDEV):
+                    remove_tmp_file(tmp_path)
+                    raise
+                logger.warning(
+                    f"Filesystem of {self.gds_path} doesn't support hard links "
+                    f"({e}), concurrent writers of a chunk will overwrite it"
+                )
+                self.publish_link = False
+            else:
+                os.unlink(tmp_path)
+                return True
+        os.rename(tmp_path, path)
+        return True
 
     @_lmcache_nvtx_annotate
     @torch.inference_mode()
@@ -585,24 +5159,37 @@ class GdsBackend(StorageBackendInterface):
         fmt: MemoryFormat,
         base_pointer: int,
         device_offset: int,
-    ):
-        if base_pointer is None:
-            addr = ctypes.c_void_p(kv_chunk.data_ptr())
-            dev_offset = 0
-        else:
-            addr = ctypes.c_void_p(base_pointer)
-            dev_offset = device_offset
+        checksum: Optional[int] = None,
+        compressed: Optional[bytes] = None,
+        replace: bool = False,
+    ) -> Optional[bytes]:
+        """
+        Writes the chunk to a temp file and publishes it at `path`. Returns
+        the header, or None if another writer published the chunk first.
+        """
+        addr, dev_offset = self._device_address(kv_chunk, base_pointer, device_offset)
         tmp_path = path + tmp
-        offset = _METADATA_MAX_SIZE
+        offset = self.metadata_size
         # TODO: We can add the chunk's metadata here, e.g. Tensor parallelism shard
         # and pipeline parallelism index.
         metadata = pack_metadata(
-            kv_chunk, fmt=fmt, lmcache_version=str(_METADATA_VERSION)
+            kv_chunk,
+            fmt=fmt,
+            version=self.metadata_version,
+            header_size=self.metadata_size,
+            checksum=checksum,
+            codec=self.codec.id if compressed is not None else _CODEC_NONE,
         )
         try:
-            with open(tmp_path, "wb") as f:
-                f.write(metadata)
-            if self.cufile:
+            if compressed is not None:
+                self._save_compressed(tmp_path, metadata, compressed)
+            elif self.bounce_writes:
+                self._save_bounce(
+                    tmp_path, metadata, int(addr.value) + dev_offset, kv_chunk.nbytes
+                )
+            elif self.cufile:
+                with open(tmp_path, "wb") as f:
+                    f.write(metadata)
                 with self.cufile.CuFile(
                     tmp_path, "r+", use_direct_io=self.use_direct_io
                 ) as f:
@@ -610,6 +5197,8 @@ class GdsBackend(StorageBackendInterface):
                         addr, kv_chunk.nbytes, file_offset=offset, dev_offset=dev_offset
                     )
             else:
+                with open(tmp_path, "wb") as f:
+                    f.write(metadata)
                 # mmap the file
                 fd = os.open(tmp_path, os.O_RDWR)
                 nbytes = kv_chunk.nbytes
@@ -625,7 +5214,7 @@ class GdsBackend(StorageBackendInterface):
 
                 res = self.cudart.cudaMemcpy(
                     ctypes.c_void_p(buf_addr + offset),
-                    ctypes.c_void_p(int(addr.value) + device_offset),
+                    ctypes.c_void_p(int(addr.value) + dev_offset),
                     ctypes.c_size_t(nbytes),
                     ctypes.c_int(2),
                 )
@@ -636,10 +5225,309 @@ class GdsBackend(StorageBackendInterface):
 
         except Exception as e:
             logger.error(f"Error saving {tmp_path}: {e}", exc_info=True)
+            remove_tmp_file(tmp_path)
             raise e
-        os.rename(tmp_path, path)
+        if not self._publish(tmp_path, path, replace):
+            return None
+        # A cached handle of an older version of the chunk would keep
+        # reading the replaced inode.
+        self.handle_cache.invalidate(path)
         return metadata
 
+    @_lmcache_nvtx_annotate
+    @torch.inference_mode()
+    def _save_segment(
+        self,
+        path: str,
+        record_offset: int,
+        key_str: str,
+        kv_chunk: torch.Tensor,
+        fmt: MemoryFormat,
+        base_pointer: int,
+        device_offset: int,
+        checksum: Optional[int] = None,
+    ) -> None:
+        assert self.segment_log is not None
+        addr, dev_offset = self._device_address(kv_chunk, base_pointer, device_offset)
+        nbytes = kv_chunk.nbytes
+        metadata = pack_metadata(
+            kv_chunk,
+            fmt=fmt,
+            version=self.metadata_version,
+            key=key_str,
+            seq=time.time_ns(),
+            checksum=checksum,
+        )
+        fd = self.segment_log.get_fd(path)
+        try:
+            # The payload goes first and the metadata block last, the
+            # metadata block is what makes the record visible to a scan.
+            if self.cufile:
+                with self.handle_cache.open(path, "r+") as f:
+                    f.write(
+                        addr,
+                        nbytes,
+                        file_offset=record_offset + _METADATA_MAX_SIZE,
+                        dev_offset=dev_offset,
+                    )
+                os.pwrite(fd, metadata, record_offset)
+            elif self.bounce_writes:
+                self._save_segment_bounce(
+                    path,
+                    fd,
+                    record_offset,
+                    metadata,
+                    int(addr.value) + dev_offset,
+                    nbytes,
+                )
+            else:
+                mm = mmap.mmap(
+                    fd,
+                    GdsSegmentLog.record_size(nbytes),
+                    prot=mmap.PROT_READ | mmap.PROT_WRITE,
+                    flags=mmap.MAP_SHARED,
+                    offset=record_offset,
+                )
+                arr = np.frombuffer(mm, dtype=np.uint8)
+                buf_addr = arr.__array_interface__["data"][0]
+
+                res = self.cudart.cudaMemcpy(
+                    ctypes.c_void_p(buf_addr + _METADATA_MAX_SIZE),
+                    ctypes.c_void_p(int(addr.value) + dev_offset),
+                    ctypes.c_size_t(nbytes),
+                    ctypes.c_int(2),
+                )
+                if res:
+                    raise RuntimeError(f"cudaMemcpy failed {res}")
+                del arr
+                mm[:_METADATA_MAX_SIZE] = metadata
+                mm.close()
+        except Exception as e:
+            logger.error(
+                f"Error saving record at {record_offset} of {path}: {e}",
+                exc_info=True,
+            )
+            raise e
+
+    def _codec(self, codec_id: int) -> GdsCodec:
+        with self.codec_lock:
+            codec = self.codecs.get(codec_id)
+            if codec is not None:
+                return codec
+            if self.codec_executor is None:
+                self.codec_executor = self._make_executor(
+                    self.codec_threads, "gds-codec"
+                )
+            for codec_cls in _CODECS.values():
+                if codec_cls.id != codec_id:
+                    continue
+                try:
+                    codec = codec_cls(
+                        self.codec_level, self.codec_frame_size, self.codec_executor
+                    )
+                except ImportError as e:
+                    raise RuntimeError(
+                        f"GDS compression with {codec_cls.name} needs its "
+                        f"Python package: {e}"
+                    ) from None
+                self.codecs[codec_id] = codec
+                return codec
+        raise UnsupportedMetadataVersion(f"unknown codec id {codec_id}")
+
+    def _compress_chunk(self, kv_chunk: torch.Tensor) -> Optional[bytes]:
+        """
+        The compressed payload of `kv_chunk`, None if compression does not
+        pay off for it.
+        """
+        assert self.codec is not None
+        data = kv_chunk.reshape(-1).view(torch.uint8)
+        nbytes = data.numel()
+        # Try the first frame before moving the whole chunk to the host.
+        probe = data[: self.codec.frame_size].cpu().numpy()
+        probe_size = len(self.codec.compress_frame(memoryview(probe)))
+        compressed = None
+        if probe_size <= self.compression_max_ratio * len(probe):
+            compressed = self.codec.compress(memoryview(data.cpu().numpy()))
+            if len(compressed) > self.compression_max_ratio * nbytes:
+                compressed = None
+        if compressed is None:
+            self.num_uncompressed_puts += 1
+            return None
+        self.num_compressed_puts += 1
+        self.compressed_bytes_saved += nbytes - len(compressed)
+        return compressed
+
+    def _save_compressed(self, path: str, metadata: bytes, compressed: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(metadata)
+            f.write(compressed)
+            if self.bounce_fdatasync != "never":
+                f.flush()
+                os.fdatasync(f.fileno())
+
+    def _load_compressed(
+        self, path: str, offset: int, codec_id: int, out: torch.Tensor
+    ) -> int:
+        """
+        Read and decompress a compressed payload into `out`, returns the
+        number of bytes decompressed.
+        """
+        codec = self._codec(codec_id)
+        if self.cufile:
+            # Cached handles are CuFile objects then, read through a plain
+            # file descriptor.
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                stored, nbytes = self._read_stored(fd, offset)
+            finally:
+                os.close(fd)
+        else:
+            with self.handle_cache.open(path, "r") as fd:
+                stored, nbytes = self._read_stored(fd, offset)
+        if nbytes != len(stored):
+            return nbytes
+        host = np.empty(out.nbytes, dtype=np.uint8)
+        codec.decompress(memoryview(stored), memoryview(host))
+        out.reshape(-1).view(torch.uint8).copy_(torch.from_numpy(host))
+        self.stripes.account(path, nbytes, write=False)
+        self.stats.observe_read("compressed", nbytes)
+        return out.nbytes
+
+    @staticmethod
+    def _read_stored(fd: int, offset: int) -> Tuple[bytearray, int]:
+        stored = bytearray(os.fstat(fd).st_size - offset)
+        return stored, os.preadv(fd, [stored], offset)
+
+    def _open_direct(self, path: str, flags: int) -> int:
+        if self.bounce_direct_io:
+            try:
+                return os.open(path, flags | os.O_DIRECT, 0o644)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                logger.warning(
+                    f"O_DIRECT is not supported for {path}, "
+                    "falling back to buffered I/O"
+                )
+                self.bounce_direct_io = False
+        return os.open(path, flags, 0o644)
+
+    def _save_bounce(self, path: str, metadata: bytes, src: int, nbytes: int) -> None:
+        assert self.bounce_engine is not None
+        fd = self._open_direct(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            self.bounce_engine.write(fd, 0, src, nbytes, prefix=metadata)
+            # Drop the padding of the last block.
+            os.ftruncate(fd, len(metadata) + nbytes)
+            # A chunk file must be durable before it is renamed into place,
+            # so `group` syncs every file too.
+            if self.bounce_fdatasync != "never":
+                os.fdatasync(fd)
+        finally:
+            os.close(fd)
+
+    def _save_segment_bounce(
+        self,
+        path: str,
+        fd: int,
+        record_offset: int,
+        metadata: bytes,
+        src: int,
+        nbytes: int,
+    ) -> None:
+        assert self.bounce_engine is not None
+        # The padding of the last block stays inside the record.
+        payload_offset = record_offset + _METADATA_MAX_SIZE
+        written = False
+        if self.bounce_direct_io:
+            try:
+                with self.handle_cache.open(path, "direct+") as direct_fd:
+                    self.bounce_engine.write(direct_fd, payload_offset, src, nbytes)
+                written = True
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                logger.warning(
+                    f"O_DIRECT is not supported for {path}, "
+                    "falling back to buffered I/O"
+                )
+                self.bounce_direct_io = False
+        if not written:
+            self.bounce_engine.write(fd, payload_offset, src, nbytes)
+        os.pwrite(fd, metadata, record_offset)
+        if self.bounce_fdatasync == "always":
+            os.fdatasync(fd)
+
+    def _maybe_schedule_compaction(self) -> None:
+        assert self.segment_log is not None
+        with self.compaction_lock:
+            if self.compaction_scheduled:
+                return
+            if not self.segment_log.compaction_candidates():
+                return
+            self.compaction_scheduled = True
+        asyncio.run_coroutine_threadsafe(self._compact_segments(), self.loop)
+
+    async def _compact_segments(self) -> None:
+        assert self.segment_log is not None
+        try:
+            for path in self.segment_log.compaction_candidates():
+                await self._run_background(self._compact_segment, path)
+        finally:
+            with self.compaction_lock:
+                self.compaction_scheduled = False
+
+    def _compact_segment(self, path: str) -> None:
+        """
+        Move the live records of a mostly dead segment to the active segment
+        and delete it once no reader is using it any more.
+        """
+        assert self.segment_log is not None
+        moved = 0
+        src_fd = self.segment_log.get_fd(path)
+        for key in self.segment_log.live_keys(path):
+            with self.hot_lock:
+                entry = self.hot_cache.get(key)
+            if entry is None or entry.path != path:
+                continue
+            record_offset = entry.offset - _METADATA_MAX_SIZE
+            record = os.pread(
+                src_fd, GdsSegmentLog.record_size(entry.size), record_offset
+            )
+            new_path, new_offset = self.segment_log.reserve(entry.size)
+            try:
+                dst_fd = self.segment_log.get_fd(new_path)
+                os.pwrite(
+                    dst_fd,
+                    record[_METADATA_MAX_SIZE:],
+                    new_offset + _METADATA_MAX_SIZE,
+                )
+                os.pwrite(dst_fd, record[:_METADATA_MAX_SIZE], new_offset)
+                new_entry = GdsCacheMetadata(
+                    new_path,
+                    entry.size,
+                    entry.shape,
+                    entry.dtype,
+                    entry.fmt,
+                    offset=new_offset + _METADATA_MAX_SIZE,
+                    in_segment=True,
+                    checksum=entry.checksum,
+                )
+                with self.hot_lock:
+                    if self.hot_cache.get(key) is not entry:
+                        # Replaced while copying, the copy is dead already.
+                        continue
+                    new_entry.pin_count = entry.pin_count
+                    self.hot_cache[key] = new_entry
+                self.segment_log.untrack(path, key, entry.size)
+                self.segment_log.track(new_path, key, entry.size)
+            finally:
+                self.segment_log.commit(new_path)
+            self._manifest_put(key, new_entry)
+            moved += 1
+        self.segment_log.retire(path)
+        logger.info(f"Compacted GDS segment {path}, moved {moved} live records")
+
     def _load_gds(
         self,
         gds_path: str,
@@ -650,32 +5538,39 @@ class GdsBackend(StorageBackendInterface):
     ) -> int:
         # Read data from disk into a GPU buffer
         if self.cufile:
-            with self.cufile.CuFile(
-                gds_path, "r", use_direct_io=self.use_direct_io
-            ) as f:
+            with self.handle_cache.open(gds_path, "r") as f:
                 return f.read(
                     gpu_pointer,
                     size_in_bytes,
                     file_offset=file_offset,
                     dev_offset=dev_offset,
                 )
-        else:
-            fd = os.open(gds_path, os.O_RDONLY)
-            file_size = os.fstat(fd).st_size
-            mm = mmap.mmap(
-                fd,
-                file_size,
-                prot=mmap.PROT_READ,
-                flags=mmap.MAP_PRIVATE | mmap.MAP_POPULATE,
+        elif self.bounce_reads:
+            return self._load_bounce(
+                gds_path,
+                file_offset,
+                int(gpu_pointer.value) + dev_offset,
+                size_in_bytes,
             )
-            os.close(fd)
+        else:
+            # Only map the pages holding the payload, segment files are
+            # much larger than a single chunk.
+            map_offset = file_offset - file_offset % mmap.ALLOCATIONGRANULARITY
+            with self.handle_cache.open(gds_path, "r") as fd:
+                mm = mmap.mmap(
+                    fd,
+                    file_offset - map_offset + size_in_bytes,
+                    prot=mmap.PROT_READ,
+                    flags=mmap.MAP_PRIVATE | mmap.MAP_POPULATE,
+                    offset=map_offset,
+                )
 
             arr = np.frombuffer(mm, dtype=np.uint8)
             addr = arr.__array_interface__["data"][0]
 
             res = self.cudart.cudaMemcpy(
                 ctypes.c_void_p(int(gpu_pointer.value) + dev_offset),
-                ctypes.c_void_p(addr + file_offset),
+                ctypes.c_void_p(addr + file_offset - map_offset),
                 ctypes.c_size_t(size_in_bytes),
                 ctypes.c_int(1),
             )
@@ -686,18 +5581,169 @@ class GdsBackend(StorageBackendInterface):
             mm.close()
             return size_in_bytes
 
+    def _load_bounce(
+        self, path: str, file_offset: int, dst: int, size_in_bytes: int
+    ) -> int:
+        assert self.bounce_engine is not None
+        if self.bounce_direct_io:
+            try:
+                with self.handle_cache.open(path, "direct") as fd:
+                    return self.bounce_engine.read(fd, file_offset, dst, size_in_bytes)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                logger.warning(
+                    f"O_DIRECT is not supported for {path}, "
+                    "falling back to buffered reads"
+                )
+                self.bounce_direct_io = False
+        with self.handle_cache.open(path, "r") as fd:
+            return self.bounce_engine.read(fd, file_offset, dst, size_in_bytes)
+
     def pin(self, key: CacheEngineKey) -> bool:
-        # NOTE (ApostaC): Since gds doesn't have eviction now, we don't need
-        # to implement pin and unpin
-        return
+        with self.hot_lock:
+            entry = self.hot_cache.get(key)
+            if entry is None:
+                return False
+            entry.pin()
+            return True
 
     def unpin(self, key: CacheEngineKey) -> bool:
-        # NOTE (ApostaC): Since gds doesn't have eviction now, we don't need
-        # to implement pin and unpin
-        return
+        with self.hot_lock:
+            entry = self.hot_cache.get(key)
+            if entry is None or not entry.is_pinned:
+                return False
+            entry.unpin()
+            return True
+
+    def _pop_entry(
+        self, key: CacheEngineKey, expected: Optional[GdsCacheMetadata] = None
+    ) -> Optional[GdsCacheMetadata]:
+        """
+        Drop `key` from the index, only if it still maps to `expected` when
+        that is given.
+        """
+        with self.hot_lock:
+            if expected is not None and self.hot_cache.get(key) is not expected:
+                return None
+            entry = self.hot_cache.pop(key, None)
+            if entry is not None:
+                self.usage -= self._footprint(entry)
+        if entry is not None and entry.in_segment:
+            assert self.segment_log is not None
+            self.segment_log.untrack(entry.path, key, entry.size)
+            self._maybe_schedule_compaction()
+        return entry
+
+    def remove(self, key: CacheEngineKey, free_obj: bool = True) -> bool:
+        """
+        Drop the chunk from the index right away and delete its file in the
+        background. With `gds_shared_path` the file is renamed to a temp
+        file name first and only unlinked after `unlink_delay`.
+        `free_obj` is meaningless here, the tier holds no memory objects.
+        """
+        entry = self._pop_entry(key)
+        if entry is None:
+            return False
+        self._manifest_delete(key)
+        if not entry.in_segment:
+            # Segment records are reclaimed by compaction instead.
+            self.loop.call_soon_threadsafe(self._schedule_delete, key, entry.path)
+        return True
+
+    def _schedule_delete(self, key: CacheEngineKey, path: str) -> None:
+        self._start_delete(self._delete_files, key, path)
+
+    def _start_delete(self, func, *args) -> None:
+        task = self._run_background(func, *args)
+        self.delete_tasks.add(task)
+        task.add_done_callback(self.delete_tasks.discard)
+
+    def _delete_files(self, key: CacheEngineKey, path: str) -> None:
+        with self.hot_lock:
+            entry = self.hot_cache.get(key)
+        if entry is not None and entry.path == path:
+            # Stored or adopted again since the remove, the file is live.
+            return
+        file_paths = [path, path + _METADATA_FILE_SUFFIX]
+        if self.shared_path and self.unlink_delay > 0:
+            # Other instances may still read the file. Move it to a temp
+            # file name right away, so that a put of the key by one of them
+            # writes a new file instead of adopting the doomed one, and
+            # unlink it later. Open handles keep reading the old file.
+            suffix = _TMP_FILE_SUFFIX + rand_suffix(self.rand, _TMP_SUFFIX_LEN)
+            tombstones = []
+            for file_path in file_paths:
+                try:
+                    os.rename(file_path, file_path + suffix)
+                    tombstones.append(file_path + suffix)
+                except FileNotFoundError:
+                    pass
+            self.handle_cache.invalidate(path)
+            self.loop.call_soon_threadsafe(
+                self.loop.call_later,
+                self.unlink_delay,
+                self._start_delete,
+                self._unlink_files,
+                tombstones,
+            )
+            return
+        self._unlink_files(file_paths)
+        self.handle_cache.invalidate(path)
 
-    def remove(self, key, free_obj=True):
-        raise NotImplementedError("Remote backend does not support remove now.")
+    @staticmethod
+    def _unlink_files(file_paths: List[str]) -> None:
+        for file_path in file_paths:
+            try:
+                os.unlink(file_path)
+            except FileNotFoundError:
+                pass
 
     def close(self) -> None:
+        self.closing = True
+        with self.prefetch_lock:
+            keys = list(self.prefetch_tasks)
+        for key in keys:
+            self.cancel_prefetch(key)
+        if self.loop.is_running():
+            # Let the workers write what is queued, then fail what is left,
+            # so every put resolves and releases its memory object before
+            # the segments, handles and manifest below are closed.
+            for _ in self.write_worker_futures:
+                self.loop.call_soon_threadsafe(self.write_queue.put_nowait, None)
+            _, pending = wait_futures(
+                self.write_worker_futures, timeout=_CLOSE_DRAIN_TIMEOUT
+            )
+            if pending:
+                logger.warning(
+                    f"GDS write queue not drained in {_CLOSE_DRAIN_TIMEOUT}s, "
+                    f"dropping the {self.write_queued} puts left"
+                )
+            asyncio.run_coroutine_threadsafe(
+                self._drop_queued_puts(), self.loop
+            ).result()
+            wait_futures(self.write_worker_futures)
+        else:
+            for future in self.write_worker_futures:
+                future.cancel()
+        self.write_executor.shutdown(wait=True)
+        if self.manifest is not None:
+            self.manifest.checkpoint()
+            self.manifest.close()
+        else:
+            GdsManifest.invalidate(self.gds_path)
+        if self.segment_log is not None:
+            self.segment_log.close()
+        self.handle_cache.close()
+        if self.writer_lock_fd is not None:
+            os.close(self.writer_lock_fd)
+            self.writer_lock_fd = None
+        if self.buffer_registry is not None:
+            self.buffer_registry.close()
+        self.read_executor.shutdown(wait=False)
+        self.background_executor.shutdown(wait=False)
+        if self.bounce_engine is not None:
+            self.bounce_engine.close()
+        if self.io_executor is not None:
+            self.io_executor.shutdown(wait=False)
         logger.info("GDS backend closed.")
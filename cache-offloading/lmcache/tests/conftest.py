@@ -0,0 +1,25 @@
+# SPDX-License-Identifier: Apache-2.0
+# Standard
+import importlib.util
+import os
+
+# Third Party
+import pytest
+
+GDS_BACKEND_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "patchv1", "storage_backend", "gds_backend.py"
+)
+
+
+@pytest.fixture(scope="session")
+def gds():
+    """
+    The patched gds_backend module, loaded from the tree against the
+    installed lmcache it is copied into.
+    """
+    pytest.importorskip("lmcache")
+    spec = importlib.util.spec_from_file_location("gds_backend", GDS_BACKEND_PATH)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
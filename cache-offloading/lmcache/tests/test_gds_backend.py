@@ -0,0 +1,391 @@
+# SPDX-License-Identifier: Apache-2.0
+# Standard
+from types import SimpleNamespace
+import os
+
+# Third Party
+import pytest
+import torch
+
+
+class FakeMemoryObj:
+    def __init__(self, size, num_tokens=256, positions=None):
+        self.size = size
+        self.num_tokens = num_tokens
+        self.metadata = SimpleNamespace(cached_positions=positions)
+
+    def get_size(self):
+        return self.size
+
+    def get_num_tokens(self):
+        return self.num_tokens
+
+
+def make_config(**extra_config):
+    return SimpleNamespace(extra_config=extra_config)
+
+
+def put_record(gds, key, seq, stripe="/mnt/a"):
+    return gds.GdsManifestRecord(
+        gds._MANIFEST_OP_PUT,
+        seq,
+        key,
+        offset=4096,
+        size=1024,
+        shape=torch.Size([2, 256]),
+        dtype=torch.bfloat16,
+        fmt=gds.MemoryFormat(1),
+        stored=1024,
+        stripe=stripe,
+    )
+
+
+def del_record(gds, key, seq):
+    return gds.GdsManifestRecord(gds._MANIFEST_OP_DEL, seq, key)
+
+
+# Chunk headers
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_metadata_round_trip(gds, version):
+    tensor = torch.zeros((2, 3, 4), dtype=torch.bfloat16)
+    fmt = gds.MemoryFormat(1)
+    buf = gds.pack_metadata(tensor, fmt, version=version, key="k", seq=7, checksum=42)
+    assert len(buf) == gds._METADATA_MAX_SIZE
+
+    header = gds.unpack_metadata(buf)
+    assert header.version == version
+    assert header.shape == tensor.shape
+    assert header.dtype == tensor.dtype
+    assert header.nbytes == tensor.nbytes
+    assert header.fmt == fmt
+    assert header.key == "k"
+    assert header.seq == 7
+    assert header.entry_checksum == 42
+
+
+def test_metadata_without_checksum(gds):
+    tensor = torch.zeros(16, dtype=torch.float16)
+    header = gds.unpack_metadata(gds.pack_metadata(tensor, gds.MemoryFormat(1)))
+    assert header.entry_checksum == gds._NO_CHECKSUM
+
+
+def test_metadata_v2_short_header(gds):
+    tensor = torch.zeros(16, dtype=torch.float16)
+    buf = gds.pack_metadata(
+        tensor, gds.MemoryFormat(1), header_size=gds._METADATA_MIN_SIZE
+    )
+    assert len(buf) == gds._METADATA_MIN_SIZE
+    assert gds.unpack_metadata(buf).header_size == gds._METADATA_MIN_SIZE
+
+
+def test_metadata_v2_corrupt_header(gds):
+    tensor = torch.zeros(16, dtype=torch.float16)
+    buf = bytearray(gds.pack_metadata(tensor, gds.MemoryFormat(1), key="key"))
+    buf[gds._METADATA_V2.size] ^= 0xFF
+    with pytest.raises(ValueError):
+        gds.unpack_metadata(bytes(buf))
+
+
+def test_metadata_unsupported_version(gds):
+    tensor = torch.zeros(16, dtype=torch.float16)
+    buf = gds.pack_metadata(tensor, gds.MemoryFormat(1), version=9)
+    with pytest.raises(gds.UnsupportedMetadataVersion):
+        gds.unpack_metadata(buf)
+
+
+def test_payload_checksum(gds):
+    tensor = torch.arange(4096, dtype=torch.int32)
+    swapped = tensor.clone()
+    swapped[[0, 1]] = swapped[[1, 0]]
+    assert gds.payload_checksum(tensor) == gds.payload_checksum(tensor.view(64, 64))
+    assert gds.payload_checksum(tensor) != gds.payload_checksum(swapped)
+
+
+# Manifest records
+
+
+def test_manifest_record_round_trip(gds):
+    records = [
+        put_record(gds, "a", 1),
+        del_record(gds, "b", 2),
+        gds.GdsManifestRecord(
+            gds._MANIFEST_OP_PUT,
+            3,
+            "c",
+            location="w-0-00000001.kvlog",
+            size=8,
+            shape=torch.Size([8]),
+            dtype=torch.uint8,
+            fmt=gds.MemoryFormat(1),
+        ),
+    ]
+    buf = b"".join(gds.pack_manifest_record(record) for record in records)
+    unpacked = list(gds.unpack_manifest_records(buf, 0))
+    assert [record for _, record in unpacked] == records
+    assert unpacked[-1][0] == len(buf)
+
+
+def test_manifest_record_torn_or_corrupt(gds):
+    first = gds.pack_manifest_record(put_record(gds, "a", 1))
+    second = gds.pack_manifest_record(put_record(gds, "b", 2))
+    torn = first + second[:-3]
+    assert [r.key for _, r in gds.unpack_manifest_records(torn, 0)] == ["a"]
+
+    corrupt = bytearray(first + second)
+    corrupt[-1] ^= 0xFF
+    assert [r.key for _, r in gds.unpack_manifest_records(bytes(corrupt), 0)] == ["a"]
+
+
+# Manifest
+
+
+def test_manifest_reload_after_clean_close(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    assert manifest.load() is None
+    for key in ("a", "b"):
+        manifest.append(put_record(gds, key, manifest.next_seq()))
+    manifest.append(del_record(gds, "a", manifest.next_seq()))
+    manifest.flush()
+    manifest.close()
+
+    reloaded = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    records = reloaded.load()
+    assert [(r.op, r.key) for r in records] == [
+        (gds._MANIFEST_OP_PUT, "a"),
+        (gds._MANIFEST_OP_PUT, "b"),
+        (gds._MANIFEST_OP_DEL, "a"),
+    ]
+    assert reloaded.next_seq() == 4
+
+
+def test_manifest_unclean_close_is_stale(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    manifest.load()
+    manifest.append(put_record(gds, "a", manifest.next_seq()))
+    manifest.flush()
+    # No close, as after a crash.
+
+    reloaded = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    assert reloaded.load() is None
+    # New records still order after the ones on disk.
+    assert reloaded.next_seq() == 2
+
+
+def test_manifest_invalidate(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    manifest.load()
+    manifest.append(put_record(gds, "a", manifest.next_seq()))
+    manifest.close()
+
+    gds.GdsManifest.invalidate(str(tmp_path))
+    assert gds.GdsManifest(str(tmp_path), "w-0", 1000).load() is None
+
+
+def test_manifest_torn_journal_tail(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    manifest.load()
+    for key in ("a", "b", "c"):
+        manifest.append(put_record(gds, key, manifest.next_seq()))
+    manifest.close()
+    size = os.path.getsize(manifest.journal_path)
+    os.truncate(manifest.journal_path, size - 5)
+
+    reloaded = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    assert [r.key for r in reloaded.load()] == ["a", "b"]
+    # The tail is cut off, so records appended now are readable.
+    last = len(gds.pack_manifest_record(put_record(gds, "c", 3)))
+    assert os.path.getsize(manifest.journal_path) == size - last
+    reloaded.append(put_record(gds, "d", reloaded.next_seq()))
+    reloaded.close()
+
+    records = gds.GdsManifest(str(tmp_path), "w-0", 1000).load()
+    assert [r.key for r in records] == ["a", "b", "d"]
+
+
+def test_manifest_corrupt_checkpoint_is_stale(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    manifest.load()
+    manifest.append(put_record(gds, "a", manifest.next_seq()))
+    manifest.checkpoint()
+    manifest.close()
+    with open(manifest.checkpoint_path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+
+    assert gds.GdsManifest(str(tmp_path), "w-0", 1000).load() is None
+
+
+def test_manifest_checkpoint_keeps_live_puts(gds, tmp_path):
+    manifest = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    manifest.load()
+    for key in ("a", "b", "c"):
+        manifest.append(put_record(gds, key, manifest.next_seq()))
+    manifest.append(del_record(gds, "b", manifest.next_seq()))
+    manifest.checkpoint()
+    manifest.append(put_record(gds, "d", manifest.next_seq()))
+    manifest.close()
+
+    records = gds.GdsManifest(str(tmp_path), "w-0", 1000).load()
+    assert [r.key for r in records] == ["a", "c", "d"]
+    assert all(r.op == gds._MANIFEST_OP_PUT for r in records)
+
+
+def test_manifest_tail_peer(gds, tmp_path):
+    reader = gds.GdsManifest(str(tmp_path), "w-0", 1000)
+    writer = gds.GdsManifest(str(tmp_path), "w-1", 1000)
+    reader.load()
+    writer.load()
+    assert reader.tail() == []
+
+    writer.seq = 100
+    writer.append(put_record(gds, "a", writer.next_seq()))
+    writer.flush()
+    assert [(r.key, r.seq) for r in reader.tail()] == [("a", 101)]
+    assert reader.tail() == []
+    assert reader.next_seq() == 102
+
+    # A checkpoint moves the writer to a new journal.
+    writer.append(put_record(gds, "b", writer.next_seq()))
+    writer.checkpoint()
+    writer.append(put_record(gds, "c", writer.next_seq()))
+    writer.flush()
+    assert [r.key for r in reader.tail()] == ["b", "c"]
+    writer.close()
+    reader.close()
+
+
+# Segment log
+
+
+def write_record(gds, log, key, seq, payload_nbytes=1024):
+    path, offset = log.reserve(payload_nbytes)
+    tensor = torch.full((payload_nbytes,), seq, dtype=torch.uint8)
+    fd = log.get_fd(path)
+    os.pwrite(fd, tensor.numpy().tobytes(), offset + gds._METADATA_MAX_SIZE)
+    header = gds.pack_metadata(tensor, gds.MemoryFormat(1), key=key, seq=seq)
+    os.pwrite(fd, header, offset)
+    log.commit(path)
+    log.track(path, key, payload_nbytes)
+    return path, offset
+
+
+def test_segment_scan(gds, tmp_path):
+    log = gds.GdsSegmentLog(str(tmp_path), "w-0", 1 << 20, 0.5)
+    placements = [write_record(gds, log, f"k{i}", i) for i in range(3)]
+    path = placements[0][0]
+    assert all(p == path for p, _ in placements)
+
+    scanned = list(log.scan(path))
+    assert [offset for offset, _ in scanned] == [o for _, o in placements]
+    assert [header.key for _, header in scanned] == ["k0", "k1", "k2"]
+    assert [header.seq for _, header in scanned] == [0, 1, 2]
+    # The scan stops at the first unwritten record and sizes the segment.
+    assert log.used_bytes[path] == 3 * log.record_size(1024)
+    log.close()
+
+
+def test_segment_reserve_many_is_contiguous(gds, tmp_path):
+    log = gds.GdsSegmentLog(str(tmp_path), "w-0", 1 << 20, 0.5)
+    placements = log.reserve_many([1024, 8192, 1024])
+    assert len({path for path, _ in placements}) == 1
+    offsets = [offset for _, offset in placements]
+    assert offsets[1] == offsets[0] + log.record_size(1024)
+    assert offsets[2] == offsets[1] + log.record_size(8192)
+    log.close()
+
+
+def test_segment_compaction_candidates(gds, tmp_path):
+    record_size = gds.GdsSegmentLog.record_size(1024)
+    log = gds.GdsSegmentLog(str(tmp_path), "w-0", 4 * record_size, 0.5)
+    placements = [write_record(gds, log, f"k{i}", i) for i in range(5)]
+    full = placements[0][0]
+    assert placements[4][0] != full
+    # Full and live, and the active segment is never a candidate.
+    assert log.compaction_candidates() == []
+
+    for key in ("k0", "k1", "k2"):
+        log.untrack(full, key, 1024)
+    assert log.compaction_candidates() == [full]
+    assert log.live_keys(full) == ["k3"]
+
+    # A retired segment is deleted once its readers are done.
+    assert log.acquire_read(full)
+    log.retire(full)
+    assert not log.acquire_read(full)
+    assert os.path.exists(full)
+    log.release_read(full)
+    assert not os.path.exists(full)
+    assert log.compaction_candidates() == []
+    log.close()
+
+
+def test_segment_pending_records_block_compaction(gds, tmp_path):
+    record_size = gds.GdsSegmentLog.record_size(1024)
+    log = gds.GdsSegmentLog(str(tmp_path), "w-0", 2 * record_size, 0.5)
+    path, _ = log.reserve(1024)
+    log.reserve(1024)
+    write_record(gds, log, "next", 0)
+    assert log.compaction_candidates() == []
+    log.commit(path)
+    log.commit(path)
+    assert log.compaction_candidates() == [path]
+    log.close()
+
+
+def test_segment_names(gds, tmp_path):
+    log = gds.GdsSegmentLog(str(tmp_path), "w-0", 1 << 20, 0.5)
+    path, _ = write_record(gds, log, "k", 0)
+    assert gds.GdsSegmentLog.parse_name(path) == ("w-0", 0)
+    assert log.is_own(path)
+    assert not log.is_own(path.replace("w-0", "w-1"))
+    log.close()
+    # A new log continues the sequence of the segments on disk.
+    assert gds.GdsSegmentLog(str(tmp_path), "w-0", 1 << 20, 0.5).next_seq == 1
+
+
+# Admission policies
+
+
+def test_min_prefix_admission(gds):
+    policy = gds.MinPrefixGdsAdmissionPolicy(make_config(gds_admission_min_tokens=1024))
+    objs = [FakeMemoryObj(1, num_tokens=256) for _ in range(3)]
+    assert policy.admit(["a", "b", "c"], objs, lambda _: None) == 0
+    objs.append(FakeMemoryObj(1, num_tokens=256))
+    assert policy.admit(["a", "b", "c", "d"], objs, lambda _: None) == 4
+
+    # Positions count from the start of the prompt, not of the put.
+    late = [FakeMemoryObj(1, positions=torch.arange(2048, 2304))]
+    assert policy.admit(["e"], late, lambda _: None) == 1
+
+
+def test_tinylfu_admission(gds):
+    policy = gds.TinyLFUGdsAdmissionPolicy(
+        make_config(gds_admission_sketch_width=1024, gds_admission_min_frequency=2)
+    )
+    objs = [FakeMemoryObj(1), FakeMemoryObj(1)]
+    # Seen once, below the minimum frequency.
+    assert policy.admit(["a", "b"], objs, lambda _: None) == 0
+    assert policy.admit(["a", "b"], objs, lambda _: None) == 2
+
+    # When the tier is full, a chunk has to be more frequent than its
+    # victim.
+    for _ in range(5):
+        policy.on_hit("hot")
+    assert policy.admit(["a"], objs[:1], lambda _: "hot") == 0
+    assert policy.admit(["hot"], objs[:1], lambda _: "a") == 1
+
+
+def test_token_bucket_admission(gds):
+    policy = gds.TokenBucketGdsAdmissionPolicy(
+        make_config(gds_admission_write_mb_per_s=1e-6, gds_admission_burst_mb=2)
+    )
+    chunk = 1024**2
+    objs = [FakeMemoryObj(chunk) for _ in range(3)]
+    assert policy.admit(["a", "b", "c"], objs, lambda _: None) == 2
+    assert policy.admit(["c"], objs[:1], lambda _: None) == 0
+
+
+def test_admission_policies_are_registered(gds):
+    assert set(gds._ADMISSION_POLICIES) == {"min_prefix", "tinylfu", "token_bucket"}